@@ -0,0 +1,475 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`animation` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module draws a zoom in the fractal as numbered PNG images, following a path of keyframes.
+
+A keyframe gives the center of the image and its scale (the number of
+pixels for one unit) at a frame. Between two keyframes the scale changes
+geometrically, and the center moves so that the point which is at the same
+place in the two keyframes stays there : a zoom towards a point keeps it
+still. See :func:`camera`.
+
+The circles are not computed again for each frame. They are kept in a
+scene, a tree of crowns : each crown seen keeps its circles and the gaps of
+its apollonius fractal not filled yet (the frontier), in :mod:`numpy`
+arrays like in :mod:`batch`. For each frame only the gaps of the frontier
+which became big enough or which came into the viewport are filled, so the
+work of a frame is the detail it reveals, and the crowns whose circle left
+the viewport or became smaller than a pixel are forgotten with all their
+circles. The circles drawn are the ones of :func:`generator.iter_final`
+with the viewport of the frame, computed with the Descartes reflection rule
+of :mod:`apollonian` whatever the engine. Inside a crown seen the circles
+already computed are kept, even out of the viewport, with the size of their
+gap : a zoom out draws them again at once, without the ones whose gap became
+too small.
+
+The frames are cut in `chunks` runs of following frames drawn by the
+processes of :mod:`parallel`, each one with its own scene, so a scene
+follows the path from one frame to the next.
+
+The crowns are never random : `nb_circle` must be at least 3.
+
+To draw an animation one has to:
+
+* read the keyframes with :func:`read_keyframes`, or give a list of tuples (frame, x, y, scale)
+* give the fractal with :func:`make_fractal`
+* draw the frames with :func:`animate`
+* or draw them one after the other in a scene made with :func:`make_scene`, with :func:`render`
+
+.. topic:: This module uses functions from : :mod:`circles`, :mod:`viewport`, :mod:`apollonian`, :mod:`batch`, :mod:`raster`, :mod:`generator` and :mod:`parallel` :
+
+    #. From :mod:`circles` :
+        * :func:`circles.make_circle`
+        * :func:`circles.get_center`
+        * :func:`circles.get_radius`
+    #. From :mod:`viewport` :
+        * :func:`viewport.make_viewport`
+        * :func:`viewport.get_scale`
+        * :func:`viewport.get_origin`
+    #. From :mod:`apollonian` :
+        * :data:`apollonian.MIN_RADIUS`
+    #. From :mod:`batch` :
+        * :func:`batch.crown_gaps`
+    #. From :mod:`raster` :
+        * :func:`raster.make_buffer`
+        * :func:`raster.draw_circles`
+        * :func:`raster.encode_png`
+    #. From :mod:`generator` :
+        * :func:`generator.make_crown`
+    #. From :mod:`parallel` :
+        * :func:`parallel.make_pool`
+"""
+
+import numpy    as np
+import circles  as cir
+import viewport as vp
+import apollonian as ap
+import batch
+import raster
+import generator as gen
+import math
+import os
+
+CHUNK = 1 << 14
+
+###################
+## Les keyframes ##
+###################
+
+def read_keyframes (filename):
+    """
+    Reads a file of keyframes : one keyframe `frame x y scale` by line, the lines beginning with # are comments.
+
+    :param filename: The name of the file
+    :type filename: str
+    :return: The keyframes (frame, x, y, scale), by increasing frame
+    :rtype: list
+    :raise ValueError: If a line is not a keyframe, or if two keyframes have the same frame
+    """
+    Lkeys = []
+    with open(filename) as f:
+        for line in f:
+            line = line.split("#")[0].split()
+            if line == []:
+                continue
+            if len(line) != 4:
+                raise ValueError("a keyframe is : frame x y scale, not %s" % " ".join(line))
+            frame, x, y, scale = int(line[0]), float(line[1]), float(line[2]), float(line[3])
+            if frame < 0 or scale <= 0:
+                raise ValueError("the frames must be positive and the scales greater than 0")
+            Lkeys.append((frame, x, y, scale))
+    return check_keyframes(Lkeys)
+
+def check_keyframes (keyframes):
+    """
+    :param keyframes: Keyframes (frame, x, y, scale)
+    :type keyframes: list
+    :return: The keyframes by increasing frame
+    :rtype: list
+    :raise ValueError: If there is no keyframe, or if two keyframes have the same frame
+    """
+    Lkeys = sorted(keyframes)
+    if Lkeys == []:
+        raise ValueError("there is no keyframe")
+    if any(a[0] == b[0] for a, b in zip(Lkeys, Lkeys[1:])):
+        raise ValueError("two keyframes have the same frame")
+    return Lkeys
+
+def camera (keyframes, frame):
+    """
+    :param keyframes: Keyframes (frame, x, y, scale), by increasing frame
+    :type keyframes: list
+    :param frame: A frame, between the first and the last keyframe
+    :type frame: int
+    :return: The center and the scale of the frame
+    :rtype: tuple
+    :Example:
+
+    >>> keys = [(0, 0.0, 0.0, 1.0), (10, 10.0, 0.0, 4.0)]
+    >>> [round(v, 6) for v in camera(keys, 5)]
+    [6.666667, 0.0, 2.0]
+    >>> ## Le point (40/3, 0) est au même endroit de l'image dans les deux keyframes, et entre elles
+    >>> [round((40/3 - x) * scale, 6) for x, y, scale in [camera(keys, f) for f in (0, 5, 10)]]
+    [13.333333, 13.333333, 13.333333]
+    """
+    i = max([0] + [j for j, key in enumerate(keyframes) if key[0] <= frame])
+    if i == len(keyframes) - 1:
+        return keyframes[i][1:]
+    (f0, x0, y0, s0), (f1, x1, y1, s1) = keyframes[i], keyframes[i + 1]
+    t = (frame - f0) / (f1 - f0)
+    scale = s0 ** (1 - t) * s1 ** t
+    ## La largeur vue, 1/scale, change comme le centre : le point fixe du zoom reste en place
+    u = t if s0 == s1 else (1 / scale - 1 / s0) / (1 / s1 - 1 / s0)
+    return x0 + u * (x1 - x0), y0 + u * (y1 - y0), scale
+
+def frame_view (keyframes, frame, width, height):
+    """
+    :param keyframes: Keyframes (frame, x, y, scale), by increasing frame
+    :type keyframes: list
+    :param frame: A frame
+    :type frame: int
+    :param width: The width of the images
+    :type width: int
+    :param height: The height of the images
+    :type height: int
+    :return: The viewport of the frame
+    :rtype: viewport
+    :Example:
+
+    >>> view = frame_view([(0, 100.0, 50.0, 2.0)], 0, 400, 200)
+    >>> view["left"], view["top"], view["right"], view["bottom"], view["scale"]
+    (0.0, 0.0, 200.0, 100.0, 2.0)
+    """
+    x, y, scale = camera(keyframes, frame)
+    return vp.make_viewport(x - width / scale / 2, y - height / scale / 2, x + width / scale / 2, y + height / scale / 2, scale)
+
+##############
+## La scène ##
+##############
+
+def make_fractal (x, y, radius, apo_depth, crown_depth, nb_circle):
+    """
+    :param x: The center of first circle
+    :type x: float
+    :param y: The center of first circle
+    :type y: float
+    :param radius: The radius of the first circle
+    :type radius: float
+    :param apo_depth: The depth of the apollonius fractal
+    :type apo_depth: int
+    :param crown_depth: The depth of the crown fractal
+    :type crown_depth: int
+    :param nb_circle: The number of circle in the crown
+    :type nb_circle: int
+    :return: The parameters of the fractal
+    :rtype: dict
+    :UC: radius > 0, apo_depth >= 0, crown_depth >= 1, nb_circle >= 3
+    """
+    return {"x" : x, "y" : y, "radius" : radius, "apo_depth" : apo_depth, "crown_depth" : crown_depth, "nb_circle" : nb_circle}
+
+def make_scene (fractal):
+    """
+    :param fractal: The parameters given by :func:`make_fractal`
+    :type fractal: dict
+    :return: A scene, where only the first circle is known
+    :rtype: scene
+    """
+    root = {"circle" : (fractal["x"], fractal["y"], fractal["radius"]), "depth" : fractal["crown_depth"]}
+    Lcrown = gen.make_crown(cir.make_circle(0j, 1), fractal["nb_circle"])
+    unit = (np.array([complex(cir.get_center(c)) for c in Lcrown[1:]], dtype=complex),
+            np.array([cir.get_radius(c) for c in Lcrown[1:]], dtype=float)) + batch.crown_gaps(Lcrown)
+    return {"fractal" : fractal, "root" : root, "unit" : unit, "computed" : 0}
+
+def __dual_circles (K, W):
+    """
+    :return: The centers and the radii of the circles going through the points of tangency of the gaps,
+             like :func:`apollonian.dual_circle`
+    :rtype: tuple of numpy arrays
+    """
+    a = (W[:, 0] + W[:, 1]) / (K[:, 0] + K[:, 1])
+    b = (W[:, 0] + W[:, 2]) / (K[:, 0] + K[:, 2]) - a
+    c = (W[:, 1] + W[:, 2]) / (K[:, 1] + K[:, 2]) - a
+    d = 2 * (b.real * c.imag - b.imag * c.real)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        center = (c.imag * np.abs(b)**2 - b.imag * np.abs(c)**2 + 1j * (b.real * np.abs(c)**2 - c.real * np.abs(b)**2)) / d
+    radius = np.where(d == 0, np.inf, np.abs(center))
+    return np.where(d == 0, a, a + center), radius
+
+def __seen (x, y, r, view):
+    """
+    :return: The mask of the discs which can be seen in the viewport, like :func:`viewport.intersects`
+    :rtype: numpy array
+    """
+    dx = np.maximum(np.maximum(view["left"] - x, x - view["right"]), 0)
+    dy = np.maximum(np.maximum(view["top"] - y, y - view["bottom"]), 0)
+    return dx * dx + dy * dy <= r * r
+
+def __open_crown (scene, crown):
+    """
+    :Action: Computes the crown inside the circle, the apollonius fractal is only in the frontier
+    """
+    fractal = scene["fractal"]
+    x, y, r = crown["circle"]
+    ## Toutes les couronnes sont la couronne de rayon 1 centrée sur 0, agrandie et déplacée, comme dans templates
+    z, r1, K, W = scene["unit"]
+    c = complex(x, y)
+    crown["z"], crown["r"] = c + r * z, r * r1
+    crown["gap"] = np.full(len(r1), math.inf)
+    K = K / r
+    W = W + K * c
+    crown["children"] = {}
+    __set_frontier(crown, [__make_gaps(K, W, np.full(len(K), fractal["apo_depth"]))])
+    scene["computed"] += len(crown["r"])
+
+def __make_gaps (K, W, D):
+    """
+    :return: The gaps which can still be filled : their curvatures, their curvatures times the centers,
+             their remaining depths and the centers and the radii of their dual circles
+    :rtype: tuple of numpy arrays
+    """
+    alive = D > 0
+    K, W, D = K[alive], W[alive], D[alive]
+    return (K, W, D) + __dual_circles(K, W)
+
+def __set_frontier (crown, Lgaps):
+    """
+    :Action: Puts the gaps in the frontier of the crown
+    """
+    crown["frontier"] = tuple(np.concatenate(column) for column in zip(*Lgaps))
+    K = crown["frontier"][0]
+    ## La plus petite des plus grandes courbures des trous : en dessous de cette échelle, aucun trou ne s'ouvre
+    crown["open"] = np.abs(K[:, :3]).max(axis=1).min() if len(K) else math.inf
+
+def __opened (gaps, kmax, view):
+    """
+    :return: The mask of the gaps whose three circles are bigger than 1/kmax and whose dual circle can be seen
+    :rtype: numpy array
+    """
+    K, W, D, center, radius = gaps
+    return (np.abs(K[:, :3]) < kmax).all(axis=1) & __seen(center.real, center.imag, radius, view)
+
+def __expand (scene, crown, view):
+    """
+    Fills the gaps of the frontier of the crown which can be seen and whose circles are bigger than half a pixel,
+    one generation at a time like :func:`batch.fill_gaps`. Only the new gaps are tested after the first generation,
+    the others stay closed for this viewport.
+
+    :return: The number of new circles
+    :rtype: int
+    """
+    kmax = vp.get_scale(view) / ap.MIN_RADIUS
+    if crown["open"] >= kmax:
+        return 0
+    mask = __opened(crown["frontier"], kmax, view)
+    if not mask.any():
+        return 0
+    Lgaps = [tuple(column[~mask] for column in crown["frontier"])]
+    K, W, D = [column[mask] for column in crown["frontier"][:3]]
+    Lz, Lr, Lgap = [crown["z"]], [crown["r"]], [crown["gap"]]
+    while len(K) != 0:
+        k = 2 * K[:, :3].sum(axis=1) - K[:, 3]
+        w = 2 * W[:, :3].sum(axis=1) - W[:, 3]
+        Lz.append(w / k)
+        Lr.append(1 / k)
+        Lgap.append(1 / np.abs(K[:, :3]).max(axis=1))
+        ## Les trois nouveaux trous : le nouveau cercle remplace un des trois cercles, qui devient l'opposé
+        n = len(K)
+        newK, newW = np.tile(K, (3, 1)), np.tile(W, (3, 1))
+        for j in range(3):
+            newK[j*n:(j+1)*n, 3], newW[j*n:(j+1)*n, 3] = K[:, j], W[:, j]
+            newK[j*n:(j+1)*n, j], newW[j*n:(j+1)*n, j] = k, w
+        gaps = __make_gaps(newK, newW, np.tile(D - 1, 3))
+        mask = __opened(gaps, kmax, view)
+        Lgaps.append(tuple(column[~mask] for column in gaps))
+        K, W, D = [column[mask] for column in gaps[:3]]
+    __set_frontier(crown, Lgaps)
+    crown["z"], crown["r"], crown["gap"] = np.concatenate(Lz), np.concatenate(Lr), np.concatenate(Lgap)
+    total = len(crown["r"]) - len(Lr[0])
+    scene["computed"] += total
+    return total
+
+def render (scene, view, buffer, supersample = 1):
+    """
+    Draws the circles of the fractal seen in the viewport, and brings the scene to this viewport :
+    the new gaps seen are filled, the crowns not seen anymore are forgotten.
+
+    :param scene: A scene given by :func:`make_scene`
+    :type scene: scene
+    :param view: The viewport
+    :type view: viewport
+    :param buffer: The pixels of the image, see :func:`raster.make_buffer`
+    :type buffer: numpy.ndarray
+    :param supersample: (Default value : 1) How many pixels of the buffer make a pixel of the image
+    :type supersample: int
+    :return: The number of circles drawn and the number of circles computed for this viewport
+    :rtype: tuple
+    :Example:
+
+    >>> scene = make_scene(make_fractal(500, 500, 500, 8, 3, 5))
+    >>> view = vp.make_viewport(0, 0, 1000, 1000, 0.5)
+    >>> drawn, computed = render(scene, view, raster.make_buffer(500, 500))
+    >>> computed > 1000, render(scene, view, raster.make_buffer(500, 500)) == (drawn, 0)
+    (True, True)
+    """
+    scale, origin = vp.get_scale(view), vp.get_origin(view)
+    computed = scene["computed"]
+    x, y, r = scene["root"]["circle"]
+    raster.draw_circles(buffer, [x], [y], [r], scale * supersample, origin, supersample)
+    drawn = 1
+    stack = [scene["root"]]
+    Lwaiting, waiting = [], 0
+    while stack != []:
+        crown = stack.pop()
+        if "z" not in crown:
+            __open_crown(scene, crown)
+        __expand(scene, crown, view)
+        z, r = crown["z"], crown["r"]
+        ## Les cercles calculés pour une plus grande échelle, dont le trou est maintenant trop petit, ne sont pas vus
+        seen = __seen(z.real, z.imag, r, view) & (crown["gap"] * scale > ap.MIN_RADIUS)
+        Lwaiting.append((z.real[seen], z.imag[seen], r[seen]))
+        waiting += len(Lwaiting[-1][2])
+        if waiting >= CHUNK:  ## Les petites couronnes sont dessinées ensemble
+            raster.draw_circles(buffer, *[np.concatenate(column) for column in zip(*Lwaiting)], scale * supersample, origin, supersample)
+            drawn, Lwaiting, waiting = drawn + waiting, [], 0
+        ## Les couronnes qui ne sont plus vues sont oubliées, les autres sont gardées
+        children = {}
+        if crown["depth"] > 1:
+            for i in np.flatnonzero(seen & (r * scale > 1)).tolist():
+                children[i] = crown["children"].get(i) or {"circle" : (z[i].real, z[i].imag, r[i]), "depth" : crown["depth"] - 1}
+                stack.append(children[i])
+        crown["children"] = children
+    if Lwaiting != []:
+        raster.draw_circles(buffer, *[np.concatenate(column) for column in zip(*Lwaiting)], scale * supersample, origin, supersample)
+        drawn += waiting
+    return drawn, scene["computed"] - computed
+
+####################
+## Les animations ##
+####################
+
+def frame_name (prefix, frame):
+    """
+    :return: The name of the image of the frame
+    :rtype: str
+    :Example:
+
+    >>> frame_name("zoom", 42)
+    'zoom_00042.png'
+    """
+    return "%s_%05d.png" % (prefix, frame)
+
+def render_frames (fractal, keyframes, frames, width, height, prefix, supersample = 1):
+    """
+    Draws frames one after the other in the same scene. It is the work of a process of :func:`animate`.
+
+    :param fractal: The parameters given by :func:`make_fractal`
+    :type fractal: dict
+    :param keyframes: Keyframes (frame, x, y, scale), by increasing frame
+    :type keyframes: list
+    :param frames: The frames, each one close to the one before it
+    :type frames: iterable of int
+    :param width: The width of the images
+    :type width: int
+    :param height: The height of the images
+    :type height: int
+    :param prefix: The beginning of the names of the images, see :func:`frame_name`
+    :type prefix: str
+    :param supersample: (Default value : 1) How many times bigger the frames are drawn, then smoothed
+    :type supersample: int
+    :return: For each frame, the frame, the number of circles drawn and the number of circles computed
+    :rtype: list
+    """
+    scene = make_scene(fractal)
+    Lcounts = []
+    for frame in frames:
+        buffer = raster.make_buffer(width, height, supersample)
+        drawn, computed = render(scene, frame_view(keyframes, frame, width, height), buffer, supersample)
+        with open(frame_name(prefix, frame), "wb") as f:
+            f.write(raster.encode_png(buffer, supersample))
+        Lcounts.append((frame, drawn, computed))
+    return Lcounts
+
+def __render_chunk (task):
+    """
+    :return: The counts of :func:`render_frames` for a task of :func:`animate`
+    :rtype: list
+    """
+    return render_frames(*task)
+
+def animate (fractal, keyframes, width, height, prefix, workers = 1, chunks = None, supersample = 1, progress = None):
+    """
+    Draws all the frames from the first keyframe to the last one.
+
+    :param fractal: The parameters given by :func:`make_fractal`
+    :type fractal: dict
+    :param keyframes: Keyframes (frame, x, y, scale)
+    :type keyframes: list
+    :param width: The width of the images
+    :type width: int
+    :param height: The height of the images
+    :type height: int
+    :param prefix: The beginning of the names of the images, see :func:`frame_name`
+    :type prefix: str
+    :param workers: (Default value : 1) The number of processes
+    :type workers: int
+    :param chunks: (Default value : None) The number of runs of following frames, each one drawn in its own scene,
+                   `workers` if None
+    :type chunks: int
+    :param supersample: (Default value : 1) How many times bigger the frames are drawn, then smoothed
+    :type supersample: int
+    :param progress: (Default value : None) A function called with the counts of :func:`render_frames` of each run drawn
+    :type progress: function
+    :return: The number of frames
+    :rtype: int
+    :raise ValueError: If there is no keyframe, or if two keyframes have the same frame
+    """
+    keyframes = check_keyframes(keyframes)
+    frames = list(range(keyframes[0][0], keyframes[-1][0] + 1))
+    chunks = max(1, min(len(frames), workers if chunks is None else chunks))
+    directory = os.path.dirname(prefix)
+    if directory != "":
+        os.makedirs(directory, exist_ok=True)
+    ## Des suites de frames qui se suivent, pour que chaque scène serve à la frame suivante
+    Ltasks = [(fractal, keyframes, frames[i * len(frames) // chunks:(i + 1) * len(frames) // chunks], width, height, prefix, supersample)
+              for i in range(chunks)]
+    if workers <= 1:
+        results = map(__render_chunk, Ltasks)
+    else:
+        import parallel
+        pool = parallel.make_pool(workers)
+        results = pool.imap_unordered(__render_chunk, Ltasks)
+    try:
+        for counts in results:
+            if progress is not None:
+                progress(counts)
+    finally:
+        if workers > 1:
+            pool.terminate()
+    return len(frames)
@@ -0,0 +1,326 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`apollonian` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module implements the Apollonius fractal with the Descartes reflection rule.
+
+In a gap between three tangent circles, the new circle and the circle on the
+other side of the gap are the two solutions of the Descartes theorem, so
+their curvatures (and their curvatures times their centers) sum to twice the
+ones of the three circles. Once the first circle of a gap is known, every
+other circle follows from its parents with a few additions :
+
+* k = 2 (k1 + k2 + k3) - k4
+* k*z = 2 (k1*z1 + k2*z2 + k3*z3) - k4*z4
+
+A gap is stored as four couples (curvature, curvature × center), the three
+circles of the gap first and the opposite circle last.
+
+To fill the fractal one has to:
+
+* fill a gap with :func:`fill_gap`
+* or fill a whole crown with :func:`apollonius`
+
+To get the circles one after the other without keeping them, use
+:func:`iter_gap` and :func:`iter_apollonius`, or :func:`walk_gap` to get
+the curvatures and the size of the gap of each circle.
+
+All these functions can be given a viewport (see :mod:`viewport`) : a gap is
+then filled only if its circles are bigger than 0.5 pixel and if the circle
+going through its three points of tangency (which contains the whole gap)
+can be seen, and only the circles which can be seen are given.
+
+.. topic:: This module uses functions from : :mod:`points`,  :mod:`circles` and :mod:`soddy` :
+
+    #. From :mod:`points` :
+        * :func:`points.dist`
+    #. From :mod:`circles` :
+        * :func:`circles.make_circle`
+        * :func:`circles.add_circle`
+        * :func:`circles.get_center`
+        * :func:`circles.get_radius`
+    #. From :mod:`soddy` :
+        * :func:`soddy.descartes_curvature`
+        * :func:`soddy.descartes_center`
+    #. From :mod:`viewport` :
+        * :func:`viewport.get_scale`
+        * :func:`viewport.intersects`
+    #. From :mod:`stats` :
+        * :func:`stats.count`
+"""
+
+import points   as pt
+import circles  as cir
+import soddy    as so
+import viewport as vp
+import stats    as st
+import math
+
+MIN_RADIUS = 0.5
+
+def __tangency_error(k, z, triple):
+    """
+    :param k: The curvature of the candidate circle
+    :type k: float
+    :param z: The center of the candidate circle
+    :type z: point
+    :param triple: The three circles of the gap with their signed curvature
+    :type triple: tuple
+    :return: How far the candidate circle is from being tangent to the three circles
+    :rtype: float
+    """
+    error = 0
+    for circle, ki in triple:
+        error += math.fabs(pt.dist(z, cir.get_center(circle)) - math.fabs(1/k + 1/ki))
+    return error
+
+def make_gap (c1, c2, c3):
+    """
+    Solves the Descartes theorem once for the three circles and builds their gap.
+
+    Among the four candidate centers, the one which is the closest to be
+    tangent to the three circles is kept, so there is always a solution.
+
+    :param c1:
+    :type c1: circle
+    :param c2:
+    :type c2: circle
+    :param c3:
+    :type c3: circle
+    :return: The gap between the three circles, the opposite circle is the great Soddy circle
+    :rtype: tuple
+    """
+    k1, k2, k3, k4 = so.descartes_curvature(c1, c2, c3)
+    z1, z2, z3 = cir.get_center(c1), cir.get_center(c2), cir.get_center(c3)
+    Tcenter = so.descartes_center(k1, k2, k3, k4, z1, z2, z3)
+    k, k_opp = max(k4), min(k4)
+    triple = ((c1, k1), (c2, k2), (c3, k3))
+    z = min(Tcenter[:2] if k == k4[0] else Tcenter[2:],
+            key = lambda z : __tangency_error(k, z, triple))
+    ## Le cercle opposé vérifie k + k_opp = 2 (k1 + k2 + k3), pareil pour k*z
+    w = k * z
+    w_opp = 2 * (k1*z1 + k2*z2 + k3*z3) - w
+    return ((k1, k1*z1), (k2, k2*z2), (k3, k3*z3), (k_opp, w_opp)), (k, w)
+
+def child (gap):
+    """
+    :param gap: A gap
+    :type gap: tuple
+    :return: The curvature and the curvature times the center of the circle inside the gap
+    :rtype: tuple
+    """
+    (k1, w1), (k2, w2), (k3, w3), (k4, w4) = gap
+    return (2*(k1 + k2 + k3) - k4, 2*(w1 + w2 + w3) - w4)
+
+def split_gap (gap, new):
+    """
+    :param gap: A gap
+    :type gap: tuple
+    :param new: The circle inside the gap, given by :func:`child`
+    :type new: tuple
+    :return: The three gaps around the circle `new`, in the order of :func:`fractals.soddy_fract`
+    :rtype: tuple
+    """
+    g1, g2, g3, g4 = gap
+    return ((new, g2, g3, g1), (g1, new, g3, g2), (g1, g2, new, g3))
+
+def dual_circle (gap):
+    """
+    :param gap: A gap
+    :type gap: tuple
+    :return: The center and the radius of the circle going through the three points of tangency of the gap,
+             every circle inside the gap is inside this circle
+    :rtype: tuple
+    :Example:
+
+    >>> c1 = cir.make_circle(pt.make_point(0, 0), 1)
+    >>> c2 = cir.make_circle(pt.make_point(2, 0), 1)
+    >>> c3 = cir.make_circle(pt.make_point(1, math.sqrt(3)), 1)
+    >>> center, radius = dual_circle(make_gap(c1, c2, c3)[0])
+    >>> abs(center - pt.make_point(1, 1/math.sqrt(3))) < 1e-9, abs(radius - 1/math.sqrt(3)) < 1e-9
+    (True, True)
+    """
+    (k1, w1), (k2, w2), (k3, w3) = gap[0], gap[1], gap[2]
+    ## Le point de contact de deux cercles tangents est (k1*z1 + k2*z2) / (k1 + k2)
+    a = (w1 + w2) / (k1 + k2)
+    b = (w1 + w3) / (k1 + k3) - a
+    c = (w2 + w3) / (k2 + k3) - a
+    d = 2 * (b.real * c.imag - b.imag * c.real)
+    if d == 0:
+        return a, math.inf
+    center = complex(c.imag * abs(b)**2 - b.imag * abs(c)**2, b.real * abs(c)**2 - c.real * abs(b)**2) / d
+    return a + center, abs(center)
+
+def is_visible (gap, view):
+    """
+    :param gap: A gap
+    :type gap: tuple
+    :param view: A viewport, or None
+    :type view: viewport
+    :return: True if a part of the gap can be seen in the viewport
+    :rtype: bool
+    """
+    if view is None:
+        return True
+    center, radius = dual_circle(gap)
+    return vp.intersects(view, center, radius)
+
+def __seen (kw, view):
+    """
+    :return: True if the circle given by its curvature and curvature times center can be seen
+    :rtype: bool
+    """
+    k, w = kw
+    return view is None or vp.intersects(view, w/k, math.fabs(1/k))
+
+def to_circle (kw):
+    """
+    :param kw: A curvature and the curvature times the center of a circle
+    :type kw: tuple
+    :return: The circle
+    :rtype: circle
+    """
+    k, w = kw
+    return cir.make_circle(w/k, math.fabs(1/k))
+
+def is_open (gap, min_radius = MIN_RADIUS):
+    """
+    :param gap: A gap
+    :type gap: tuple
+    :param min_radius: (Default value : 0.5) The smallest radius of a circle worth filling
+    :type min_radius: float
+    :return: True if the three circles of the gap are big enough to be filled
+    :rtype: bool
+    """
+    kmax = 1 / min_radius
+    return math.fabs(gap[0][0]) < kmax and math.fabs(gap[1][0]) < kmax and math.fabs(gap[2][0]) < kmax
+
+def walk_gap (c1, c2, c3, depth, min_radius = MIN_RADIUS, view = None, counted = True):
+    """
+    Walks through the apollonius fractal between 3 circles, in the order of :func:`fractals.soddy_fract`.
+
+    :param depth: The depth of the fractal
+    :type depth: int
+    :param min_radius: (Default value : 0.5) A gap is filled only if its three circles are bigger
+    :type min_radius: float
+    :param view: (Default value : None) If given, `min_radius` is in pixels of the viewport,
+                 the gaps and the circles out of the viewport are forgotten
+    :type view: viewport
+    :param counted: (Default value : True) If False, the gaps left are not counted in the stats of :mod:`stats`
+    :type counted: bool
+    :return: For each new circle, its curvature and curvature times center, its apollonius generation
+             and the radius of the smallest circle of the gap it fills
+    :rtype: generator of tuples
+    """
+    if view is not None:
+        min_radius = min_radius / vp.get_scale(view)
+    r_min = min(cir.get_radius(c1), cir.get_radius(c2), cir.get_radius(c3))
+    if depth != 0 and r_min <= min_radius and counted:
+        st.count("pruned_size")
+    if depth != 0 and r_min > min_radius:
+        gap, new = make_gap(c1, c2, c3)
+        if not is_visible(gap, view):
+            if counted:
+                st.count("pruned_view")
+            return
+        if __seen(new, view):
+            yield new, 1, r_min
+        ## Une pile explicite à la place de la récursivité, dans le même ordre que soddy_fract
+        stack = [(g, depth - 1, 2) for g in reversed(split_gap(gap, new))]
+        kmax = 1 / min_radius
+        pruned_size = pruned_view = 0  ## Comptés ici, puis ajoutés aux stats une seule fois
+        try:
+            while stack != []:
+                gap, depth, generation = stack.pop()
+                if depth == 0:
+                    continue
+                k = max(math.fabs(gap[0][0]), math.fabs(gap[1][0]), math.fabs(gap[2][0]))
+                if k >= kmax:
+                    pruned_size += 1
+                elif not is_visible(gap, view):
+                    pruned_view += 1
+                else:
+                    new = child(gap)
+                    if __seen(new, view):
+                        yield new, generation, 1 / k
+                    stack += [(g, depth - 1, generation + 1) for g in reversed(split_gap(gap, new))]
+        finally:
+            if counted:
+                st.count("pruned_size", pruned_size)
+                st.count("pruned_view", pruned_view)
+
+def iter_gap (c1, c2, c3, depth, view = None):
+    """
+    Gives the circles of the apollonius fractal between 3 circles one after the other.
+    The memory used only depends on the depth of the fractal, not on the number of circles.
+
+    :param depth: The depth of the fractal
+    :type depth: int
+    :param view: (Default value : None) If given, only the circles seen in this viewport
+    :type view: viewport
+    :return: The same circles, in the same order, as :func:`fill_gap`
+    :rtype: generator
+    """
+    for new, generation, r_min in walk_gap(c1, c2, c3, depth, view = view):
+        yield to_circle(new)
+
+def fill_gap (L, c1, c2, c3, depth, view = None):
+    """
+    Fills the space between 3 circles with the apollonius fractal.
+    It gives the same circles, in the same order, as :func:`fractals.soddy_fract`.
+
+    :param L: A list generate with the :func:`fractals.make_crown` function
+    :type L: list or CircleArray
+    :param depth: The depth of the fractal
+    :type depth: int
+    :param view: (Default value : None) If given, only the circles seen in this viewport
+    :type view: viewport
+    :Action: add the new circles at the end of the list L
+    """
+    for new, generation, r_min in walk_gap(c1, c2, c3, depth, view = view):
+        cir.add_circle(L, to_circle(new), generation = generation)
+
+def iter_apollonius (L, depth, view = None):
+    """
+    Gives the circles of the apollonius fractal of a crown one after the other.
+
+    :param L: A list generate with the :func:`fractals.make_crown` function
+    :type L: list or CircleArray
+    :param depth: The depth of the fractal
+    :type depth: int
+    :param view: (Default value : None) If given, only the circles seen in this viewport
+    :type view: viewport
+    :return: The same circles, in the same order, as :func:`apollonius`, L is not changed
+    :rtype: generator
+    """
+    lenL = len(L)
+    yield from iter_gap(L[0], L[lenL-1], L[2], depth, view)
+    yield from iter_gap(L[1], L[lenL-1], L[2], depth, view)
+    for i in range(2, lenL - 1):
+        yield from iter_gap(L[0], L[i], L[i+1], depth, view)
+        yield from iter_gap(L[1], L[i], L[i+1], depth, view)
+
+def apollonius (L, depth, view = None):
+    """
+    Fills a crown with the apollonius fractal.
+    It gives the same circles, in the same order, as :func:`fractals.apollonius`.
+
+    :param L: A list generate with the :func:`fractals.make_crown` function
+    :type L: list or CircleArray
+    :param depth: The depth of the fractal
+    :type depth: int
+    :param view: (Default value : None) If given, only the circles seen in this viewport
+    :type view: viewport
+    """
+    lenL = len(L)
+    fill_gap(L, L[0], L[lenL-1], L[2], depth, view)
+    fill_gap(L, L[1], L[lenL-1], L[2], depth, view)
+    for i in range(2, lenL - 1):
+        fill_gap(L, L[0], L[i], L[i+1], depth, view)
+        fill_gap(L, L[1], L[i], L[i+1], depth, view)
@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`batch` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module fills the apollonius fractal one generation at a time with :mod:`numpy`.
+
+All the open gaps of a generation are kept in two arrays of shape (n, 4) :
+the curvatures and the curvatures times the centers (as complex numbers) of
+the three circles of each gap and of the opposite circle, like in
+:mod:`apollonian`. The circles of the next generation are computed for every
+gap at once with the Descartes reflection rule, and the gaps whose circles are
+too small are removed with a mask and counted in the stats of :mod:`stats`.
+
+The circles are the same as the ones of :func:`fractals.apollonius`, but they
+are given generation after generation instead of gap after gap.
+
+To fill the fractal one has to:
+
+* get the gaps of a crown with :func:`crown_gaps`
+* fill them with :func:`fill_gaps`
+* or do both and add the circles to the crown with :func:`apollonius`
+* or get them one after the other with :func:`iter_apollonius`
+
+.. topic:: This module uses functions from : :mod:`circles`, :mod:`apollonian`, :mod:`generator` and :mod:`stats` :
+
+    #. From :mod:`circles` :
+        * :func:`circles.make_circle`
+        * :class:`circles.CircleArray`
+    #. From :mod:`apollonian` :
+        * :func:`apollonian.make_gap`
+    #. From :mod:`generator` :
+        * :func:`generator.crown_gaps`
+    #. From :mod:`stats` :
+        * :func:`stats.count`
+"""
+
+import numpy    as np
+import circles  as cir
+import apollonian as ap
+import generator as gen
+import stats    as st
+
+def crown_gaps (L):
+    """
+    :param L: A list generate with the :func:`fractals.make_crown` function
+    :type L: list
+    :return: The curvatures and the curvatures times the centers of the gaps of the crown,
+             in the order of :func:`generator.crown_gaps`
+    :rtype: tuple
+    """
+    return make_gaps(gen.crown_gaps(L))
+
+def make_gaps (triples):
+    """
+    :param triples: Triples of tangent circles
+    :type triples: list
+    :return: The curvatures and the curvatures times the centers of the gaps between the circles
+    :rtype: tuple
+    """
+    K = np.empty((len(triples), 4))
+    W = np.empty((len(triples), 4), dtype=complex)
+    for i, triple in enumerate(triples):
+        gap, new = ap.make_gap(*triple)
+        K[i] = [k for k, w in gap]
+        W[i] = [w for k, w in gap]
+    return K, W
+
+def fill_gaps (K, W, depth, min_radius = ap.MIN_RADIUS):
+    """
+    Fills the gaps with the apollonius fractal, one generation at a time.
+
+    :param K: The curvatures of the gaps, given by :func:`crown_gaps`
+    :type K: numpy.ndarray
+    :param W: The curvatures times the centers of the gaps
+    :type W: numpy.ndarray
+    :param depth: The depth of the fractal
+    :type depth: int
+    :param min_radius: (Default value : 0.5) The smallest radius of a circle worth filling
+    :type min_radius: float
+    :return: The curvatures, the curvatures times the centers and the generations of all the new circles
+    :rtype: tuple
+    """
+    kmax = 1 / min_radius
+    Lk, Lw, Lg = [], [], []
+    while depth != 0 and len(K) != 0:
+        mask = (np.abs(K[:, :3]) < kmax).all(axis=1)
+        st.count("pruned_size", len(mask) - int(mask.sum()))
+        K, W = K[mask], W[mask]
+        k = 2 * K[:, :3].sum(axis=1) - K[:, 3]
+        w = 2 * W[:, :3].sum(axis=1) - W[:, 3]
+        Lk.append(k)
+        Lw.append(w)
+        Lg.append(np.full(len(k), len(Lg) + 1, dtype=np.int32))
+        ## Les trois nouveaux trous : le nouveau cercle remplace un des trois cercles, qui devient l'opposé
+        n = len(K)
+        newK, newW = np.tile(K, (3, 1)), np.tile(W, (3, 1))
+        for j in range(3):
+            newK[j*n:(j+1)*n, 3], newW[j*n:(j+1)*n, 3] = K[:, j], W[:, j]
+            newK[j*n:(j+1)*n, j], newW[j*n:(j+1)*n, j] = k, w
+        K, W = newK, newW
+        depth -= 1
+    if Lk == []:
+        return np.empty(0), np.empty(0, dtype=complex), np.empty(0, dtype=np.int32)
+    return np.concatenate(Lk), np.concatenate(Lw), np.concatenate(Lg)
+
+def apollonius (L, depth):
+    """
+    Fills a crown with the apollonius fractal.
+    It gives the same circles as :func:`fractals.apollonius`, generation after generation.
+
+    :param L: A list generate with the :func:`fractals.make_crown` function
+    :type L: list or CircleArray
+    :param depth: The depth of the fractal
+    :type depth: int
+    :Action: add the new circles at the end of the list L
+    """
+    k, w, g = fill_gaps(*crown_gaps(L), depth)
+    z = w / k
+    if isinstance(L, cir.CircleArray):
+        L.extend_columns(z.real, z.imag, 1 / k, generation = g)
+    else:
+        L += [cir.make_circle(complex(c), float(r)) for c, r in zip(z, 1 / k)]
+
+def iter_apollonius (L, depth):
+    """
+    Gives the circles of the apollonius fractal of a crown one after the other.
+    The circles of the crown are computed at once, only the conversion is lazy.
+
+    :param L: A list generate with the :func:`fractals.make_crown` function
+    :type L: list or CircleArray
+    :param depth: The depth of the fractal
+    :type depth: int
+    :return: The same circles as :func:`apollonius`, L is not changed
+    :rtype: generator
+    """
+    k, w, g = fill_gaps(*crown_gaps(L), depth)
+    for c, r in zip(w / k, 1 / k):
+        yield cir.make_circle(complex(c), float(r))
+
+def iter_gap (c1, c2, c3, depth):
+    """
+    Gives the circles of the apollonius fractal between 3 circles one after the other.
+    The circles of the gap are computed at once, only the conversion is lazy.
+
+    :param depth: The depth of the fractal
+    :type depth: int
+    :return: The same circles as :func:`apollonian.iter_gap`, generation after generation
+    :rtype: generator
+    """
+    k, w, g = fill_gaps(*make_gaps([(c1, c2, c3)]), depth)
+    for c, r in zip(w / k, 1 / k):
+        yield cir.make_circle(complex(c), float(r))
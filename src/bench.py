@@ -0,0 +1,473 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`bench` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module times the computation of the circles and the drawing of the fractal, to know if a change makes them faster.
+
+Each benchmark is a function giving the number of circles it computes or
+draws (or the number of calls for the functions computing one circle). It
+is run once to fill the caches, then :data:`REPEAT` times : the best time
+gives the number of circles per second. Then it is run once more with :mod:`tracemalloc`, which is slow, to
+know the peak of the memory used.
+
+The benchmarks are :
+
+* geometry : :func:`soddy.small_soddy`, :func:`soddy.soddy`, :func:`soddy.descartes_curvature`
+  and :func:`fractals.make_crown`
+* generation : :func:`fractals.soddy_fract`, :func:`fractals.apollonius` with each engine (the template
+  engine with an empty cache, then with the template already made, as template/warm), and
+  :func:`fractals.final` for each depth and number of circles of the preset, then
+  :func:`census.census_final` for the same fractals
+* rendering : the same circles drawn by each backend of :mod:`fractals`
+
+The results are saved in a JSON file. Two files can be compared : the
+benchmarks more than `threshold` slower in the second file are regressions.
+
+To use the benchmarks one has to:
+
+* run them with :func:`run` and save the results with :func:`save`
+* or run ``bench.py [--preset quick|full] [--repeat N] [--only TEXT] [--output FILE]``
+* compare two files with :func:`compare`, or with ``bench.py --compare OLD NEW [--threshold T]``
+
+.. topic:: This module uses functions from : :mod:`points`, :mod:`circles`, :mod:`soddy`, :mod:`fractals`, :mod:`census`, :mod:`raster`, :mod:`tiles`, :mod:`vector` and :mod:`circlefile` :
+
+    #. From :mod:`points` :
+        * :func:`points.make_point`
+    #. From :mod:`circles` :
+        * :func:`circles.make_circle`
+        * :class:`circles.CircleArray`
+    #. From :mod:`soddy` :
+        * :func:`soddy.soddy`
+        * :func:`soddy.small_soddy`
+        * :func:`soddy.descartes_curvature`
+    #. From :mod:`fractals` :
+        * :func:`fractals.make_crown`
+        * :func:`fractals.soddy_fract`
+        * :func:`fractals.apollonius`
+        * :func:`fractals.final`
+        * :func:`fractals.iter_final`
+    #. From :mod:`census` :
+        * :func:`census.census_final`
+    #. From :mod:`raster` (needs :mod:`numpy`) :
+        * :func:`raster.make_buffer`
+        * :func:`raster.draw_stream`
+        * :func:`raster.save_png`
+    #. From :mod:`tiles` (needs :mod:`numpy`) :
+        * :func:`tiles.make_canvas`
+        * :func:`tiles.draw_stream`
+        * :func:`tiles.save_png`
+    #. From :mod:`vector` :
+        * :func:`vector.write_svg`
+        * :func:`vector.write_pdf`
+    #. From :mod:`circlefile` :
+        * :func:`circlefile.save`
+    #. From :mod:`templates` (needs :mod:`numpy`) :
+        * :func:`templates.template`
+"""
+
+import sys
+import os
+import points   as pt
+import circles  as cir
+import soddy    as so
+import fractals as fr
+import census
+import vector
+import circlefile
+import contextlib
+import functools
+import gc
+import itertools
+import json
+import math
+import platform
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+REPEAT = 3
+THRESHOLD = 0.1
+CALLS = 10000
+PRESETS = {"quick" : {"size" : 500, "apo_depth" : (5, 1000), "crown_depth" : (1, 2), "nb_circle" : (3, 5)},
+           "full" : {"size" : 1000, "apo_depth" : (5, 20, 1000), "crown_depth" : (1, 2, 3), "nb_circle" : (3, 5, 10)}}
+
+############################
+## Mesure d'un benchmark ##
+############################
+
+def measure (function, repeat = REPEAT, memory = True):
+    """
+    :param function: A function without parameters giving the number of circles it computes or draws
+    :type function: function
+    :param repeat: (Default value : 3) The number of runs timed, after a first run which is not timed
+    :type repeat: int
+    :param memory: (Default value : True) If True, the function is run once more to know the peak of the memory
+    :type memory: bool
+    :return: The best and the mean time in seconds, the number of circles, the number of circles per second
+             and the peak of the memory used in bytes (None if not measured)
+    :rtype: dict
+    :Example:
+
+    >>> result = measure(lambda: len([i for i in range(1000)]), repeat = 2)
+    >>> result["count"], result["repeat"], result["peak"] > 0
+    (1000, 2, True)
+    """
+    Ltimes = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):  ## Sans l'avancement de final
+        function()
+        for i in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            count = function()
+            Ltimes.append(time.perf_counter() - start)
+        peak = None
+        if memory:
+            gc.collect()
+            tracemalloc.start()
+            function()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    best = min(Ltimes)
+    return {"best" : best, "mean" : sum(Ltimes) / repeat, "repeat" : repeat, "count" : count,
+            "rate" : count / best if best > 0 else None, "peak" : peak}
+
+#####################
+## Les benchmarks ##
+#####################
+
+def __triple ():
+    """
+    :return: Three tangent circles of radius 1
+    :rtype: tuple
+    """
+    return (cir.make_circle(pt.make_point(0, 0), 1), cir.make_circle(pt.make_point(2, 0), 1),
+            cir.make_circle(pt.make_point(1, math.sqrt(3)), 1))
+
+def __calls (function, *parameters):
+    """
+    :return: A benchmark calling the function :data:`CALLS` times
+    :rtype: function
+    """
+    def run():
+        for i in range(CALLS):
+            function(*parameters)
+        return CALLS
+    return run
+
+def __make_crown (nb_circle):
+    """
+    :return: A benchmark making :data:`CALLS` crowns
+    :rtype: function
+    """
+    circle = cir.make_circle(pt.make_point(500, 500), 500)
+    def run():
+        for i in range(CALLS):
+            fr.make_crown(circle, nb_circle)
+        return CALLS * (nb_circle + 1)
+    return run
+
+def __soddy_fract (size, depth):
+    """
+    :return: A benchmark filling a gap of a crown of 5 circles with :func:`fractals.soddy_fract`
+    :rtype: function
+    """
+    def run():
+        L = fr.make_crown(cir.make_circle(pt.make_point(size / 2, size / 2), size / 2), 5, compact = True)
+        n = len(L)
+        fr.soddy_fract(L, L[0], L[n-1], L[2], depth)
+        return len(L) - n
+    return run
+
+def __apollonius (size, depth, engine, cold = True):
+    """
+    :return: A benchmark filling a crown of 5 circles with :func:`fractals.apollonius` and the engine. With the
+             template engine, the cache of :func:`templates.template` is emptied before each run if `cold`,
+             otherwise each run only copies the template of the first run.
+    :rtype: function
+    """
+    def run():
+        if engine == "template" and cold:
+            import templates
+            templates.template.cache_clear()
+        fr.Gengine = engine
+        L = fr.make_crown(cir.make_circle(pt.make_point(size / 2, size / 2), size / 2), 5, compact = True)
+        n = len(L)
+        fr.apollonius(L, depth)
+        return len(L) - n
+    return run
+
+class __Counter:
+    """
+    Takes the place of the drawing of :mod:`PIL` in :func:`fractals.final`, and only counts the circles.
+    """
+    def __init__(self):
+        self.count = 0
+    def ellipse(self, box, outline = None):
+        self.count += 1
+
+def __final (size, apo_depth, crown_depth, nb_circle):
+    """
+    :return: A benchmark computing the whole fractal with :func:`fractals.final`
+    :rtype: function
+    """
+    def run():
+        counter = __Counter()
+        fr.Gengine, fr.Gnb_circle, fr.Gcrown_depth, fr.Gview = "soddy", nb_circle, crown_depth, None
+        fr.save_frac, fr.draw = 1, counter
+        fr.final(size / 2 + 2, size / 2 + 2, size / 2, apo_depth, crown_depth, nb_circle)
+        return counter.count
+    return run
+
+def __census (size, apo_depth, crown_depth, nb_circle):
+    """
+    :return: A benchmark counting the circles of the whole fractal with :func:`census.census_final`
+    :rtype: function
+    """
+    def run():
+        counted = census.census_final(size / 2 + 2, size / 2 + 2, size / 2, apo_depth, crown_depth, nb_circle)
+        return sum(counted["circles"].values())
+    return run
+
+@functools.lru_cache(maxsize = 4)
+def __circles (size):
+    """
+    :return: The circles drawn by the rendering benchmarks
+    :rtype: CircleArray
+    """
+    fr.Gengine, fr.Gnb_circle = "soddy", 5
+    return cir.CircleArray(list(fr.iter_final(size / 2 + 2, size / 2 + 2, size / 2, 1000, 2, 5, verbose = False)))
+
+def __render (backend, size, directory):
+    """
+    :return: A benchmark drawing the circles with the backend and saving the image in the directory
+    :rtype: function
+    """
+    name = os.path.join(directory, "bench")
+    def run():
+        L = __circles(size)
+        if backend == "pil":
+            from PIL import Image, ImageDraw
+            image = Image.new("RGB", (size, size), (255, 255, 255))
+            draw = ImageDraw.Draw(image)
+            for x, y, r in zip(L.x, L.y, L.r):
+                draw.ellipse((x - r, y - r, x + r, y + r), outline = "black")
+            image.save(name + ".png")
+        elif backend == "numpy":
+            import raster
+            buffer = raster.make_buffer(size, size)
+            raster.draw_stream(buffer, L)
+            raster.save_png(buffer, name + ".png")
+        elif backend == "tiles":
+            import tiles
+            canvas = tiles.make_canvas(name + ".tiles", size, size, 256)
+            tiles.draw_stream(canvas, L)
+            tiles.save_png(canvas, name + ".png")
+            os.remove(canvas["filename"])
+        elif backend in ("svg", "svgz"):
+            vector.write_svg(name + "." + backend, L, size, size)
+        elif backend == "pdf":
+            vector.write_pdf(name + ".pdf", L, size, size)
+        elif backend == "circles":
+            circlefile.save(name + ".circles", L)
+        return len(L)
+    return run
+
+def __needs (backend):
+    """
+    :return: The module the backend needs, None if it is installed
+    :rtype: str
+    """
+    modules = {"pil" : "PIL", "numpy" : "numpy", "tiles" : "numpy", "batch" : "numpy", "symmetric" : "numpy", "template" : "numpy"}
+    if backend not in modules:
+        return None
+    try:
+        __import__(modules[backend])
+    except ImportError:
+        return modules[backend]
+    return None
+
+def benchmarks (preset = "quick", directory = None):
+    """
+    :param preset: (Default value : "quick") The name of the sizes and the depths of :data:`PRESETS`
+    :type preset: str
+    :param directory: (Default value : None) The directory of the images drawn by the rendering benchmarks
+    :type directory: str
+    :return: The name, the parameters and the function of each benchmark, and the module it needs
+             (None if it is installed)
+    :rtype: list of tuples
+    """
+    grid = PRESETS[preset]
+    size = grid["size"]
+    triple = __triple()
+    L = [("geometry/small_soddy", {}, __calls(so.small_soddy, *triple), None),
+         ("geometry/soddy", {}, __calls(so.soddy, *triple), None),
+         ("geometry/descartes_curvature", {}, __calls(so.descartes_curvature, *triple), None)]
+    for nb_circle in grid["nb_circle"]:
+        L.append(("geometry/make_crown/n=%d" % nb_circle, {"nb_circle" : nb_circle}, __make_crown(nb_circle), None))
+    L.append(("generation/soddy_fract", {"size" : size, "depth" : 1000}, __soddy_fract(size, 1000), None))
+    for engine in ("soddy", "descartes", "batch", "symmetric", "template"):
+        L.append(("generation/apollonius/%s" % engine, {"size" : size, "depth" : 1000, "engine" : engine},
+                  __apollonius(size, 1000, engine), __needs(engine)))
+    L.append(("generation/apollonius/template/warm", {"size" : size, "depth" : 1000, "engine" : "template"},
+              __apollonius(size, 1000, "template", cold = False), __needs("template")))
+    for apo_depth, crown_depth, nb_circle in itertools.product(grid["apo_depth"], grid["crown_depth"], grid["nb_circle"]):
+        parameters = {"size" : size, "apo_depth" : apo_depth, "crown_depth" : crown_depth, "nb_circle" : nb_circle}
+        L.append(("generation/final/a=%d,c=%d,n=%d" % (apo_depth, crown_depth, nb_circle), parameters,
+                  __final(size, apo_depth, crown_depth, nb_circle), None))
+    for apo_depth, crown_depth, nb_circle in itertools.product(grid["apo_depth"], grid["crown_depth"], grid["nb_circle"]):
+        parameters = {"size" : size, "apo_depth" : apo_depth, "crown_depth" : crown_depth, "nb_circle" : nb_circle}
+        L.append(("generation/census/a=%d,c=%d,n=%d" % (apo_depth, crown_depth, nb_circle), parameters,
+                  __census(size, apo_depth, crown_depth, nb_circle), None))
+    for backend in ("pil", "numpy", "tiles", "svg", "svgz", "pdf", "circles"):
+        L.append(("render/%s" % backend, {"size" : size}, __render(backend, size, directory), __needs(backend)))
+    return L
+
+def run (preset = "quick", repeat = REPEAT, only = None, memory = True, verbose = True):
+    """
+    :param preset: (Default value : "quick") The name of the sizes and the depths of :data:`PRESETS`
+    :type preset: str
+    :param repeat: (Default value : 3) The number of runs timed for each benchmark
+    :type repeat: int
+    :param only: (Default value : None) If given, only the benchmarks whose name contains this text
+    :type only: str
+    :param memory: (Default value : True) If True, measures the peak of the memory of each benchmark
+    :type memory: bool
+    :param verbose: (Default value : True) If True, prints each result
+    :type verbose: bool
+    :return: The results of the benchmarks and a description of the computer
+    :rtype: dict
+    """
+    directory = tempfile.mkdtemp()
+    ## draw n'existe que si fractals.py est lancé, il est alors remis, sinon retiré
+    state = (fr.Gengine, fr.Gnb_circle, fr.Gcrown_depth, fr.Gview, fr.save_frac, vars(fr).get("draw"))
+    results = {}
+    try:
+        for name, parameters, function, missing in benchmarks(preset, directory):
+            if only is not None and only not in name:
+                continue
+            if missing is not None:
+                results[name] = {"parameters" : parameters, "skipped" : "needs %s" % missing}
+            else:
+                results[name] = dict(measure(function, repeat, memory), parameters = parameters)
+            if verbose:
+                print(__line(name, results[name]))
+    finally:
+        fr.Gengine, fr.Gnb_circle, fr.Gcrown_depth, fr.Gview, fr.save_frac, draw = state
+        if draw is None:
+            vars(fr).pop("draw", None)
+        else:
+            fr.draw = draw
+        shutil.rmtree(directory)
+    return {"version" : 1, "preset" : preset, "date" : time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python" : platform.python_version(), "machine" : platform.platform(), "results" : results}
+
+def __line (name, result):
+    """
+    :return: The result of a benchmark in a line of text
+    :rtype: str
+    """
+    if "skipped" in result:
+        return "%-40s skipped (%s)" % (name, result["skipped"])
+    peak = "" if result["peak"] is None else "%10.1f MB" % (result["peak"] / 2**20)
+    return "%-40s %10.4f s %12d circles %14.0f /s%s" % (name, result["best"], result["count"], result["rate"] or 0, peak)
+
+def save (results, filename):
+    """
+    :param results: The results given by :func:`run`
+    :type results: dict
+    :param filename: The name of the JSON file
+    :type filename: str
+    :Action: Saves the results
+    """
+    with open(filename, "w") as f:
+        json.dump(results, f, indent = 1, sort_keys = True)
+
+def compare (old, new, threshold = THRESHOLD):
+    """
+    :param old: The results of the first run, given by :func:`run` or read in a JSON file
+    :type old: dict
+    :param new: The results of the second run
+    :type new: dict
+    :param threshold: (Default value : 0.1) The benchmarks more than 10 % slower (or faster) are flagged
+    :type threshold: float
+    :return: For each benchmark of both runs, its name, the ratio of the times (more than 1 if it is slower),
+             the ratio of the peaks of memory (None if not measured) and "regression", "faster" or ""
+    :rtype: list of tuples
+    :Example:
+
+    >>> old = {"results" : {"a" : {"best" : 1.0, "peak" : 100}, "b" : {"best" : 1.0, "peak" : 100}}}
+    >>> new = {"results" : {"a" : {"best" : 1.5, "peak" : 100}, "b" : {"best" : 0.5, "peak" : 50}}}
+    >>> compare(old, new)
+    [('a', 1.5, 1.0, 'regression'), ('b', 0.5, 0.5, 'faster')]
+    """
+    L = []
+    for name in sorted(set(old["results"]) & set(new["results"])):
+        a, b = old["results"][name], new["results"][name]
+        if "best" not in a or "best" not in b or a["best"] <= 0:
+            continue
+        ratio = b["best"] / a["best"]
+        memory = b["peak"] / a["peak"] if a.get("peak") and b.get("peak") is not None else None
+        flag = "regression" if ratio > 1 + threshold else "faster" if ratio < 1 / (1 + threshold) else ""
+        L.append((name, ratio, memory, flag))
+    return L
+
+def __pop_option (name, default):
+    """
+    :return: The value following the option, which is removed from `sys.argv`
+    :rtype: str
+    """
+    if name in sys.argv[:-1]:
+        i = sys.argv.index(name)
+        value = sys.argv[i+1]
+        del sys.argv[i:i+2]
+        return value
+    return default
+
+def usage ():
+    print("Usage : %s [--preset quick|full] [--repeat N] [--only TEXT] [--no-memory] [--output FILE]" % sys.argv[0])
+    print("        %s --compare OLD NEW [--threshold T]" % sys.argv[0])
+    print("--preset <quick|full> : The sizes and the depths of the fractals (Default : quick).")
+    print("--repeat <N> : The number of runs timed for each benchmark, the best one is kept (Default : 3).")
+    print("--only <TEXT> : Only runs the benchmarks whose name contains TEXT, like render/ or final.")
+    print("--no-memory : Does not measure the peak of the memory, which needs one more slow run.")
+    print("--output <FILE> : Saves the results in a JSON file.")
+    print("--compare <OLD> <NEW> : Compares two JSON files, the exit status is 1 if a benchmark is slower.")
+    print("--threshold <T> : The ratio of the times flagged by --compare (Default : 0.1, for 10 %).")
+    exit()
+
+if __name__ == "__main__" :
+    try :
+        threshold = float(__pop_option("--threshold", THRESHOLD))
+        repeat = int(__pop_option("--repeat", REPEAT))
+    except ValueError :
+        usage()
+    if "--compare" in sys.argv:
+        i = sys.argv.index("--compare")
+        if len(sys.argv) != i + 3:
+            usage()
+        with open(sys.argv[i+1]) as f:
+            old = json.load(f)
+        with open(sys.argv[i+2]) as f:
+            new = json.load(f)
+        Lcompared = compare(old, new, threshold)
+        for name, ratio, memory, flag in Lcompared:
+            print("%-40s %6.2fx time %s %s" % (name, ratio, "" if memory is None else "%6.2fx memory" % memory, flag))
+        exit(1 if any(flag == "regression" for name, ratio, memory, flag in Lcompared) else 0)
+    preset = __pop_option("--preset", "quick")
+    only = __pop_option("--only", None)
+    output = __pop_option("--output", None)
+    memory = "--no-memory" not in sys.argv
+    if not memory:
+        sys.argv.remove("--no-memory")
+    if preset not in PRESETS or len(sys.argv) != 1 or repeat < 1:
+        usage()
+    results = run(preset, repeat, only, memory)
+    if output is not None:
+        save(results, output)
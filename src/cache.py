@@ -0,0 +1,168 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`cache` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module keeps the circles of the fractals already computed in a directory, to draw them again without computing them.
+
+The circles of a fractal are saved with :mod:`circlefile` in a file named
+after a hash of its parameters (size, depths, number of circles, engine,
+seed...) and of :data:`ENGINE_VERSION`, which must be increased each time
+a change of the code changes the circles. A fractal with random crowns and
+no seed can not be found again, so it is not kept.
+
+When the files of the directory are bigger than the size of the cache, the
+files used the longest time ago are removed.
+
+To use a cache one has to:
+
+* create it with :func:`make_cache`
+* look for the circles of a fractal with :func:`lookup`
+* or else keep them while they are drawn with :func:`record`, or add a file of circles with :func:`store`
+
+.. topic:: This module uses functions from : :mod:`circlefile` :
+
+    #. From :mod:`circlefile` :
+        * :func:`circlefile.make_writer`
+        * :func:`circlefile.record`
+        * :func:`circlefile.close_writer`
+"""
+
+import circlefile
+import hashlib
+import json
+import os
+import shutil
+
+ENGINE_VERSION = 2
+SIZE = 1 << 30
+SUFFIX = ".circles"
+
+def make_cache (directory, size = SIZE):
+    """
+    :param directory: The directory of the cache, created if needed
+    :type directory: str
+    :param size: (Default value : 1 GiB) The greatest size of the files of the cache, in bytes
+    :type size: int
+    :return: A cache
+    :rtype: cache
+    """
+    os.makedirs(directory, exist_ok=True)
+    return {"directory" : directory, "size" : size}
+
+def cache_key (parameters):
+    """
+    :param parameters: The parameters of a fractal
+    :type parameters: dict
+    :return: The hash of the parameters and of :data:`ENGINE_VERSION`
+    :rtype: str
+    :Example:
+
+    >>> cache_key({"size" : 100, "seed" : 1}) == cache_key({"seed" : 1, "size" : 100})
+    True
+    >>> cache_key({"size" : 100, "seed" : 1}) == cache_key({"size" : 100, "seed" : 2})
+    False
+    """
+    text = json.dumps([ENGINE_VERSION, parameters], sort_keys=True)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def is_cacheable (parameters):
+    """
+    :return: True if the fractal can be computed again : its crowns are not random or its seed is given
+    :rtype: bool
+    """
+    return parameters.get("nb_circle") != 0 or parameters.get("seed") is not None
+
+def __path (cache, parameters):
+    """
+    :return: The name of the file of the circles of the fractal
+    :rtype: str
+    """
+    return os.path.join(cache["directory"], cache_key(parameters) + SUFFIX)
+
+def lookup (cache, parameters):
+    """
+    :param cache: A cache given by :func:`make_cache`
+    :type cache: cache
+    :param parameters: The parameters of a fractal
+    :type parameters: dict
+    :return: The name of the file of the circles of the fractal, to load with :func:`circlefile.load`,
+             None if they are not in the cache
+    :rtype: str
+    """
+    path = __path(cache, parameters)
+    if not is_cacheable(parameters) or not os.path.exists(path):
+        return None
+    os.utime(path)  ## La date de modification est celle de la dernière utilisation
+    return path
+
+def record (cache, parameters, circles):
+    """
+    Keeps the circles in the cache as they go through. They are only added to the cache when all of them are given.
+
+    :param cache: A cache given by :func:`make_cache`
+    :type cache: cache
+    :param parameters: The parameters of a fractal
+    :type parameters: dict
+    :param circles: The circles, or couples (circle, crown depth)
+    :type circles: iterable
+    :return: The circles
+    :rtype: generator
+    """
+    if not is_cacheable(parameters):
+        for c in circles:
+            yield c[0] if isinstance(c, tuple) else c
+        return
+    path = __path(cache, parameters)
+    temporary = "%s.%d.tmp" % (path, os.getpid())
+    writer = circlefile.make_writer(temporary, parameters)
+    yield from circlefile.record(writer, circles)
+    circlefile.close_writer(writer)
+    os.replace(temporary, path)
+    evict(cache)
+
+def store (cache, parameters, filename):
+    """
+    :param cache: A cache given by :func:`make_cache`
+    :type cache: cache
+    :param parameters: The parameters of a fractal
+    :type parameters: dict
+    :param filename: A file of the circles of the fractal, written with :mod:`circlefile`
+    :type filename: str
+    :Action: Adds a copy of the file to the cache
+    """
+    if is_cacheable(parameters):
+        path = __path(cache, parameters)
+        temporary = "%s.%d.tmp" % (path, os.getpid())
+        shutil.copyfile(filename, temporary)
+        os.replace(temporary, path)
+        evict(cache)
+
+def evict (cache):
+    """
+    :param cache: A cache given by :func:`make_cache`
+    :type cache: cache
+    :Action: Removes the files used the longest time ago until the files of the cache are not bigger than its size
+    :return: The number of files removed
+    :rtype: int
+    """
+    Lfiles = []
+    for name in os.listdir(cache["directory"]):
+        if name.endswith(SUFFIX):
+            stat = os.stat(os.path.join(cache["directory"], name))
+            Lfiles.append((stat.st_mtime, stat.st_size, name))
+    Lfiles.sort()
+    total = sum(size for date, size, name in Lfiles)
+    removed = 0
+    for date, size, name in Lfiles:
+        if total <= cache["size"]:
+            break
+        os.remove(os.path.join(cache["directory"], name))
+        total -= size
+        removed += 1
+    return removed
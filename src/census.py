@@ -0,0 +1,321 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`census` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module counts the circles of a fractal without keeping or drawing them.
+
+A census walks through the gaps like :func:`apollonian.walk_gap`, with the
+curvatures of the circles only, and adds each circle to totals :
+
+* the number of circles of each crown depth and of each apollonius generation
+* the area of the circles of each crown depth
+* the sum of the radii to the power :data:`EXPONENT`, the dimension of the
+  apollonius fractal
+* the histogram of the radii : the number of circles whose radius is between
+  2**i and 2**(i+1), for each integer i
+
+The memory used only depends on the depths of the fractal. The circles are
+the ones given by :func:`generator.iter_final` with the "descartes" engine.
+The other engines give the same circles with fixed crowns (the soddy engine
+may leave a few gaps where :func:`soddy.small_soddy` fails) ; random crowns
+are drawn in the order of the circles, so they may differ. A census tells
+how big a drawing will be before it is started : see :func:`estimate`.
+
+To count the circles of a fractal one has to:
+
+* count them with :func:`census_final`, or the circles filling a crown with :func:`census_apollonius`
+* read the totals with :func:`summary`, print them with :func:`print_summary` or save them in a JSON file with :func:`save`
+* guess the size and the time of the drawing with :func:`estimate`
+
+.. topic:: This module uses functions from : :mod:`circles`, :mod:`apollonian`, :mod:`generator` and :mod:`viewport` :
+
+    #. From :mod:`circles` :
+        * :func:`circles.make_circle`
+        * :func:`circles.get_center`
+        * :func:`circles.get_radius`
+    #. From :mod:`apollonian` :
+        * :func:`apollonian.walk_gap`
+    #. From :mod:`generator` :
+        * :func:`generator.make_crown`
+        * :func:`generator.crown_gaps`
+        * :func:`generator.crown_parameters`
+    #. From :mod:`viewport` :
+        * :func:`viewport.get_scale`
+        * :func:`viewport.intersects`
+"""
+
+import circles  as cir
+import apollonian as ap
+import generator as gen
+import viewport as vp
+import itertools
+import json
+import math
+import random
+import time
+
+EXPONENT = 1.3057   ## La dimension de Hausdorff de la fractale d'Apollonius
+CIRCLE_BYTES = 28   ## Un cercle et sa profondeur, dans un fichier de circlefile ou une CircleArray
+
+def make_census (exponent = EXPONENT):
+    """
+    :param exponent: (Default value : 1.3057) The power of the radii summed
+    :type exponent: float
+    :return: An empty census
+    :rtype: census
+    """
+    return {"exponent" : exponent, "circles" : {}, "generations" : {}, "area" : {}, "power" : 0.0,
+            "histogram" : {}, "min_radius" : math.inf, "max_radius" : 0.0, "elapsed" : 0.0}
+
+def add (census, radius, depth, generation = 0):
+    """
+    :param census: A census given by :func:`make_census`
+    :type census: census
+    :param radius: The radius of the circle
+    :type radius: float
+    :param depth: The crown depth of the circle
+    :type depth: int
+    :param generation: (Default value : 0) The apollonius generation of the circle, 0 for the circles of a crown
+    :type generation: int
+    :Action: Adds the circle to the census
+    :Example:
+
+    >>> census = make_census(exponent = 1)
+    >>> add(census, 3, 1)
+    >>> add(census, 0.75, 1, 2)
+    >>> report = summary(census)
+    >>> report["circles"], report["generations"], report["power"], report["histogram"]
+    ({'1': 2}, {'0': 1, '2': 1}, 3.75, {'-1': 1, '1': 1})
+    """
+    census["circles"][depth] = census["circles"].get(depth, 0) + 1
+    census["generations"][generation] = census["generations"].get(generation, 0) + 1
+    census["area"][depth] = census["area"].get(depth, 0.0) + math.pi * radius * radius
+    census["power"] += radius ** census["exponent"]
+    i = math.frexp(radius)[1] - 1  ## 2**i <= radius < 2**(i+1)
+    census["histogram"][i] = census["histogram"].get(i, 0) + 1
+    if radius < census["min_radius"]:
+        census["min_radius"] = radius
+    if radius > census["max_radius"]:
+        census["max_radius"] = radius
+
+def __walk (L, depth, view):
+    """
+    :return: The curvature, the curvature times the center and the apollonius generation
+             of each circle filling the crown, in the order of :func:`generator.apollonius`
+    :rtype: generator of tuples
+    """
+    for c1, c2, c3 in gen.crown_gaps(L):
+        for (k, w), generation, r_min in ap.walk_gap(c1, c2, c3, depth, view = view):
+            yield k, w, generation
+
+def census_apollonius (L, depth, view = None, census = None, crown_depth = 0):
+    """
+    Counts the circles filling a crown with the apollonius fractal.
+
+    :param L: A list generate with the :func:`generator.make_crown` function
+    :type L: list or CircleArray
+    :param depth: The depth of the fractal
+    :type depth: int
+    :param view: (Default value : None) If given, only the circles seen in this viewport
+    :type view: viewport
+    :param census: (Default value : None) The census the circles are added to, a new one if None
+    :type census: census
+    :param crown_depth: (Default value : 0) The crown depth of the circles
+    :type crown_depth: int
+    :return: The census
+    :rtype: census
+    :Example:
+
+    >>> L = gen.make_crown(cir.make_circle(0j, 100), 5)
+    >>> census = census_apollonius(L, 3)
+    >>> sum(census["circles"].values()) == len(list(gen.iter_apollonius(L, 3)))
+    True
+    """
+    if census is None:
+        census = make_census()
+    start = time.perf_counter()
+    for k, w, generation in __walk(L, depth, view):
+        add(census, 1 / math.fabs(k), crown_depth, generation)
+    census["elapsed"] += time.perf_counter() - start
+    return census
+
+def __open_crown (census, center, radius, apo_depth, crown_depth, nb_circle, view, rng):
+    """
+    :Action: Adds the great circle of the crown inside the circle to the census
+    :return: The state of the crown for :func:`census_final`, None if there is no crown
+    :rtype: tuple
+    """
+    apo_depth, crown_depth, nb_circle = gen.crown_parameters(apo_depth, crown_depth, nb_circle, rng)
+    scale = 1 if view is None else vp.get_scale(view)
+    if crown_depth == 0 or radius * scale <= 1 or (view is not None and not vp.intersects(view, center, radius)):
+        return None
+    add(census, radius, crown_depth)
+    Lcrown = gen.make_crown(cir.make_circle(center, radius), nb_circle)
+    inside = [(1 / cir.get_radius(c), cir.get_center(c) / cir.get_radius(c), 0) for c in Lcrown[1:]
+              if view is None or vp.intersects(view, cir.get_center(c), cir.get_radius(c))]
+    return itertools.chain(inside, __walk(Lcrown, apo_depth, view)), apo_depth, crown_depth - 1, nb_circle
+
+def census_final (x, y, radius, apo_depth = 5, crown_depth = 1, nb_circle = 3, view = None, seed = None, rng = None,
+                  census = None):
+    """
+    Counts the circles of the Apollonius Badern, in the order of :func:`generator.iter_final` with the "descartes" engine.
+
+    :param x: The center of first circle
+    :type x: float
+    :param y: The center of first circle
+    :type y: float
+    :param radius: The radius of the first circle
+    :type radius: float
+    :param apo_depth: (Default value : 5) The depth of the apollonius fractal
+    :type apo_depth: int
+    :param crown_depth: (Default value : 1) The depth of the crown fractal
+    :type crown_depth: int
+    :param nb_circle: (Default value : 3) The number of circle in the crown, 0 for random crowns
+    :type nb_circle: int
+    :param view: (Default value : None) If given, only the circles seen in this viewport
+    :type view: viewport
+    :param seed: (Default value : None) If given, the random crowns are the ones of :func:`generator.iter_final`
+                 with the same seed
+    :type seed: int or str
+    :param rng: (Default value : None) The random generator of the random crowns, a new one made from `seed` if None
+    :type rng: random.Random
+    :param census: (Default value : None) The census the circles are added to, a new one if None
+    :type census: census
+    :return: The census
+    :rtype: census
+    :UC: radius > 0, apo_depth >= 0, crown_depth >= 1, nb_circle >= 3 or nb_circle = 0
+    :Example:
+
+    >>> census = census_final(0, 0, 100, 4, 2, 0, seed = 3)
+    >>> L = gen.get_final(0, 0, 100, 4, 2, 0, engine = "descartes", seed = 3)
+    >>> summary(census)["total"] == len(L), census["circles"][1] == list(L.depth).count(1)
+    (True, True)
+    """
+    if census is None:
+        census = make_census()
+    if nb_circle != 0 :
+        rng = None
+    elif rng is None :
+        rng = random.Random(seed)
+    elif seed is not None :
+        rng.seed(seed)
+    start = time.perf_counter()
+    scale = 1 if view is None else vp.get_scale(view)
+    stack = []
+    crown = __open_crown(census, complex(x, y), radius, apo_depth, crown_depth, nb_circle, view, rng)
+    if crown is not None:
+        stack.append(crown)
+    while stack != []:
+        children, apo_depth, crown_depth, nb_circle = stack[-1]
+        kw = next(children, None)
+        if kw is None:
+            stack.pop()
+            continue
+        k, w, generation = kw
+        r = 1 / math.fabs(k)
+        add(census, r, crown_depth + 1, generation)
+        ## Sans couronnes aléatoires, inutile de calculer le centre d'un cercle trop petit
+        if rng is not None or (crown_depth != 0 and r * scale > 1):
+            crown = __open_crown(census, w / k, r, apo_depth, crown_depth, nb_circle, view, rng)
+            if crown is not None:
+                stack.append(crown)
+    census["elapsed"] += time.perf_counter() - start
+    return census
+
+def dimension (census):
+    """
+    Fits the number of circles bigger than a radius to a power of the radius, like the circles of the
+    apollonius fractal whose number grows like r**-1.3057. The smallest radii of the histogram, where the
+    gaps are left because they are too small, are not used.
+
+    :param census: A census given by :func:`make_census`
+    :type census: census
+    :return: The dimension found in the histogram, None if there are not enough circles
+    :rtype: float
+    """
+    Lbins = sorted(census["histogram"].items(), reverse = True)[:-1]
+    Lpoints, total = [], 0
+    for i, n in Lbins:
+        total += n
+        if total >= 16:  ## Trop peu de cercles en haut de l'histogramme
+            Lpoints.append((i + 1, math.log2(total)))
+    if len(Lpoints) < 3:
+        return None
+    mx = sum(x for x, y in Lpoints) / len(Lpoints)
+    my = sum(y for x, y in Lpoints) / len(Lpoints)
+    slope = sum((x - mx) * (y - my) for x, y in Lpoints) / sum((x - mx) ** 2 for x, y in Lpoints)
+    return -slope
+
+def summary (census):
+    """
+    :param census: A census given by :func:`make_census`
+    :type census: census
+    :return: The numbers of circles of each crown depth and each apollonius generation, their total,
+             the area of the circles of each crown depth, the sum of the powers of the radii, the histogram,
+             the smallest and the biggest radii, the dimension found by :func:`dimension` and the time of the census
+    :rtype: dict
+    """
+    return {"circles" : {str(depth) : n for depth, n in sorted(census["circles"].items())},
+            "generations" : {str(generation) : n for generation, n in sorted(census["generations"].items())},
+            "total" : sum(census["circles"].values()),
+            "area" : {str(depth) : a for depth, a in sorted(census["area"].items())},
+            "exponent" : census["exponent"], "power" : census["power"],
+            "histogram" : {str(i) : n for i, n in sorted(census["histogram"].items())},
+            "min_radius" : census["min_radius"] if census["max_radius"] > 0 else None,
+            "max_radius" : census["max_radius"] if census["max_radius"] > 0 else None,
+            "dimension" : dimension(census), "elapsed" : census["elapsed"]}
+
+def estimate (census, rate = None):
+    """
+    :param census: A census given by :func:`make_census`
+    :type census: census
+    :param rate: (Default value : None) The number of circles per second of the drawing, measured by :mod:`bench`
+    :type rate: float
+    :return: The number of circles, the size in bytes of their file (see :mod:`circlefile`, without its header) or of the
+             :class:`circles.CircleArray` of :func:`generator.get_final`, and the time of the drawing in seconds
+             (None without `rate`)
+    :rtype: dict
+    :Example:
+
+    >>> census = make_census()
+    >>> for i in range(1000):
+    ...     add(census, 1, 1)
+    >>> estimate(census, rate = 500)
+    {'circles': 1000, 'bytes': 28000, 'seconds': 2.0}
+    """
+    total = sum(census["circles"].values())
+    return {"circles" : total, "bytes" : total * CIRCLE_BYTES, "seconds" : None if rate is None else total / rate}
+
+def print_summary (census):
+    """
+    :param census: A census given by :func:`make_census`
+    :type census: census
+    :Action: Prints the number of circles of each crown depth, their area, the sum of the powers of the radii,
+             the dimension and the size of the circles
+    """
+    report = summary(census)
+    for depth, n in report["circles"].items():
+        print("Crown depth %s : %d circles, area %.6g" % (depth, n, report["area"][depth]))
+    print("%d circles, sum of r**%g : %.6g" % (report["total"], report["exponent"], report["power"]))
+    if report["dimension"] is not None:
+        print("Dimension : %.4f" % report["dimension"])
+    print("Circles file : %d bytes, counted in %.3f s" % (estimate(census)["bytes"], report["elapsed"]))
+
+def save (census, filename):
+    """
+    :param census: A census given by :func:`make_census`
+    :type census: census
+    :param filename: The name of the JSON file
+    :type filename: str
+    :Action: Saves the :func:`summary` and the :func:`estimate` of the census
+    """
+    report = summary(census)
+    report["estimate"] = estimate(census)
+    with open(filename, "w") as f:
+        json.dump(report, f, indent = 1, sort_keys = True)
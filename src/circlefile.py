@@ -0,0 +1,205 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`circlefile` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module saves the circles of a fractal in a binary file, to draw them again without computing them.
+
+A file starts with :data:`MAGIC`, the size of the header and the header :
+a JSON text giving the parameters of the fractal, the number of circles and
+the type and the position of each column. Then come the columns, one after
+the other : the abscissas, the ordinates and the radii of the circles
+(floats of 8 bytes) and their crown depths (ints of 4 bytes), each starting
+on a multiple of :data:`ALIGN` bytes. They are little-endian whatever the
+computer, so a file can be read on any other one.
+
+The number of circles is only known at the end, so while the circles are
+written each column goes in its own file next to the final one ; the
+columns are put together when the writer is closed. A file is loaded with
+:class:`numpy.memmap` : nothing is read before it is used, so drawing a big
+set of circles starts at once.
+
+To save the circles one has to:
+
+* open a writer with :func:`make_writer`
+* write the circles with :func:`write`, or with :func:`record` while they are drawn
+* close the writer with :func:`close_writer`
+* or do all of this at once with :func:`save`
+
+To draw them again one has to:
+
+* load the file with :func:`load`, which gives a :class:`circles.CircleArray` whose columns are in the file
+
+.. topic:: This module uses functions from : :mod:`circles` :
+
+    #. From :mod:`circles` :
+        * :class:`circles.CircleArray`
+        * :func:`circles.get_center`
+        * :func:`circles.get_radius`
+"""
+
+import circles  as cir
+from array import array
+import json
+import os
+import shutil
+import struct
+import sys
+
+MAGIC = b"CIRCLES1"
+ALIGN = 64
+CHUNK = 1 << 16
+COLUMNS = (("x", "d", "<f8"), ("y", "d", "<f8"), ("r", "d", "<f8"), ("depth", "i", "<i4"))
+
+def make_writer (filename, parameters = None):
+    """
+    :param filename: The name of the file
+    :type filename: str
+    :param parameters: (Default value : None) The parameters of the fractal, kept in the header
+    :type parameters: dict
+    :return: A writer, the circles are added with :func:`write`
+    :rtype: writer
+    """
+    writer = {"filename" : filename, "parameters" : parameters or {}, "count" : 0, "files" : {}, "buffers" : {}}
+    for name, typecode, dtype in COLUMNS:
+        writer["files"][name] = open("%s.%s" % (filename, name), "wb")
+        writer["buffers"][name] = array(typecode)
+    return writer
+
+def __flush (writer):
+    """
+    :Action: Writes the circles kept by the writer in the files of the columns
+    """
+    for name, typecode, dtype in COLUMNS:
+        if sys.byteorder == "big":  ## Les colonnes du fichier sont toujours petit-boutistes, comme leur type "<f8"
+            writer["buffers"][name].byteswap()
+        writer["buffers"][name].tofile(writer["files"][name])
+        writer["buffers"][name] = array(typecode)
+
+def write (writer, circles, depth = 0):
+    """
+    :param writer: A writer given by :func:`make_writer`
+    :type writer: writer
+    :param circles: The circles, or couples (circle, crown depth)
+    :type circles: iterable or CircleArray
+    :param depth: (Default value : 0) The crown depth of the circles given without depth
+    :type depth: int
+    :Action: Adds the circles at the end of the file
+    """
+    for circle in record(writer, circles, depth):
+        pass
+
+def record (writer, circles, depth = 0):
+    """
+    Writes the circles as they go through.
+
+    :param writer: A writer given by :func:`make_writer`
+    :type writer: writer
+    :param circles: The circles, or couples (circle, crown depth)
+    :type circles: iterable or CircleArray
+    :param depth: (Default value : 0) The crown depth of the circles given without depth
+    :type depth: int
+    :return: The circles
+    :rtype: generator
+    """
+    buffers = writer["buffers"]
+    if isinstance(circles, cir.CircleArray):
+        buffers["x"].extend(circles.x)
+        buffers["y"].extend(circles.y)
+        buffers["r"].extend(circles.r)
+        buffers["depth"].extend(circles.depth if circles.depth is not None else array('i', [depth]) * len(circles))
+        writer["count"] += len(circles)
+        __flush(writer)
+        yield from circles
+        return
+    for circle in circles:
+        d = depth
+        if isinstance(circle, tuple):
+            circle, d = circle
+        center = cir.get_center(circle)
+        buffers["x"].append(center.real)
+        buffers["y"].append(center.imag)
+        buffers["r"].append(cir.get_radius(circle))
+        buffers["depth"].append(d)
+        writer["count"] += 1
+        if len(buffers["r"]) == CHUNK:
+            __flush(writer)
+        yield circle
+
+def close_writer (writer):
+    """
+    :param writer: A writer given by :func:`make_writer`
+    :type writer: writer
+    :Action: Writes the header, puts the columns after it and removes the files of the columns
+    :return: The number of circles written
+    :rtype: int
+    """
+    __flush(writer)
+    count = writer["count"]
+    Lcolumns, size = [], 0
+    for name, typecode, dtype in COLUMNS:
+        writer["files"][name].close()
+        Lcolumns.append([name, dtype, size])
+        size += -(-count * array(typecode).itemsize // ALIGN) * ALIGN
+    header = json.dumps({"count" : count, "columns" : Lcolumns, "parameters" : writer["parameters"]}).encode("utf-8")
+    start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+    with open(writer["filename"], "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", start) + header)
+        for (name, dtype, offset) in Lcolumns:
+            f.seek(start + offset)
+            with open("%s.%s" % (writer["filename"], name), "rb") as column:
+                shutil.copyfileobj(column, f)
+            os.remove("%s.%s" % (writer["filename"], name))
+        f.truncate(start + size)
+    return count
+
+def save (filename, circles, parameters = None):
+    """
+    :param filename: The name of the file
+    :type filename: str
+    :param circles: The circles, or couples (circle, crown depth)
+    :type circles: iterable or CircleArray
+    :param parameters: (Default value : None) The parameters of the fractal, kept in the header
+    :type parameters: dict
+    :return: The number of circles written
+    :rtype: int
+    :Example:
+
+    >>> import tempfile
+    >>> name = os.path.join(tempfile.mkdtemp(), "test.circles")
+    >>> save(name, [(cir.make_circle(1 + 2j, 3), 2), cir.make_circle(4j, 5)], {"size" : 10})
+    2
+    >>> L, parameters = load(name)
+    >>> len(L), L.x.tolist(), L.r.tolist(), L.depth.tolist(), parameters
+    (2, [1.0, 0.0], [3.0, 5.0], [2, 0], {'size': 10})
+    """
+    writer = make_writer(filename, parameters)
+    write(writer, circles)
+    return close_writer(writer)
+
+def load (filename):
+    """
+    :param filename: The name of the file
+    :type filename: str
+    :return: The circles, in a :class:`circles.CircleArray` whose columns are :mod:`numpy` arrays
+             mapped from the file, and the parameters of the fractal
+    :rtype: tuple
+    :UC: The circles can be read but not changed
+    """
+    import numpy as np
+    with open(filename, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("%s is not a file of circles" % filename)
+        start = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(start - len(MAGIC) - 8).rstrip(b"\0").decode("utf-8"))
+    count = header["count"]
+    L = cir.CircleArray(depth = True)
+    for name, dtype, offset in header["columns"]:
+        column = np.memmap(filename, dtype = dtype, mode = "r", offset = start + offset, shape = (count,)) if count else np.empty(0, dtype = dtype)
+        setattr(L, name, column)
+    return L, header["parameters"]
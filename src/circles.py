@@ -1,73 +1,239 @@
-#!/usr/bin/python3
-# -*- coding: utf-8 -*-
-
-"""
-:mod:`circle` module
-
-:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
-
-:date:  2015 - 2016
-
-This module implements some functions to create a circle and get his radius or center.
-
-To create a circle you must ;
-
-* create a point with :func:`points.make_point`
-* and create yout circle with :func:`make_circle`
-
-To get his caracteristics ;
-
-* You can get his center with :func:`get_center`
-* You can get his radius with :func:`get_radius`
-"""
-
-def make_circle (center, radius):
-    """
-    creates a circle of center `center` and radius `radius`
-
-    :param center:
-    :type center: point
-    :param radius:
-    :type radius: int
-    :Example:
-
-    >>> import points
-    >>> center = points.make_point(50, 50)
-    >>> circle = make_circle(center, 25)
-    """
-    return {"center" : center,
-            "radius" : radius}
-
-def get_center (circle):
-    """
-    :param circle: a circle
-    :type circle: circle
-    :return: the center of the circle
-    :rtype: center
-    :UC: none
-    :Example:
-
-    >>> import points
-    >>> center = points.make_point(50, 50)
-    >>> circle = make_circle(center, 25)
-    >>> get_center(circle) == center
-    True
-    """
-    return circle["center"]
-
-def get_radius (circle):
-    """
-    :param circle: a circle
-    :type circle: circle
-    :return: the radius of the circle
-    :rtype: int
-    :UC: none
-    :Example:
-
-    >>> import points
-    >>> center = points.make_point(50, 50)
-    >>> circle = make_circle(center, 25)
-    >>> get_radius(circle)
-    25
-    """
-    return circle["radius"]
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`circle` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module implements some functions to create a circle and get his radius or center.
+
+To create a circle you must ;
+
+* create a point with :func:`points.make_point`
+* and create yout circle with :func:`make_circle`
+
+To get his caracteristics ;
+
+* You can get his center with :func:`get_center`
+* You can get his radius with :func:`get_radius`
+
+To store a lot of circles ;
+
+* use a :class:`CircleArray`, it keeps the centers and the radii in contiguous
+  columns of floats instead of one dict per circle, and works like a list of circles
+* add a circle to a list or a :class:`CircleArray` with :func:`add_circle`
+"""
+
+from array import array
+
+def make_circle (center, radius):
+    """
+    creates a circle of center `center` and radius `radius`
+
+    :param center:
+    :type center: point
+    :param radius:
+    :type radius: int
+    :Example:
+
+    >>> import points
+    >>> center = points.make_point(50, 50)
+    >>> circle = make_circle(center, 25)
+    """
+    return {"center" : center,
+            "radius" : radius}
+
+def get_center (circle):
+    """
+    :param circle: a circle
+    :type circle: circle
+    :return: the center of the circle
+    :rtype: center
+    :UC: none
+    :Example:
+
+    >>> import points
+    >>> center = points.make_point(50, 50)
+    >>> circle = make_circle(center, 25)
+    >>> get_center(circle) == center
+    True
+    """
+    return circle["center"]
+
+def get_radius (circle):
+    """
+    :param circle: a circle
+    :type circle: circle
+    :return: the radius of the circle
+    :rtype: int
+    :UC: none
+    :Example:
+
+    >>> import points
+    >>> center = points.make_point(50, 50)
+    >>> circle = make_circle(center, 25)
+    >>> get_radius(circle)
+    25
+    """
+    return circle["radius"]
+
+class CircleArray:
+    """
+    A list of circles stored in columns : the abscissas of the centers `x`,
+    the ordinates of the centers `y`, the radii `r` and, if asked, the crown
+    depth `depth` and the apollonius generation `generation` of each circle.
+
+    A circle takes 24 bytes (32 with the depth and the generation columns)
+    instead of a dict and a complex.
+
+    Indexing gives a circle, so :func:`get_center` and :func:`get_radius`
+    work on the elements. Slicing gives a new :class:`CircleArray`.
+
+    :Example:
+
+    >>> import points
+    >>> L = CircleArray([make_circle(points.make_point(50, 50), 25)], depth=True)
+    >>> L += [make_circle(points.make_point(10, 20), 5)]
+    >>> len(L)
+    2
+    >>> get_center(L[1]) == points.make_point(10, 20)
+    True
+    >>> get_radius(L[-1])
+    5.0
+    >>> L.depth[1]
+    0
+    """
+
+    def __init__ (self, circles = (), depth = False, generation = False):
+        """
+        :param circles: (Default value : empty) The first circles of the array
+        :type circles: list
+        :param depth: (Default value : False) If True, keeps the crown depth of each circle
+        :type depth: bool
+        :param generation: (Default value : False) If True, keeps the apollonius generation of each circle
+        :type generation: bool
+        """
+        self.x = array('d')
+        self.y = array('d')
+        self.r = array('d')
+        self.depth = array('i') if depth else None
+        self.generation = array('i') if generation else None
+        self.extend(circles)
+
+    def append (self, circle, depth = 0, generation = 0):
+        """
+        :param circle: The circle to add at the end
+        :type circle: circle
+        :param depth: (Default value : 0) The crown depth of the circle
+        :type depth: int
+        :param generation: (Default value : 0) The apollonius generation of the circle
+        :type generation: int
+        """
+        center = get_center(circle)
+        self.x.append(center.real)
+        self.y.append(center.imag)
+        self.r.append(get_radius(circle))
+        if self.depth is not None:
+            self.depth.append(depth)
+        if self.generation is not None:
+            self.generation.append(generation)
+
+    def extend (self, circles):
+        """
+        :param circles: The circles to add at the end
+        :type circles: list or CircleArray
+        """
+        if isinstance(circles, CircleArray):
+            self.extend_columns(circles.x, circles.y, circles.r, circles.depth, circles.generation)
+        else:
+            for circle in circles:
+                self.append(circle)
+
+    def extend_columns (self, x, y, r, depth = None, generation = None):
+        """
+        Adds many circles at once from their columns.
+
+        :param x: The abscissas of the centers
+        :type x: sequence of floats (an array or a :mod:`numpy` array)
+        :param y: The ordinates of the centers
+        :type y: sequence of floats
+        :param r: The radii
+        :type r: sequence of floats
+        :param depth: (Default value : 0 for every circle) The crown depths
+        :type depth: sequence of ints
+        :param generation: (Default value : 0 for every circle) The apollonius generations
+        :type generation: sequence of ints
+        :UC: x, y, r (and depth, generation if given) must have the same length
+        """
+        n = len(r)
+        self.x.extend(self.__column('d', x))
+        self.y.extend(self.__column('d', y))
+        self.r.extend(self.__column('d', r))
+        if self.depth is not None:
+            self.depth.extend(self.__column('i', depth) if depth is not None else array('i', [0]) * n)
+        if self.generation is not None:
+            self.generation.extend(self.__column('i', generation) if generation is not None else array('i', [0]) * n)
+
+    @staticmethod
+    def __column (typecode, values):
+        """
+        :return: The values as an array, without a loop in python for :mod:`numpy` arrays
+        :rtype: array
+        """
+        if hasattr(values, "astype"):                  ## Un tableau numpy
+            column = array(typecode)
+            column.frombytes(values.astype(typecode).tobytes())
+            return column
+        return array(typecode, values)
+
+    def set_depth (self, depth, start = 0):
+        """
+        :param depth: The crown depth
+        :type depth: int
+        :param start: (Default value : 0) The index of the first circle to change
+        :type start: int
+        :Action: Gives the crown depth `depth` to all the circles from `start`
+        :UC: The array must keep the depths
+        """
+        self.depth[start:] = array('i', [depth]) * (len(self) - start)
+
+    def __iadd__ (self, circles):
+        self.extend(circles)
+        return self
+
+    def __len__ (self):
+        return len(self.r)
+
+    def __getitem__ (self, i):
+        if isinstance(i, slice):
+            L = CircleArray(depth = self.depth is not None, generation = self.generation is not None)
+            L.extend_columns(self.x[i], self.y[i], self.r[i],
+                             self.depth[i] if self.depth is not None else None,
+                             self.generation[i] if self.generation is not None else None)
+            return L
+        return make_circle(complex(self.x[i], self.y[i]), self.r[i])
+
+    def __iter__ (self):
+        for x, y, r in zip(self.x, self.y, self.r):
+            yield make_circle(complex(x, y), r)
+
+def add_circle (L, circle, depth = 0, generation = 0):
+    """
+    Adds a circle at the end of a list of circles or of a :class:`CircleArray`.
+
+    :param L: The circles
+    :type L: list or CircleArray
+    :param circle: The circle to add
+    :type circle: circle
+    :param depth: (Default value : 0) The crown depth of the circle, kept only by a :class:`CircleArray`
+    :type depth: int
+    :param generation: (Default value : 0) The apollonius generation of the circle, kept only by a :class:`CircleArray`
+    :type generation: int
+    """
+    if isinstance(L, CircleArray):
+        L.append(circle, depth, generation)
+    else:
+        L.append(circle)
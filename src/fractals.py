@@ -10,8 +10,13 @@
 
 This module implements some functions to create a circle crown and a fractal of circle crown.
 
+The circles are computed by :mod:`generator`. The functions of this module
+read the engine and the number of circles given on the command line in the
+globals `Gengine` and `Gnb_circle`, and draw the circles in the window or in
+the image.
 
-.. topic:: This module uses functions from : :mod:`points`,  :mod:`circles` and :mod:`soddy` :
+
+.. topic:: This module uses functions from : :mod:`points`,  :mod:`circles` and :mod:`generator` :
 
 
     #. From :mod:`points` :
@@ -22,23 +27,82 @@ This module implements some functions to create a circle crown and a fractal of
         * :func:`circles.make_circle`
         * :func:`circles.get_center`
         * :func:`circles.get_radius`
-    #. From :mod:`soddy` :
-        * :func:`soddy.soddy`
-        * :func:`soddy.small_soddy`
+        * :func:`circles.add_circle`
+        * :class:`circles.CircleArray`
+    #. From :mod:`generator` :
+        * :func:`generator.make_crown`
+        * :func:`generator.crown_gaps`
+        * :func:`generator.soddy_fract`
+        * :func:`generator.iter_soddy_fract`
+        * :func:`generator.iter_gap`
+        * :func:`generator.iter_apollonius`
+        * :func:`generator.apollonius`
+        * :func:`generator.crown_parameters`
+        * :func:`generator.is_visible`
+        * :func:`generator.is_crowned`
+        * :func:`generator.iter_final`
+    #. From :mod:`tkscreen` :
+        * :func:`tkscreen.make_screen`
+        * :func:`tkscreen.animate`
+    #. From :mod:`viewer` (needs :mod:`numpy`) :
+        * :func:`viewer.make_viewer`
+        * :func:`viewer.close`
+    #. From :mod:`cache` :
+        * :func:`cache.make_cache`
+        * :func:`cache.lookup`
+        * :func:`cache.record`
+        * :func:`cache.store`
+    #. From :mod:`integral` :
+        * :func:`integral.make_root`
+        * :func:`integral.walk`
+        * :func:`integral.iter_circles` (needs :mod:`numpy`)
+        * :func:`integral.to_circle`
+    #. From :mod:`tileserver` (needs :mod:`numpy`) :
+        * :func:`tileserver.make_fractal`
+        * :func:`tileserver.make_server`
+        * :func:`tileserver.run`
+    #. From :mod:`animation` (needs :mod:`numpy`) :
+        * :func:`animation.read_keyframes`
+        * :func:`animation.make_fractal`
+        * :func:`animation.animate`
+    #. From :mod:`census` :
+        * :func:`census.census_final`
+        * :func:`census.print_summary`
+        * :func:`census.save`
+    #. From :mod:`stats` :
+        * :func:`stats.make_stats`
+        * :func:`stats.start`
+        * :func:`stats.stop`
+        * :func:`stats.timer`
+        * :func:`stats.count_circles`
+        * :func:`stats.progress`
+        * :func:`stats.print_progress`
+        * :func:`stats.save`
+    #. From :mod:`viewport` :
+        * :func:`viewport.make_viewport`
+        * :func:`viewport.get_scale`
+        * :func:`viewport.get_origin`
 
 Functions :
 ===========
 """
 
 import sys
+import os
 import circles  as cir
 import points   as pt
 import soddy    as so
-import math
+import viewport as vp
+import stats    as st
+import cache
 import random
 import time
 
+import generator as gen
+import importlib.util
+
 color_list = ['white']
+Grandom = random.Random()   ## Les tirages des fractales aléatoires, voir set_seed
 
 
 #####################################
@@ -53,71 +117,109 @@ def draw_circle (circle, outline="black"):
     :Action: draw a circle in the Tkinter's canvas
     """
     global candim
-    left   = pt.get_abs(cir.get_center(circle)) - cir.get_radius(circle)
-    top    = pt.get_ord(cir.get_center(circle)) - cir.get_radius(circle)
-    right  = pt.get_abs(cir.get_center(circle)) + cir.get_radius(circle)
-    bottom = pt.get_ord(cir.get_center(circle)) + cir.get_radius(circle)
+    center, radius = cir.get_center(circle), cir.get_radius(circle)
+    __draw_oval(pt.get_abs(center), pt.get_ord(center), radius, outline)
+
+def __draw_oval (x, y, radius, outline="black"):
+    if Gview is not None :  ## Du plan vers les pixels de l'image
+        scale, origin = vp.get_scale(Gview), vp.get_origin(Gview)
+        x, y, radius = (x - origin.real) * scale, (y - origin.imag) * scale, radius * scale
+    left   = x - radius
+    top    = y - radius
+    right  = x + radius
+    bottom = y + radius
     if save_frac :
         draw.ellipse((left, top, right, bottom), outline="black")
     else :
         can.create_oval(left, top, right, bottom, width=1, outline = outline, fill=random.choice(color_list))
 
-def Ldraw_circle(Lcircle):
+def __draw_all(circles):
     """
-    :param Lcircle: The circles you want to draw
-    :type Lcircle: list
-    :Action: Draw all the circles in the list
-    :UC: Lcircle must contain only circle elements
+    :param circles: The circles you want to draw
+    :type circles: iterable of circles
+    :Action: Draw all the circles, by groups in the buffer of :mod:`raster` with the numpy backend,
+             or write them in a file as they come with the svg, svgz and pdf backends.
+             In the window, they are only drawn by :mod:`tkscreen` once the main loop of Tk runs
     """
-    for i in Lcircle :
-        draw_circle(i)
-
-#########################
-## Couronne de cercles ##
-#########################
-
+    with st.timer("drawing"):
+        __draw_stream(circles)
 
-def __find_radius (circle, n):
+def __draw_stream(circles):
     """
-    :param circle: The great circle
-    :type circle: circle
-    :param n: Number of circle
-    :type n: int
-    :return: A tuple wich contains first the radius of the "crown" of circles and the radius of the inner circle.
-    :rtype: tuple
+    :Action: Draw all the circles with the backend, see :func:`__draw_all`
     """
-    radius = cir.get_radius(circle)
-    return (  radius * ( math.sin(math.pi/n) / (1 + math.sin(math.pi/n))),                  ## radius of the "crown" of circle
-              radius * (( 1 - math.sin(math.pi/n)) / (1 + math.sin(math.pi/n)))  )          ## radius of the "inner" circle
+    scale, origin = 1, 0j
+    if Gview is not None :
+        scale, origin = vp.get_scale(Gview), vp.get_origin(Gview)
+    if save_frac and Gbackend in ("svg", "svgz"):
+        vector.write_svg(save_frac + "." + Gbackend, circles, candim, candim, scale, origin, Gmin_size)
+    elif save_frac and Gbackend == "pdf":
+        vector.write_pdf(save_frac + ".pdf", circles, candim, candim, scale, origin, Gmin_size)
+    elif save_frac and Gtile != 0:
+        tiles.draw_stream(canvas, circles, scale * Gsupersample, origin, width = Gsupersample)
+    elif save_frac and Gbackend == "numpy":
+        raster.draw_stream(buffer, circles, scale * Gsupersample, origin, width = Gsupersample)
+    elif save_frac:
+        Ldraw_circle(circles)
+    else:
+        tkscreen.animate(screen, circles, scale, origin)  ## Dessinés pendant la boucle de Tk
 
-def __find_points (center, n, radius):
+def __parameters():
     """
-    :param n: Number of circle
-    :type n: int
-    :param radius: The radius of the "crown" of circle and of the inner circle
-    :type radius: tuple
-    :return: A list wich contain the center of all the circle of the "crown"
-    :rtype: list
-    :UC: The radius of the inner circle must be the last of the tuple
-    and len(radius) = 2
+    :return: The parameters of the fractal given on the command line, which give the same circles
+    :rtype: dict
     """
-    r, r1 = radius[1], radius[0]
-    return [( pt.make_point((r + r1) * math.cos(2*i*math.pi/n) + pt.get_abs(center)  ,  (r + r1) * math.sin(2*i*math.pi/n) + pt.get_ord(center)))    for i in range(n)]
+    if Gintegral is not None :
+        return {"size" : candim, "integral" : Gintegral, "root" : list(Groot), "view" : Gview}
+    parameters = {"size" : candim, "apo_depth" : Gapo_depth, "crown_depth" : Gcrown_depth,
+                  "nb_circle" : Gnb_circle, "engine" : Gengine, "seed" : Gseed, "view" : Gview}
+    if Gnb_circle == 0 :
+        parameters["parallel"] = Gworkers > 1  ## Les processus tirent les couronnes aléatoires autrement
+    return parameters
 
-def make_crown (circle, n):
+def __recorded(circles):
+    """
+    :param circles: The circles, with their crown depths if `Gsave_circles` or `Gcache` is given
+    :type circles: iterable
+    :return: The circles, written in the file `Gsave_circles` and in the cache `Gcache` as they go through
+    :rtype: generator
     """
-    Create a list of circle.
+    if Gsave_circles is not None:
+        import circlefile
+        writer = circlefile.make_writer(Gsave_circles, __parameters())
+        yield from circlefile.record(writer, circles)
+        circlefile.close_writer(writer)
+        if Gcache is not None:
+            cache.store(Gcache, __parameters(), Gsave_circles)
+    elif Gcache is not None:
+        yield from cache.record(Gcache, __parameters(), circles)
+    else:
+        yield from circles
 
-    :param circle: The first circle wich contain all the other
-    :type circle: circle
-    :param n: The number of circles you want to put inside the first circle
-    :type n: int
-    :return: A list of circles, the last circle is the inner circle, all the other are the crown
-    :rtype: list
+def Ldraw_circle(Lcircle):
     """
-    radius = __find_radius(circle, n)
-    points = __find_points(cir.get_center(circle), n, radius)
-    return [circle, cir.make_circle( cir.get_center(circle), radius[1]) ] + [  cir.make_circle(i, radius[0]) for i in points  ]
+    :param Lcircle: The circles you want to draw
+    :type Lcircle: list or CircleArray
+    :Action: Draw all the circles in the list
+    :UC: Lcircle must contain only circle elements
+    """
+    if isinstance(Lcircle, cir.CircleArray):
+        for x, y, radius in zip(Lcircle.x, Lcircle.y, Lcircle.r):  ## Sans créer un dict par cercle
+            __draw_oval(x, y, radius)
+    else:
+        for i in Lcircle :
+            draw_circle(i)
+
+#########################
+## Couronne de cercles ##
+#########################
+
+
+## Le calcul des cercles est dans generator, sans état global
+make_crown = gen.make_crown
+crown_gaps = gen.crown_gaps
+soddy_fract = gen.soddy_fract
+iter_soddy_fract = gen.iter_soddy_fract
 
 def crown(x, y, radius, nb_circle = 5):
     """
@@ -136,7 +238,7 @@ def crown(x, y, radius, nb_circle = 5):
     draw_circle(circle)
     Ldraw_circle(make_crown(circle, nb_circle))
 
-def fractal_crowns(x, y, radius, depth = 5, nb_circle = 0):
+def fractal_crowns(x, y, radius, depth = 5, nb_circle = 0, seed = None):
     """
     Creates a circle of center `x, y` and radius `radius` and the crown inside.
     If you let the default value on `nb_circle` the number of circle in every depth of the fractal will be random.
@@ -151,14 +253,18 @@ def fractal_crowns(x, y, radius, depth = 5, nb_circle = 0):
     :type depth: int
     :param nb_circle: (Default value : Random)  The number of circles the crown contain
     :type nb_circle: int
+    :param seed: (Default value : None) If given, the random numbers of circles only depend on it
+    :type seed: int
     :Action: Draw the fractal `crown` of circles inside the center of center `x, y` and radius `radius`.
     :UC: radius, depth, nb_circle must be positive integers.
     """
     assert type(depth) == type(nb_circle) == int, "depth and nb_circle must be integers"
     assert radius > 0 and depth > 0 and nb_circle > 0, "radius, depth and nb_circle must be positive"
+    if seed is not None :
+        set_seed(seed)
     nb_circle2 = 0
     if nb_circle == 0 :
-        nb_circle = random.randint(0, depth) + 3
+        nb_circle = Grandom.randint(0, depth) + 3
         nb_circle2 = 1
     if depth != 0 :
         center = pt.make_point(x, y)
@@ -175,40 +281,25 @@ def fractal_crowns(x, y, radius, depth = 5, nb_circle = 0):
 
 ## Apollonius ##
 
-def soddy_fract(L, c1, c2, c3, depth):
+def iter_gap(c1, c2, c3, depth, view = None):
     """
-    Fills the space between 3 circles with the apollonius fractal
-
-    :param L: A list generate with the :func:`make_crown` function
-    :type L: list
-    :param depth: The depth of the fractal
-    :type depth: int
-    :Action: add the new circle at the end of the list L
+    :return: The circles of :func:`generator.iter_gap`, with the engine chosen in `Gengine`
+    :rtype: generator
     """
-    if depth != 0 and cir.get_radius(c1)>0.5 and cir.get_radius(c2)>0.5 and cir.get_radius(c3)>0.5 :
-        try :
-            circle = so.small_soddy(c1, c2, c3)
-            L += [circle]
-            soddy_fract(L, circle, c2, c3, depth - 1)
-            soddy_fract(L, c1, circle, c3, depth - 1)
-            soddy_fract(L, c1, c2, circle, depth - 1)
-        except : raise
+    return gen.iter_gap(c1, c2, c3, depth, Gengine, view)
 
-def apollonius(L, depth):
+def iter_apollonius(L, depth, view = None):
     """
-    Fills a crown with the apollonius fractal
+    :return: The circles of :func:`generator.iter_apollonius`, with the engine chosen in `Gengine`
+    :rtype: generator
+    """
+    return gen.iter_apollonius(L, depth, Gengine, view)
 
-    :param L: A list generate with the :func:`make_crown` function
-    :type L: list
-    :param depth: The depth of the fractal
-    :type depth: int
+def apollonius(L, depth, view = None):
+    """
+    :Action: Fills a crown with :func:`generator.apollonius`, with the engine chosen in `Gengine`
     """
-    lenL = len(L)
-    soddy_fract(L, L[0], L[lenL-1], L[2], depth)
-    soddy_fract(L, L[1], L[lenL-1], L[2], depth)
-    for i in range(2, lenL - 1):
-        soddy_fract(L, L[0], L[i], L[i+1], depth)
-        soddy_fract(L, L[1], L[i], L[i+1], depth)
+    gen.apollonius(L, depth, Gengine, view)
 
 #####################
 ## Fonction finale ##
@@ -222,7 +313,37 @@ def __same_circle(cA,cB):  ## Pour l'instant inutilisée
     else:
         return True
 
-def final(x, y, radius, apo_depth = 5, crown_depth = 1, nb_circle = 3):
+def set_seed(seed):
+    """
+    :param seed: The seed of the random choices of the fractals, None for a seed taken from the system
+    :type seed: int
+    :Action: The random fractals drawn after this call only depend on the seed
+    """
+    Grandom.seed(seed)
+
+def crown_parameters(apo_depth, crown_depth, nb_circle):
+    """
+    :return: The depths and the number of circles of a crown, random if `Gnb_circle` is 0
+    :rtype: tuple
+    """
+    return gen.crown_parameters(apo_depth, crown_depth, Gnb_circle, Grandom if Gnb_circle == 0 else None)
+
+def __push_crown(stack, circle, apo_depth, crown_depth, nb_circle, view = None):
+    """
+    :Action: Fills and draws the great circle of the crown inside `circle`, then puts it on the stack of :func:`final`
+    """
+    apo_depth, crown_depth, nb_circle = crown_parameters(apo_depth, crown_depth, nb_circle)
+    if gen.is_crowned(circle, crown_depth, view):
+        with st.timer("crown"):
+            Lcrowns = make_crown(circle, nb_circle, compact = True, depth = crown_depth)
+        with st.timer("apollonius"):
+            apollonius(Lcrowns, apo_depth, view)
+        Lcrowns.set_depth(crown_depth)
+        draw_circle(Lcrowns[0])
+        st.count_circles(crown_depth)
+        stack.append([Lcrowns, 1, apo_depth, crown_depth, nb_circle])
+
+def final(x, y, radius, apo_depth = 5, crown_depth = 1, nb_circle = 3, view = None, seed = None):
     """
     :param x: The center of first circle
     :type x: int
@@ -234,32 +355,52 @@ def final(x, y, radius, apo_depth = 5, crown_depth = 1, nb_circle = 3):
     :type depth: int
     :param nb_circle: The number of circle in the crown
     :type nb_circle: int
+    :param view: (Default value : None) If given, only the circles seen in this viewport are drawn,
+                 the crowns and the gaps out of it or smaller than a pixel are not computed
+    :type view: viewport
+    :param seed: (Default value : None) If given, the random crowns (when `Gnb_circle` is 0) only depend on it
+    :type seed: int
     :Action: Draw the Apollonius Badern.
     :UC: radius, depth, nb_circle must be positive integers.
     """
-    global Gcrowndepth
-    global Gnb_circle
-    if Gnb_circle == 0 :
-        nb_circle = random.randint(3, 10)
-        crown_depth = random.randint(0, 2)
-        apo_depth = random.randint(0, 2)
-    else : nb_circle = Gnb_circle
-    if crown_depth != 0 and radius > 1:
-        center = pt.make_point(x, y)
-        circle = cir.make_circle(center, radius)
-        Lcrowns = make_crown(circle, nb_circle)
-        apollonius(Lcrowns, apo_depth)
-        draw_circle(Lcrowns[0])
-        Lcrowns = Lcrowns[1:]
-        while Lcrowns != [] and radius > 1:
-            if Gcrown_depth == crown_depth and len(Lcrowns)%100 == 0 :
-                print(len(Lcrowns))  ## Donne une idée de l'avancement du programme
-            c = Lcrowns[0]
-            x1 = pt.get_abs(cir.get_center(c))
-            y1 = pt.get_ord(cir.get_center(c))
+    if seed is not None :
+        set_seed(seed)
+    ## Chaque élément de la pile est une couronne et l'indice du prochain cercle à dessiner
+    stack = []
+    __push_crown(stack, cir.make_circle(pt.make_point(x, y), radius), apo_depth, crown_depth, nb_circle, view)
+    done = 0  ## L'aire des cercles de la première couronne déjà dessinés, sur celle du premier cercle
+    while stack != []:
+        frame = stack[-1]
+        Lcrowns, i, apo_depth, crown_depth, nb_circle = frame
+        if i == len(Lcrowns):
+            stack.pop()
+            continue
+        frame[1] += 1
+        c = Lcrowns[i]
+        if len(stack) == 1:
+            st.progress(done)
+            done += (cir.get_radius(c) / radius) ** 2
+        if gen.is_visible(c, view):
             draw_circle(c)
-            final(x1, y1, cir.get_radius(c), apo_depth, crown_depth - 1, nb_circle)
-            Lcrowns = Lcrowns[1:]
+            st.count_circles(crown_depth)
+            __push_crown(stack, c, apo_depth, crown_depth - 1, nb_circle, view)
+    st.progress(1)
+
+def iter_final(x, y, radius, apo_depth = 5, crown_depth = 1, nb_circle = 3, verbose = True, view = None, depths = False, seed = None):
+    """
+    Gives the circles of :func:`final` one after the other, with :func:`generator.iter_final`,
+    the engine chosen in `Gengine` and random crowns if `Gnb_circle` is 0.
+
+    :param verbose: (Default value : True) If True, gives the part of the fractal done to the stats recorded
+                    (see :func:`stats.progress`)
+    :type verbose: bool
+    :param seed: (Default value : None) If given, the random crowns (when `Gnb_circle` is 0) only depend on it
+    :type seed: int
+    :return: The circles drawn by :func:`final`, in the same order
+    :rtype: generator
+    """
+    return gen.iter_final(x, y, radius, apo_depth, crown_depth, 0 if Gnb_circle == 0 else nb_circle, Gengine, view, depths,
+                          seed, Grandom, verbose)
 
 
 ##################################
@@ -299,6 +440,40 @@ candim = 0
 Gapo_depth = 0
 Gcrown_depth = 0
 Gnb_circle = 0
+Gengine = "soddy"
+Gworkers = 1
+Gbackend = "pil"
+Gsupersample = 1
+Gtile = 0
+Gpyramid = None
+Gview = None
+Gmin_size = 0.0
+Gsave_circles = None
+Gload_circles = None
+Gseed = None
+Gcache = None
+Gviewer = False
+Gstats = None
+Gcensus = None
+Gintegral = None
+Groot = None
+Gserve = None
+Ganimate = None     ## Les keyframes de l'animation
+
+def __pop_option(name, default):
+    """
+    :param name: The name of the option, like `--engine`
+    :type name: str
+    :param default: The value if the option is not on the command line
+    :return: The value following the option, which is removed from `sys.argv`
+    :rtype: str
+    """
+    if name in sys.argv[:-1]:
+        i = sys.argv.index(name)
+        value = sys.argv[i+1]
+        del sys.argv[i:i+2]
+        return value
+    return default
 
 def main():
     global save_frac
@@ -307,7 +482,97 @@ def main():
     global Gapo_depth
     global Gcrown_depth
     global Gnb_circle
+    global Gengine
+    global Gworkers
+    global Gbackend
+    global Gsupersample
+    global Gtile
+    global Gpyramid
+    global Gview
+    global Gmin_size
+    global Gsave_circles
+    global Gload_circles
+    global Gseed
+    global Gcache
+    global Gviewer
+    global Gstats
+    global Gcensus
+    global Gintegral
+    global Groot
+    global Gserve
+    global Ganimate
     global save_frac
+    Gengine = __pop_option("--engine", Gengine)
+    Gbackend = __pop_option("--backend", Gbackend)
+    try :
+        Gworkers = int(__pop_option("--workers", Gworkers))
+        Gsupersample = int(__pop_option("--supersample", Gsupersample))
+        Gtile = int(__pop_option("--tiled", Gtile))
+        Gmin_size = float(__pop_option("--min-size", Gmin_size))
+        Gseed = __pop_option("--seed", Gseed)
+        Gseed = None if Gseed is None else int(Gseed)
+        cache_size = int(__pop_option("--cache-size", cache.SIZE >> 20)) << 20
+        Gintegral = __pop_option("--integral", Gintegral)
+        Gintegral = None if Gintegral is None else int(Gintegral)
+        Groot = tuple(int(k) for k in __pop_option("--root", "-1,2,2,3").split(","))
+        Gserve = __pop_option("--serve", Gserve)
+        Gserve = None if Gserve is None else int(Gserve)
+    except ValueError :
+        usage()
+    Gpyramid = __pop_option("--pyramid", Gpyramid)
+    region = __pop_option("--view", None)
+    Gsave_circles = __pop_option("--save-circles", Gsave_circles)
+    Gload_circles = __pop_option("--load-circles", Gload_circles)
+    directory = __pop_option("--cache", None)
+    Gstats = __pop_option("--stats", Gstats)
+    Gcensus = __pop_option("--census", Gcensus)
+    Ganimate = __pop_option("--animate", Ganimate)
+    if "--viewer" in sys.argv:
+        sys.argv.remove("--viewer")
+        Gviewer = True
+    if directory is not None:
+        Gcache = cache.make_cache(directory, cache_size)
+    if Gpyramid is not None and Gtile == 0:
+        Gtile = 1024
+    if Gtile != 0:
+        Gbackend = "numpy"
+    if Gbackend not in ("pil", "numpy", "svg", "svgz", "pdf") or Gsupersample < 1:
+        usage()
+    numpy = importlib.util.find_spec("numpy") is not None  ## Sans l'importer
+    if Gbackend == "numpy" and not numpy:
+        print("You need :mod:numpy to use the numpy backend.")
+        exit()
+    if Gviewer and not numpy:
+        print("You need :mod:numpy to use the viewer.")
+        exit()
+    if Gserve is not None and not numpy:
+        print("You need :mod:numpy to serve the tiles.")
+        exit()
+    if Ganimate is not None and not numpy:
+        print("You need :mod:numpy to draw an animation.")
+        exit()
+    if Gengine not in gen.ENGINES:
+        usage()
+    if Gengine in gen.MODULES and not numpy:
+        print("You need :mod:numpy to use the batch, symmetric and template engines.")
+        exit()
+    if Gintegral is not None and Gcensus is None and not numpy:
+        print("You need :mod:numpy to draw the integral fractal.")
+        exit()
+    if Gintegral is not None:
+        import integral
+        try :
+            integral.make_root(Groot)
+        except ValueError as error :
+            print(error)
+            exit()
+    if Ganimate is not None:
+        import animation
+        try :
+            Ganimate = animation.read_keyframes(Ganimate)
+        except (OSError, ValueError) as error :
+            print(error)
+            exit()
     if not (len(sys.argv) in (1, 5, 6))  :
         usage()
     else:
@@ -330,53 +595,200 @@ def main():
                 Gnb_circle = int(sys.argv[4])
                 save_frac = sys.argv[5]
             assert (candim > 0) and (Gcrown_depth >= 1) and (Gapo_depth >= 0) and (Gnb_circle >= 3 or Gnb_circle == 0), "radius, depth and nb_circle must be positive"
+            assert not Gviewer or (Gnb_circle >= 3 and not save_frac), "the viewer draws fixed crowns in the window"
+            assert Gserve is None or Gnb_circle >= 3, "the tiles are drawn with fixed crowns"
+            assert Ganimate is None or (Gnb_circle >= 3 and save_frac), "the animation is saved, with fixed crowns"
         except:
             raise
             usage()
+    if region is not None:
+        try :
+            left, top, right, bottom = [float(v) for v in region.split(",")]
+            assert left < right and top < bottom
+        except (ValueError, AssertionError) :
+            usage()
+        ## La région est agrandie pour remplir l'image carrée
+        scale = candim / max(right - left, bottom - top)
+        Gview = vp.make_viewport(left, top, left + candim / scale, top + candim / scale, scale)
 
 
 def usage():
-    print("Usage : %s <Dimensions> <Apollonius Depth> <Crown Depth> <Number of circles> [save]"%sys.argv[0])
+    print("Usage : %s <Dimensions> <Apollonius Depth> <Crown Depth> <Number of circles> [save] [options]"%sys.argv[0])
     print("<Dimensions> : The dimensions of the fractal. Must be a positive integer.")
     print("<Apollonius Depth> : The depth of the Apollonius fractal. Must be a positive integer.")
     print("<Crown Depth> : The depth of the crwn fractal. Must be a positive integer.")
     print("<Number of circles> The number of circles per crown. Must be > 3 integer.")
     print("[save] (optionnal) : If you want to save your drawing. Must be a string.")
+    print("Options :")
+    print("--engine <soddy|descartes|batch|symmetric|template> : How the apollonius circles are computed (Default : soddy).")
+    print("    descartes uses the Descartes reflection rule and is much faster.")
+    print("    batch computes a whole generation at once with numpy.")
+    print("    symmetric fills the gaps between two circles of a crown and turns them with numpy.")
+    print("    template fills one crown of radius 1 and copies it in every crown with numpy.")
+    print("--workers <N> : The number of processes computing the fractal (Default : 1).")
+    print("--backend <pil|numpy|svg|svgz|pdf> : How a saved fractal is drawn (Default : pil).")
+    print("    numpy draws the circles by groups in an array of pixels, PIL only encodes the PNG.")
+    print("    svg, svgz and pdf write the circles in a vector file as they come.")
+    print("--min-size <R> : With the svg, svgz and pdf backends, leaves out the circles smaller than R pixels (Default : 0).")
+    print("--supersample <N> : With the numpy backend, draws N times bigger and smooths the image (Default : 1).")
+    print("--tiled <N> : Draws a saved fractal in tiles of N pixels kept in a file, for images bigger than the memory.")
+    print("--pyramid <directory> : Also writes the tiles as a pyramid directory/z/x/y.png (implies --tiled 1024).")
+    print("--view <left,top,right,bottom> : Only draws this region of the fractal, zoomed to the size of the image.")
+    print("    The circles and the gaps out of the region or smaller than a pixel are not computed.")
+    print("--save-circles <file> : Also writes the circles in a binary file, to draw them again later.")
+    print("--load-circles <file> : Draws the circles of a file written with --save-circles instead of computing them.")
+    print("    The circles are drawn at the size of the image, the depths and the number of circles are not used.")
+    print("--seed <N> : The random crowns (with 0 circles per crown) only depend on N.")
+    print("--cache <directory> : Keeps the circles of the fractals in this directory, and draws them from it when asked again.")
+    print("--cache-size <MB> : The greatest size of the cache, the fractals used the longest time ago are removed (Default : 1024).")
+    print("--stats <file> : Saves in a JSON file the time of each phase, the number of circles of each crown depth,")
+    print("    and the number of gaps left because they are too small or out of the view.")
+    print("--census <file> : Only counts the circles, without keeping or drawing them, and saves in a JSON file")
+    print("    their number for each depth, their area, the histogram of their radii and the size of their file.")
+    print("--integral <N> : Draws the apollonius fractal whose circles have integer curvatures, up to the curvature N,")
+    print("    by increasing curvature. The depths and the number of circles are not used.")
+    print("--root <a,b,c,d> : The integer curvatures of the four first circles of --integral, one negative (Default : -1,2,2,3).")
+    print("--viewer : Shows the fractal in a window where the mouse wheel zooms and the left button moves it.")
+    print("    Only the circles seen are computed again after each move. The crowns can not be random.")
+    print("--serve <port> : Serves the fractal as tiles /z/x/y.png on http://127.0.0.1:<port>/, for a web map viewer.")
+    print("    The tiles are drawn when asked by --workers processes, and kept in memory and in the --cache directory.")
+    print("    The crowns can not be random.")
+    print("--animate <keyframes> : Draws a zoom as the images save_00000.png, save_00001.png... following the keyframes")
+    print("    of the file, one by line : frame x y zoom, where x y is the center of the image, in the pixels of the")
+    print("    image without zoom. The circles are kept from a frame to the next one, only the new details are computed.")
+    print("    The frames are drawn by --workers processes, with --supersample. The crowns can not be random.")
     exit()
 
 if __name__ == "__main__" :
     main()
 
-if save_frac:
-    try :
-        from PIL import Image, ImageDraw
-    except :
-        execute = 0
-        print("You need the :mod:PIL to save your fractal")
-else :
-    try :
-        import tkinter as tk
-    except :
-        execute = 0
-        print("You need :mod:tkinter to draw a fractal.")
-
-
-
-if execute :
-    if not save_frac:
-        windo = tk.Tk()
-        windo.title('Appollonius Fractals')
-        can = tk.Canvas(windo,height=candim+4,width=candim+4, bg="white")
-        can.pack()
-    else:
-        image = Image.new("RGB", (candim, candim), (255, 255, 255))
-        draw = ImageDraw.Draw(image)
-    try:
-        final(candim/2 + 2, candim/2 + 2, candim/2, Gapo_depth, Gcrown_depth, Gnb_circle)
-    except:
-        usage()
-    if save_frac:
-        image.save(save_frac + ".png")
+    if Gserve is not None:
+        import tileserver
+        execute = 0  ## Les tuiles sont dessinées quand le navigateur les demande
+        server = tileserver.make_server(tileserver.make_fractal(candim, Gapo_depth, Gcrown_depth, Gnb_circle, Gengine),
+                                        Gworkers, directory = None if Gcache is None else Gcache["directory"])
+        tileserver.run(server, Gserve)
+    elif Ganimate is not None:
+        import animation
+        execute = 0  ## Les images sont écrites par l'animation
+        def progress(counts):
+            print("Frames %d to %d : %d circles computed." % (counts[0][0], counts[-1][0], sum(c[2] for c in counts)))
+        fractal = animation.make_fractal(candim/2 + 2, candim/2 + 2, candim/2, Gapo_depth, Gcrown_depth, Gnb_circle)
+        animation.animate(fractal, Ganimate, candim, candim, save_frac, Gworkers, supersample = Gsupersample, progress = progress)
         print("Finished.")
-    else:
-        windo.mainloop()
+    elif Gcensus is not None:
+        import census
+        execute = 0  ## Les cercles sont comptés, pas dessinés
+        if Gintegral is not None:
+            import integral
+            counted, start = census.make_census(), time.perf_counter()
+            for k, w in integral.walk(Groot, Gintegral):
+                census.add(counted, candim / 2 * -min(Groot) / abs(k), 1)
+            counted["elapsed"] = time.perf_counter() - start
+        else:
+            counted = census.census_final(candim/2 + 2, candim/2 + 2, candim/2, Gapo_depth, Gcrown_depth, Gnb_circle, Gview,
+                                          Gseed, Grandom)
+        census.print_summary(counted)
+        census.save(counted, Gcensus)
+    elif save_frac and Gbackend in ("svg", "svgz", "pdf"):
+        pass  ## Les fichiers vectoriels sont écrits sans PIL
+    elif save_frac:
+        try :
+            from PIL import Image, ImageDraw
+        except :
+            execute = 0
+            print("You need the :mod:PIL to save your fractal")
+    else :
+        try :
+            import tkinter as tk
+        except :
+            execute = 0
+            print("You need :mod:tkinter to draw a fractal.")
+
+
+
+    if execute :
+        pool = None
+        st.start(st.make_stats(st.print_progress))  ## L'avancement et le temps de chaque phase
+        if not save_frac:
+            windo = tk.Tk()
+            windo.title('Appollonius Fractals')
+            can = tk.Canvas(windo,height=candim+4,width=candim+4, bg="white")
+            can.pack()
+            if Gviewer:
+                import viewer
+            else:
+                import tkscreen
+                screen = tkscreen.make_screen(can, candim+4, candim+4)
+        elif Gbackend in ("svg", "svgz", "pdf"):
+            import vector
+        elif Gtile != 0:
+            import tiles
+            ## Les tuiles du canevas sont Gsupersample fois plus grandes que celles de l'image
+            canvas = tiles.make_canvas(save_frac + ".tiles", candim * Gsupersample, candim * Gsupersample, Gtile * Gsupersample)
+        elif Gbackend == "numpy":
+            import raster
+            buffer = raster.make_buffer(candim, candim, Gsupersample)
+        else:
+            image = Image.new("RGB", (candim, candim), (255, 255, 255))
+            draw = ImageDraw.Draw(image)
+        try:
+            if Gcache is not None and Gload_circles is None and not Gviewer :
+                Gload_circles = cache.lookup(Gcache, __parameters())
+                if Gload_circles is not None :
+                    print("Found in the cache.")
+            if Gviewer :
+                shown = viewer.make_viewer(can, candim+4, candim+4, candim/2 + 2, candim/2 + 2, candim/2,
+                                           Gapo_depth, Gcrown_depth, Gnb_circle, Gview)
+            elif Gload_circles is not None :
+                import circlefile
+                circles, parameters = circlefile.load(Gload_circles)
+                size = parameters.get("size", candim)
+                if Gview is None and size != candim :  ## Les cercles sont redessinés à la taille de l'image
+                    scale = candim / size
+                    left = 2 - 2 / scale  ## Le centre du premier cercle reste en candim/2 + 2
+                    Gview = vp.make_viewport(left, left, left + size, left + size, scale)
+                __draw_all(circles)
+            elif Gintegral is not None :
+                import integral
+                ## Le cercle extérieur prend la place du premier cercle de la fractale
+                scale, center = candim / 2 * -min(Groot), complex(candim/2 + 2, candim/2 + 2)
+                __draw_all(__recorded(integral.to_circle(kw, scale, center) for kw in integral.iter_circles(Groot, Gintegral)))
+            elif Gworkers > 1 :
+                import parallel
+                ## Dans la fenêtre, les processus travaillent jusqu'à la fin de la boucle de Tk
+                pool = parallel.make_pool(Gworkers)
+                __draw_all(__recorded(parallel.iter_final(pool, candim/2 + 2, candim/2 + 2, candim/2, Gapo_depth, Gcrown_depth, Gnb_circle, Gview,
+                                                          depths = Gsave_circles is not None or Gcache is not None, seed = Gseed,
+                                                          engine = Gengine)))
+            else :
+                __draw_all(__recorded(iter_final(candim/2 + 2, candim/2 + 2, candim/2, Gapo_depth, Gcrown_depth, Gnb_circle, view = Gview,
+                                                 depths = Gsave_circles is not None or Gcache is not None, seed = Gseed)))
+        except:
+            usage()
+        if save_frac and Gbackend in ("svg", "svgz", "pdf"):
+            print("Finished.")
+        elif save_frac and Gtile != 0:
+            with st.timer("encoding"):
+                tiles.save_png(canvas, save_frac + ".png", Gsupersample)
+                if Gpyramid is not None:
+                    tiles.save_pyramid(canvas, Gpyramid, Gsupersample)
+            os.remove(canvas["filename"])
+            print("Finished.")
+        elif save_frac and Gbackend == "numpy":
+            with st.timer("encoding"):
+                raster.save_png(buffer, save_frac + ".png", Gsupersample)
+            print("Finished.")
+        elif save_frac:
+            with st.timer("encoding"):
+                image.save(save_frac + ".png")
+            print("Finished.")
+        else:
+            windo.mainloop()
+        if Gviewer:
+            viewer.close(shown)
+        if pool is not None:
+            pool.terminate()
+        stats = st.stop()
+        if Gstats is not None:
+            st.save(stats, Gstats)
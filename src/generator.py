@@ -0,0 +1,449 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`generator` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module computes the circles of the fractal of :func:`fractals.final`, without window, image or global state.
+
+Every parameter is given to the functions : the engine computing the
+apollonius fractals and the random generator of the random crowns are
+never taken from the command line of :mod:`fractals`. So two fractals can
+be computed at the same time by two threads, or in a process of a pool,
+and importing this module opens no window and imports neither
+:mod:`tkinter` nor :mod:`PIL`. The engines needing :mod:`numpy` are only
+imported when they are used.
+
+To compute the circles one has to:
+
+* give them one after the other with :func:`iter_final`
+* or get them all at once with :func:`get_final`
+
+To compute a part of the fractal one has to:
+
+* make a crown with :func:`make_crown`
+* fill it with :func:`apollonius`, or give its circles one after the other with :func:`iter_apollonius`
+* fill a gap of a crown (see :func:`crown_gaps`) with :func:`iter_gap`
+
+.. topic:: This module uses functions from : :mod:`points`, :mod:`circles`, :mod:`soddy`, :mod:`apollonian`, :mod:`viewport` and :mod:`stats` :
+
+    #. From :mod:`points` :
+        * :func:`points.make_point`
+        * :func:`points.get_abs`
+        * :func:`points.get_ord`
+    #. From :mod:`circles` :
+        * :func:`circles.make_circle`
+        * :func:`circles.get_center`
+        * :func:`circles.get_radius`
+        * :func:`circles.add_circle`
+        * :class:`circles.CircleArray`
+    #. From :mod:`soddy` :
+        * :func:`soddy.small_soddy`
+    #. From :mod:`apollonian` :
+        * :func:`apollonian.apollonius`
+        * :func:`apollonian.iter_apollonius`
+        * :func:`apollonian.iter_gap`
+    #. From :mod:`batch`, :mod:`symmetry` and :mod:`templates` (need :mod:`numpy`) :
+        * :func:`batch.apollonius`, :func:`batch.iter_apollonius`, :func:`batch.iter_gap`
+        * :func:`symmetry.apollonius`, :func:`symmetry.iter_apollonius`
+        * :func:`templates.apollonius`, :func:`templates.iter_apollonius`
+    #. From :mod:`viewport` :
+        * :func:`viewport.get_scale`
+        * :func:`viewport.intersects`
+    #. From :mod:`stats` :
+        * :func:`stats.timer`
+        * :func:`stats.timed`
+        * :func:`stats.count`
+        * :func:`stats.count_circles`
+        * :func:`stats.progress`
+"""
+
+import circles  as cir
+import points   as pt
+import soddy    as so
+import apollonian as ap
+import viewport as vp
+import stats    as st
+import importlib
+import itertools
+import math
+import random
+
+ENGINES = ("soddy", "descartes", "batch", "symmetric", "template")
+MODULES = {"batch" : "batch", "symmetric" : "symmetry", "template" : "templates"}  ## Importés au premier usage, ils ont besoin de numpy
+
+def engine_module (engine):
+    """
+    :param engine: The name of an engine
+    :type engine: str
+    :return: The module of the engine, imported now if it was not, None for the engines without module
+    :rtype: module
+    :raise ImportError: If the engine needs :mod:`numpy` and it is not installed
+    """
+    if engine not in MODULES:
+        return None
+    return importlib.import_module(MODULES[engine])
+
+#########################
+## Couronne de cercles ##
+#########################
+
+def __find_radius (circle, n):
+    """
+    :param circle: The great circle
+    :type circle: circle
+    :param n: Number of circle
+    :type n: int
+    :return: A tuple wich contains first the radius of the "crown" of circles and the radius of the inner circle.
+    :rtype: tuple
+    """
+    radius = cir.get_radius(circle)
+    return (  radius * ( math.sin(math.pi/n) / (1 + math.sin(math.pi/n))),                  ## radius of the "crown" of circle
+              radius * (( 1 - math.sin(math.pi/n)) / (1 + math.sin(math.pi/n)))  )          ## radius of the "inner" circle
+
+def __find_points (center, n, radius):
+    """
+    :param n: Number of circle
+    :type n: int
+    :param radius: The radius of the "crown" of circle and of the inner circle
+    :type radius: tuple
+    :return: A list wich contain the center of all the circle of the "crown"
+    :rtype: list
+    :UC: The radius of the inner circle must be the last of the tuple
+    and len(radius) = 2
+    """
+    r, r1 = radius[1], radius[0]
+    return [( pt.make_point((r + r1) * math.cos(2*i*math.pi/n) + pt.get_abs(center)  ,  (r + r1) * math.sin(2*i*math.pi/n) + pt.get_ord(center)))    for i in range(n)]
+
+def make_crown (circle, n, compact = False, depth = 0):
+    """
+    Create a list of circle.
+
+    :param circle: The first circle wich contain all the other
+    :type circle: circle
+    :param n: The number of circles you want to put inside the first circle
+    :type n: int
+    :param compact: (Default value : False) If True, the circles are stored in a :class:`circles.CircleArray`
+    :type compact: bool
+    :param depth: (Default value : 0) The crown depth kept for each circle in a compact crown
+    :type depth: int
+    :return: A list of circles, the first circle is the great circle, the second is the inner circle, all the other are the crown
+    :rtype: list or CircleArray
+    """
+    radius = __find_radius(circle, n)
+    points = __find_points(cir.get_center(circle), n, radius)
+    Lcrown = [circle, cir.make_circle( cir.get_center(circle), radius[1]) ] + [  cir.make_circle(i, radius[0]) for i in points  ]
+    if compact :
+        L = cir.CircleArray(depth=True, generation=True)
+        for c in Lcrown :
+            L.append(c, depth)
+        return L
+    return Lcrown
+
+def crown_gaps(L):
+    """
+    :param L: A list generate with the :func:`make_crown` function
+    :type L: list or CircleArray
+    :return: The triples of circles around the gaps of the crown, in the order of :func:`apollonius`
+    :rtype: list
+    """
+    lenL = len(L)
+    triples = [(L[0], L[lenL-1], L[2]), (L[1], L[lenL-1], L[2])]
+    for i in range(2, lenL - 1):
+        triples += [(L[0], L[i], L[i+1]), (L[1], L[i], L[i+1])]
+    return triples
+
+## Apollonius ##
+
+def soddy_fract(L, c1, c2, c3, depth, generation = 1):
+    """
+    Fills the space between 3 circles with the apollonius fractal
+
+    :param L: A list generate with the :func:`make_crown` function
+    :type L: list or CircleArray
+    :param depth: The depth of the fractal
+    :type depth: int
+    :param generation: (Default value : 1) The apollonius generation of the new circle
+    :type generation: int
+    :Action: add the new circle at the end of the list L. A gap where :func:`soddy.small_soddy` finds no circle
+             is left empty and counted in the stats (see :mod:`stats`)
+    """
+    if depth != 0 and cir.get_radius(c1)>0.5 and cir.get_radius(c2)>0.5 and cir.get_radius(c3)>0.5 :
+        try :
+            circle = so.small_soddy(c1, c2, c3)
+        except (IndexError, ValueError, ZeroDivisionError) :  ## Aucun centre n'est assez précis
+            st.count("small_soddy_failures")
+            return
+        cir.add_circle(L, circle, generation = generation)
+        soddy_fract(L, circle, c2, c3, depth - 1, generation + 1)
+        soddy_fract(L, c1, circle, c3, depth - 1, generation + 1)
+        soddy_fract(L, c1, c2, circle, depth - 1, generation + 1)
+    elif depth != 0 :
+        st.count("pruned_size")
+
+def iter_soddy_fract(c1, c2, c3, depth):
+    """
+    Gives the circles of the apollonius fractal between 3 circles one after the other,
+    with a stack instead of the recursion of :func:`soddy_fract`.
+
+    :param depth: The depth of the fractal
+    :type depth: int
+    :return: The same circles, in the same order, as :func:`soddy_fract`
+    :rtype: generator
+    """
+    stack = [(c1, c2, c3, depth)]
+    while stack != []:
+        c1, c2, c3, depth = stack.pop()
+        if depth != 0 and cir.get_radius(c1)>0.5 and cir.get_radius(c2)>0.5 and cir.get_radius(c3)>0.5 :
+            try :
+                circle = so.small_soddy(c1, c2, c3)
+            except (IndexError, ValueError, ZeroDivisionError) :
+                st.count("small_soddy_failures")
+                continue
+            yield circle
+            stack += [(c1, c2, circle, depth - 1), (c1, circle, c3, depth - 1), (circle, c2, c3, depth - 1)]
+        elif depth != 0 :
+            st.count("pruned_size")
+
+def iter_gap(c1, c2, c3, depth, engine = "soddy", view = None):
+    """
+    Gives the circles of the apollonius fractal between 3 circles one after the other.
+
+    :param depth: The depth of the fractal
+    :type depth: int
+    :param engine: (Default value : "soddy") The engine computing the circles, one of :data:`ENGINES`
+    :type engine: str
+    :param view: (Default value : None) If given, only the circles seen in this viewport
+    :type view: viewport
+    :return: The same circles as :func:`soddy_fract`
+    :rtype: generator
+    :UC: The "symmetric" and "template" engines work on whole crowns, their gaps are filled like with the "descartes" engine.
+         With a viewport, every engine fills the gaps like the "descartes" engine.
+    """
+    if engine in ("descartes", "symmetric", "template") or view is not None:
+        return ap.iter_gap(c1, c2, c3, depth, view)
+    if engine == "batch":
+        return engine_module(engine).iter_gap(c1, c2, c3, depth)
+    return iter_soddy_fract(c1, c2, c3, depth)
+
+def iter_apollonius(L, depth, engine = "soddy", view = None):
+    """
+    Gives the circles of the apollonius fractal of a crown one after the other.
+
+    :param L: A list generate with the :func:`make_crown` function
+    :type L: list or CircleArray
+    :param depth: The depth of the fractal
+    :type depth: int
+    :param engine: (Default value : "soddy") The engine computing the circles, one of :data:`ENGINES`
+    :type engine: str
+    :param view: (Default value : None) If given, only the circles seen in this viewport
+    :type view: viewport
+    :return: The same circles as :func:`apollonius`, L is not changed
+    :rtype: generator
+    """
+    if view is not None:
+        yield from ap.iter_apollonius(L, depth, view)
+        return
+    if engine in ("batch", "symmetric", "template"):
+        yield from engine_module(engine).iter_apollonius(L, depth)
+        return
+    for c1, c2, c3 in crown_gaps(L):
+        yield from iter_gap(c1, c2, c3, depth, engine)
+
+def apollonius(L, depth, engine = "soddy", view = None):
+    """
+    Fills a crown with the apollonius fractal
+
+    :param L: A list generate with the :func:`make_crown` function
+    :type L: list or CircleArray
+    :param depth: The depth of the fractal
+    :type depth: int
+    :param engine: (Default value : "soddy") The engine computing the circles, one of :data:`ENGINES`
+    :type engine: str
+    :param view: (Default value : None) If given, only the circles seen in this viewport,
+                 the gaps out of it or smaller than a pixel are not filled
+    :type view: viewport
+    :UC: With the "descartes" engine, the circles are computed by :func:`apollonian.apollonius`,
+         with the "batch" engine by :func:`batch.apollonius`,
+         with the "symmetric" engine by :func:`symmetry.apollonius`
+         and with the "template" engine by :func:`templates.apollonius`.
+         With a viewport, they are always computed by :func:`apollonian.apollonius`
+    """
+    if engine == "descartes" or view is not None:
+        ap.apollonius(L, depth, view)
+        return
+    if engine in ("batch", "symmetric", "template"):
+        engine_module(engine).apollonius(L, depth)
+        return
+    lenL = len(L)
+    soddy_fract(L, L[0], L[lenL-1], L[2], depth)
+    soddy_fract(L, L[1], L[lenL-1], L[2], depth)
+    for i in range(2, lenL - 1):
+        soddy_fract(L, L[0], L[i], L[i+1], depth)
+        soddy_fract(L, L[1], L[i], L[i+1], depth)
+
+#####################
+## Fonction finale ##
+#####################
+
+def crown_parameters(apo_depth, crown_depth, nb_circle, rng = None):
+    """
+    :param rng: (Default value : None) The random generator of the random crowns, None if they are not random
+    :type rng: random.Random
+    :return: The depths and the number of circles of a crown, drawn with `rng` if it is given
+    :rtype: tuple
+    """
+    if rng is not None :
+        nb_circle = rng.randint(3, 10)
+        crown_depth = rng.randint(0, 2)
+        apo_depth = rng.randint(0, 2)
+    return apo_depth, crown_depth, nb_circle
+
+def is_visible(circle, view):
+    """
+    :return: True if the circle can be seen in the viewport, always True without viewport
+    :rtype: bool
+    """
+    return view is None or vp.intersects(view, cir.get_center(circle), cir.get_radius(circle))
+
+def is_crowned(circle, crown_depth, view):
+    """
+    :return: True if a crown is drawn inside the circle : its radius is more than 1 pixel and it can be seen
+    :rtype: bool
+    """
+    scale = 1 if view is None else vp.get_scale(view)
+    return crown_depth != 0 and cir.get_radius(circle) * scale > 1 and is_visible(circle, view)
+
+def __open_crown(circle, apo_depth, crown_depth, nb_circle, engine, view, rng):
+    """
+    :return: The great circle of the crown inside `circle` and the state of the crown for :func:`iter_final`,
+             None if there is no crown
+    :rtype: tuple
+    """
+    apo_depth, crown_depth, nb_circle = crown_parameters(apo_depth, crown_depth, nb_circle, rng)
+    if is_crowned(circle, crown_depth, view):
+        with st.timer("crown"):
+            Lcrown = make_crown(circle, nb_circle)
+        inside = [c for c in Lcrown[1:] if is_visible(c, view)]
+        children = itertools.chain(inside, st.timed("apollonius", iter_apollonius(Lcrown, apo_depth, engine, view)))
+        return Lcrown[0], (children, apo_depth, crown_depth - 1, nb_circle)
+    return None
+
+def iter_final(x, y, radius, apo_depth = 5, crown_depth = 1, nb_circle = 3, engine = "soddy", view = None, depths = False,
+               seed = None, rng = None, verbose = False):
+    """
+    Gives the circles of the Apollonius Badern one after the other, with a stack
+    instead of the recursion of :func:`fractals.final`.
+    The memory used only depends on the depths of the fractal, not on the number of circles.
+
+    :param x: The center of first circle
+    :type x: float
+    :param y: The center of first circle
+    :type y: float
+    :param radius: The radius of the first circle
+    :type radius: float
+    :param apo_depth: (Default value : 5) The depth of the apollonius fractal
+    :type apo_depth: int
+    :param crown_depth: (Default value : 1) The depth of the crown fractal
+    :type crown_depth: int
+    :param nb_circle: (Default value : 3) The number of circle in the crown, 0 for random crowns
+    :type nb_circle: int
+    :param engine: (Default value : "soddy") The engine computing the apollonius fractals, one of :data:`ENGINES`
+    :type engine: str
+    :param view: (Default value : None) If given, only the circles seen in this viewport
+    :type view: viewport
+    :param depths: (Default value : False) If True, gives couples (circle, crown depth of the circle)
+    :type depths: bool
+    :param seed: (Default value : None) If given, the random crowns only depend on it
+    :type seed: int or str
+    :param rng: (Default value : None) The random generator of the random crowns, a new one made from `seed` if None
+    :type rng: random.Random
+    :param verbose: (Default value : False) If True, gives the part of the fractal done to the stats recorded
+                    (see :func:`stats.progress`)
+    :type verbose: bool
+    :return: The circles drawn by :func:`fractals.final`, in the same order
+    :rtype: generator
+    :UC: radius > 0, apo_depth >= 0, crown_depth >= 1, nb_circle >= 3 or nb_circle = 0
+    :Example:
+
+    >>> L = list(iter_final(0, 0, 100, 2, 1, 3))
+    >>> len(L), cir.get_radius(L[0])
+    (29, 100)
+    >>> [c for c, depth in iter_final(0, 0, 100, 2, 2, 0, seed = 1, depths = True)] == list(iter_final(0, 0, 100, 2, 2, 0, seed = 1))
+    True
+    """
+    if nb_circle != 0 :
+        rng = None
+    elif rng is None :
+        rng = random.Random(seed)
+    elif seed is not None :
+        rng.seed(seed)
+    return __iter_final(x, y, radius, apo_depth, crown_depth, nb_circle, engine, view, depths, rng, verbose)
+
+def __iter_final(x, y, radius, apo_depth, crown_depth, nb_circle, engine, view, depths, rng, verbose):
+    """
+    :return: The circles of :func:`iter_final`
+    :rtype: generator
+    """
+    stack = []
+    crown = __open_crown(cir.make_circle(pt.make_point(x, y), radius), apo_depth, crown_depth, nb_circle, engine, view, rng)
+    if crown is not None:
+        st.count_circles(crown[1][2] + 1)
+        yield (crown[0], crown[1][2] + 1) if depths else crown[0]
+        stack.append(crown[1])
+    done = 0  ## L'aire des cercles de la première couronne déjà donnés, sur celle du premier cercle
+    while stack != []:
+        children, apo_depth, crown_depth, nb_circle = stack[-1]
+        c = next(children, None)
+        if c is None:
+            stack.pop()
+            continue
+        if verbose and len(stack) == 1:
+            st.progress(done)
+            done += (cir.get_radius(c) / radius) ** 2
+        st.count_circles(crown_depth + 1)
+        yield (c, crown_depth + 1) if depths else c
+        crown = __open_crown(c, apo_depth, crown_depth, nb_circle, engine, view, rng)
+        if crown is not None:
+            st.count_circles(crown[1][2] + 1)
+            yield (crown[0], crown[1][2] + 1) if depths else crown[0]
+            stack.append(crown[1])
+    if verbose:
+        st.progress(1)
+
+def get_final(x, y, radius, apo_depth = 5, crown_depth = 1, nb_circle = 3, engine = "soddy", view = None, seed = None):
+    """
+    :param x: The center of first circle
+    :type x: float
+    :param y: The center of first circle
+    :type y: float
+    :param radius: The radius of the first circle
+    :type radius: float
+    :param apo_depth: (Default value : 5) The depth of the apollonius fractal
+    :type apo_depth: int
+    :param crown_depth: (Default value : 1) The depth of the crown fractal
+    :type crown_depth: int
+    :param nb_circle: (Default value : 3) The number of circle in the crown, 0 for random crowns
+    :type nb_circle: int
+    :param engine: (Default value : "soddy") The engine computing the apollonius fractals, one of :data:`ENGINES`
+    :type engine: str
+    :param view: (Default value : None) If given, only the circles seen in this viewport
+    :type view: viewport
+    :param seed: (Default value : None) If given, the random crowns only depend on it
+    :type seed: int or str
+    :return: The circles of :func:`iter_final`, with their crown depths
+    :rtype: CircleArray
+    :Example:
+
+    >>> L = get_final(0, 0, 100, 2, 2, 5, engine = "descartes")
+    >>> len(L), L.depth[0], L.depth[-1]
+    (1459, 2, 1)
+    """
+    L = cir.CircleArray(depth = True)
+    for c, depth in iter_final(x, y, radius, apo_depth, crown_depth, nb_circle, engine, view, depths = True, seed = seed):
+        L.append(c, depth)
+    return L
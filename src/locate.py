@@ -0,0 +1,166 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`locate` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module finds the smallest circle of :func:`fractals.final` containing a point, without computing the fractal.
+
+The circles of the fractal are nested : the circles of a crown and of its
+apollonius fractal are inside the great circle of the crown and do not
+overlap, and each of them holds a smaller crown. So only the circles on the
+way to the point are computed : at each level, the circle of the crown
+containing the point, or else the gap containing the point, then the circle
+of this gap or the one of its three smaller gaps containing the point, and
+so on. A point is in a gap when it is in the circle going through the three
+points of tangency of the gap (:func:`apollonian.dual_circle`) and in none
+of its three circles.
+
+The time only depends on the depths of the fractal, not on its number of circles.
+
+To find the circle under a point one has to:
+
+* use :func:`locate`
+
+.. topic:: This module uses functions from : :mod:`points`, :mod:`circles`, :mod:`apollonian`, :mod:`viewport` and :mod:`generator` :
+
+    #. From :mod:`points` :
+        * :func:`points.make_point`
+        * :func:`points.dist`
+    #. From :mod:`circles` :
+        * :func:`circles.make_circle`
+        * :func:`circles.get_center`
+        * :func:`circles.get_radius`
+    #. From :mod:`apollonian` :
+        * :func:`apollonian.make_gap`
+        * :func:`apollonian.child`
+        * :func:`apollonian.split_gap`
+        * :func:`apollonian.dual_circle`
+        * :func:`apollonian.is_open`
+        * :func:`apollonian.to_circle`
+    #. From :mod:`viewport` :
+        * :func:`viewport.get_scale`
+    #. From :mod:`generator` :
+        * :func:`generator.make_crown`
+        * :func:`generator.crown_gaps`
+"""
+
+import points   as pt
+import circles  as cir
+import apollonian as ap
+import viewport as vp
+import generator as gen
+
+def __inside (point, circle):
+    """
+    :return: True if the point is strictly inside the circle
+    :rtype: bool
+    """
+    return pt.dist(point, cir.get_center(circle)) < cir.get_radius(circle)
+
+def __in_gap (point, gap):
+    """
+    :return: True if the point is in the circle going through the three points of tangency of the gap
+    :rtype: bool
+    :UC: The point must be in none of the three circles of the gap
+    """
+    center, radius = ap.dual_circle(gap)
+    return pt.dist(point, center) < radius
+
+def __gap_circle (point, c1, c2, c3, depth, min_radius):
+    """
+    Follows the apollonius fractal between 3 circles down to the circle containing the point.
+
+    :return: The circle of the gap containing the point and its apollonius generation,
+             None if the point is in no circle of the gap
+    :rtype: tuple
+    :UC: The point must be in the gap between the three circles
+    """
+    r_min = min(cir.get_radius(c1), cir.get_radius(c2), cir.get_radius(c3))
+    if depth == 0 or r_min <= min_radius:
+        return None
+    gap, new = ap.make_gap(c1, c2, c3)
+    generation = 1
+    while True:
+        circle = ap.to_circle(new)
+        if __inside(point, circle):
+            return circle, generation
+        ## Le point est dans un seul des trois trous autour du nouveau cercle
+        gap = next((g for g in ap.split_gap(gap, new) if __in_gap(point, g)), None)
+        depth, generation = depth - 1, generation + 1
+        if gap is None or depth == 0 or not ap.is_open(gap, min_radius):
+            return None
+        new = ap.child(gap)
+
+def __crown_circle (point, circle, apo_depth, nb_circle, min_radius):
+    """
+    :return: The circle of the crown inside `circle` or of its apollonius fractal containing the point,
+             the index of its gap in the order of :func:`fractals.crown_gaps` (None for a circle of the crown)
+             and its apollonius generation (0 for a circle of the crown), None if the point is in no circle
+    :rtype: tuple
+    :UC: The point must be inside `circle`
+    """
+    L = gen.make_crown(circle, nb_circle)
+    for c in L[1:]:
+        if __inside(point, c):
+            return c, None, 0
+    for i, (c1, c2, c3) in enumerate(gen.crown_gaps(L)):
+        gap = ap.make_gap(c1, c2, c3)[0]
+        if __in_gap(point, gap):
+            found = __gap_circle(point, c1, c2, c3, apo_depth, min_radius)
+            if found is None:
+                return None
+            return found[0], i, found[1]
+    return None
+
+def locate (x, y, radius, apo_depth, crown_depth, nb_circle, point, view = None):
+    """
+    Finds the smallest circle drawn by :func:`fractals.final` containing a point.
+
+    :param x: The center of first circle
+    :type x: int
+    :param y: The center of first circle
+    :type y: int
+    :param radius: The radius of the first circle
+    :type radius: int
+    :param apo_depth: The depth of the apollonius fractal
+    :type apo_depth: int
+    :param crown_depth: The depth of the crown fractal
+    :type crown_depth: int
+    :param nb_circle: The number of circle in the crown
+    :type nb_circle: int
+    :param point: The point
+    :type point: point
+    :param view: (Default value : None) The viewport of the fractal, if it was drawn with one
+    :type view: viewport
+    :return: The circle and its path : for each crown from the first one, a tuple (crown depth, index of the gap,
+             apollonius generation) giving the circle of the crown containing the point (the index of the gap is None
+             and the generation is 0 for a circle of the crown itself). None if the point is not in the first circle
+    :rtype: tuple
+    :UC: nb_circle >= 3, the crowns of a random fractal can not be found again
+    :Example:
+
+    >>> circle, path = locate(0, 0, 100, 5, 2, 3, pt.make_point(0, 0))
+    >>> cir.get_radius(circle) < 100, path[0]
+    (True, (2, None, 0))
+    >>> locate(0, 0, 100, 5, 2, 3, pt.make_point(200, 0)) is None
+    True
+    """
+    scale = 1 if view is None else vp.get_scale(view)
+    circle = cir.make_circle(pt.make_point(x, y), radius)
+    if not __inside(point, circle):
+        return None
+    path = []
+    ## Mêmes seuils que fractals.final : une couronne dans un cercle de plus d'un pixel
+    while crown_depth != 0 and cir.get_radius(circle) * scale > 1:
+        found = __crown_circle(point, circle, apo_depth, nb_circle, ap.MIN_RADIUS / scale)
+        if found is None:
+            break
+        circle = found[0]
+        path.append((crown_depth, found[1], found[2]))
+        crown_depth -= 1
+    return circle, path
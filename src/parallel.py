@@ -0,0 +1,219 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`parallel` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module computes the fractal with a pool of processes.
+
+The gaps of a crown do not depend on each other, and neither do the crowns
+inside the circles of a crown. Each of them is computed by a process of the
+pool and sent back as a :class:`circles.CircleArray`, which is pickled as
+three arrays of floats instead of one dict per circle. The results are put
+back in the order of the tasks, so the circles are the same, in the same
+order, as with one process (with the "batch" engine the gaps of a crown are
+filled one by one, so only the order inside a crown changes).
+
+The tasks only use :mod:`generator`, and give it the engine and the
+parameters of the fractal : a process of the pool imports neither
+:mod:`fractals` nor the modules of the engines it does not use.
+
+When stats are recorded (see :mod:`stats`), each task records its own
+stats and sends them back with its circles.
+
+To compute the fractal with `workers` processes one has to:
+
+* fill a crown with :func:`apollonius`
+* or get all the circles of :func:`fractals.final` with :func:`iter_final`
+
+.. topic:: This module uses functions from : :mod:`circles`, :mod:`generator` and :mod:`viewport` :
+
+    #. From :mod:`circles` :
+        * :class:`circles.CircleArray`
+        * :func:`circles.get_radius`
+    #. From :mod:`generator` :
+        * :func:`generator.make_crown`
+        * :func:`generator.crown_gaps`
+        * :func:`generator.iter_gap`
+        * :func:`generator.iter_final`
+        * :func:`generator.crown_parameters`
+    #. From :mod:`viewport` :
+        * :func:`viewport.get_scale`
+        * :func:`viewport.intersects`
+    #. From :mod:`stats` :
+        * :func:`stats.make_stats`
+        * :func:`stats.recording`
+        * :func:`stats.start`
+        * :func:`stats.stop`
+        * :func:`stats.merge`
+        * :func:`stats.timer`
+        * :func:`stats.timed`
+        * :func:`stats.count_circles`
+        * :func:`stats.progress`
+"""
+
+import multiprocessing
+import circles  as cir
+import generator as gen
+import viewport as vp
+import stats    as st
+import random
+
+CHUNKSIZE = 16
+
+def __recorded(function, task, record):
+    """
+    :return: The result of the function for the task, and the stats recorded while it runs if `record` is True
+    :rtype: tuple
+    """
+    if not record:
+        return function(task), None
+    st.start(st.make_stats())
+    try:
+        result = function(task)
+    finally:
+        stats = st.stop()
+    return result, stats
+
+def __gap_task(task):
+    """
+    :param task: The three circles around a gap, the depth of the fractal, the engine, the viewport and True to record stats
+    :type task: tuple
+    :return: The circles inside the gap, and the stats of the task
+    :rtype: tuple
+    """
+    c1, c2, c3, depth, engine, view, record = task
+    return __recorded(lambda gap: cir.CircleArray(gen.iter_gap(*gap)), (c1, c2, c3, depth, engine, view), record)
+
+def __crown_task(task):
+    """
+    :param task: A circle, the parameters of :func:`fractals.final` and True to record stats
+    :type task: tuple
+    :return: The circles drawn by :func:`fractals.final` inside the circle, with their crown depths if asked,
+             and the stats of the task
+    :rtype: tuple
+    """
+    return __recorded(__crown, task[:-1], task[-1])
+
+def __crown(task):
+    """
+    :return: The circles drawn by :func:`fractals.final` inside the circle of the task
+    :rtype: CircleArray
+    """
+    circle, apo_depth, crown_depth, nb_circle, engine, view, depths, seed = task
+    center = cir.get_center(circle)
+    circles = gen.iter_final(center.real, center.imag, cir.get_radius(circle),
+                             apo_depth, crown_depth, nb_circle, engine, view, depths, seed)
+    if not depths:
+        return cir.CircleArray(circles)
+    L = cir.CircleArray(depth = True)
+    for c, depth in circles:
+        L.append(c, depth)
+    return L
+
+def make_pool(workers):
+    """
+    :param workers: The number of processes
+    :type workers: int
+    :return: A pool of processes for :func:`apollonius` and :func:`iter_final`
+    :rtype: multiprocessing.Pool
+    """
+    return multiprocessing.Pool(workers)
+
+def apollonius(pool, L, depth, view = None, engine = "soddy"):
+    """
+    Fills a crown with the apollonius fractal, one gap per task.
+
+    :param pool: A pool given by :func:`make_pool`
+    :type pool: multiprocessing.Pool
+    :param L: A list generate with the :func:`fractals.make_crown` function
+    :type L: list or CircleArray
+    :param depth: The depth of the fractal
+    :type depth: int
+    :param view: (Default value : None) If given, only the circles seen in this viewport
+    :type view: viewport
+    :param engine: (Default value : "soddy") The engine filling the gaps, one of :data:`generator.ENGINES`
+    :type engine: str
+    :Action: add the new circles at the end of the list L, in the order of :func:`fractals.apollonius`
+    """
+    record = st.recording()
+    tasks = [(c1, c2, c3, depth, engine, view, record) for c1, c2, c3 in gen.crown_gaps(L)]
+    with st.timer("waiting"):
+        results = pool.map(__gap_task, tasks)
+    for circles, stats in results:
+        st.merge(stats)
+        L += circles
+
+def iter_final(pool, x, y, radius, apo_depth = 5, crown_depth = 1, nb_circle = 3, view = None, depths = False, seed = None,
+               engine = "soddy", rng = None):
+    """
+    Gives the circles of :func:`fractals.final` one after the other.
+    The first crown is filled gap by gap, then the crowns inside each of its circles are
+    computed by the pool while the first circles are given.
+
+    :param pool: A pool given by :func:`make_pool`
+    :type pool: multiprocessing.Pool
+    :param x: The center of first circle
+    :type x: int
+    :param y: The center of first circle
+    :type y: int
+    :param radius: The radius of the first circle
+    :type radius: int
+    :param apo_depth: The depth of the apollonius fractal
+    :type apo_depth: int
+    :param crown_depth: The depth of the crown fractal
+    :type crown_depth: int
+    :param nb_circle: The number of circle in the crown, 0 for random crowns
+    :type nb_circle: int
+    :param view: (Default value : None) If given, only the circles seen in this viewport
+    :type view: viewport
+    :param depths: (Default value : False) If True, gives couples (circle, crown depth of the circle)
+    :type depths: bool
+    :param seed: (Default value : None) If given, the random crowns only depend on it. Each task gets its own seed
+                 made from it, so a random fractal is not the same as with one process
+    :type seed: int
+    :param engine: (Default value : "soddy") The engine computing the apollonius fractals, one of :data:`generator.ENGINES`
+    :type engine: str
+    :param rng: (Default value : None) The random generator of the first random crown, a new one made from `seed` if None
+    :type rng: random.Random
+    :return: The circles drawn by :func:`fractals.final`, in the same order
+    :rtype: generator
+    """
+    if nb_circle != 0 :
+        rng = None
+    elif rng is None :
+        rng = random.Random(seed)
+    elif seed is not None :
+        rng.seed(seed)
+    ## Les tâches gardent nb_circle : 0 leur fait tirer leurs couronnes
+    apo_depth, crown_depth, crown_circles = gen.crown_parameters(apo_depth, crown_depth, nb_circle, rng)
+    scale = 1 if view is None else vp.get_scale(view)
+    if crown_depth != 0 and radius * scale > 1 and (view is None or vp.intersects(view, complex(x, y), radius)):
+        with st.timer("crown"):
+            Lcrowns = gen.make_crown(cir.make_circle(complex(x, y), radius), crown_circles, compact = True)
+        apollonius(pool, Lcrowns, apo_depth, view, engine)
+        st.count_circles(crown_depth)
+        yield (Lcrowns[0], crown_depth) if depths else Lcrowns[0]
+        ## Les cercles de la couronne hors de la vue ne sont ni dessinés ni remplis
+        Lchildren = [c for c in Lcrowns[1:] if view is None or vp.intersects(view, cir.get_center(c), cir.get_radius(c))]
+        ## Un processus fait les tâches dans un ordre quelconque : chaque tâche a sa graine
+        record = st.recording()
+        tasks = ((c, apo_depth, crown_depth - 1, nb_circle, engine, view, depths, None if seed is None else "%d-%d" % (seed, i), record)
+                 for i, c in enumerate(Lchildren))
+        done = 0  ## L'aire des cercles de la couronne déjà donnés, sur celle du premier cercle
+        for i, (circles, stats) in enumerate(st.timed("waiting", pool.imap(__crown_task, tasks, CHUNKSIZE))):
+            st.merge(stats)
+            st.count_circles(crown_depth)
+            done += (cir.get_radius(Lchildren[i]) / radius) ** 2
+            st.progress(done)
+            if depths:
+                yield Lchildren[i], crown_depth
+                yield from zip(circles, circles.depth)
+            else:
+                yield Lchildren[i]
+                yield from circles
+    st.progress(1)
@@ -0,0 +1,280 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`raster` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module draws a lot of circles at once in an array of pixels with :mod:`numpy`.
+
+A buffer is a 2D :mod:`numpy` array of bytes (255 is white, 0 is black).
+The circles are drawn by group of same radius : the pixels of the outline of a
+circle of radius r centered on 0 are computed once, then moved on every
+center of the group with a single addition. Only the PNG encoding uses
+:mod:`PIL`.
+
+A buffer can be `supersample` times bigger than the image : the circles are
+drawn `supersample` times bigger and thicker, and the pixels are averaged
+when the image is saved, which smooths the outlines.
+
+To draw circles one has to:
+
+* create a buffer with :func:`make_buffer`
+* draw columns of centers and radii with :func:`draw_circles`
+* or draw circles as they come with :func:`draw_stream`
+* save the image with :func:`save_png`, or get the bytes of a PNG file with :func:`encode_png`
+
+.. topic:: This module uses functions from : :mod:`circles` :
+
+    #. From :mod:`circles` :
+        * :class:`circles.CircleArray`
+"""
+
+import numpy    as np
+import circles  as cir
+import functools
+import math
+import struct
+import zlib
+
+CHUNK = 1 << 16
+HUGE = 4        ## Un cercle plus grand que HUGE fois l'image n'est calculé que dans ses lignes et ses colonnes
+
+def make_buffer (width, height, supersample = 1):
+    """
+    :param width: The width of the image
+    :type width: int
+    :param height: The height of the image
+    :type height: int
+    :param supersample: (Default value : 1) How many pixels of the buffer make a pixel of the image, in each direction
+    :type supersample: int
+    :return: A white buffer
+    :rtype: numpy.ndarray
+    """
+    return np.full((height * supersample, width * supersample), 255, dtype=np.uint8)
+
+@functools.lru_cache(maxsize = 4096)
+def outline (radius, width = 1):
+    """
+    :param radius: The radius of the circle, in pixels
+    :type radius: int
+    :param width: (Default value : 1) The width of the outline, in pixels
+    :type width: int
+    :return: The abscissas and the ordinates of the pixels of the outline of the circle centered on 0
+    :rtype: tuple of numpy arrays
+    :Example:
+
+    >>> dx, dy = outline(0)
+    >>> dx.tolist(), dy.tolist()
+    ([0], [0])
+    >>> dx, dy = outline(1)
+    >>> sorted(zip(dx.tolist(), dy.tolist()))
+    [(-1, 0), (0, -1), (0, 1), (1, 0)]
+    """
+    Lx, Ly = [], []
+    for rad in range(max(radius - width + 1, 0), radius + 1):
+        ## Un huitième du cercle, puis ses symétriques
+        a = np.arange(0, int(rad / math.sqrt(2)) + 1)
+        b = np.rint(np.sqrt(rad * rad - a * a)).astype(np.int64)
+        for u, v in (a, b), (b, a):
+            for sx, sy in (1, 1), (1, -1), (-1, 1), (-1, -1):
+                Lx.append(sx * u)
+                Ly.append(sy * v)
+    ## Les mêmes pixels sont donnés par plusieurs symétries
+    points = np.unique(np.stack([np.concatenate(Lx), np.concatenate(Ly)], axis=1), axis=0)
+    return points[:, 0], points[:, 1]
+
+def clipped_outline (radius, width, left, top, right, bottom):
+    """
+    :param radius: The radius of the circle, in pixels
+    :type radius: int
+    :param width: The width of the outline, in pixels
+    :type width: int
+    :param left: The smallest abscissa kept, from the center
+    :type left: int
+    :param top: The smallest ordinate kept, from the center
+    :type top: int
+    :param right: The greatest abscissa kept
+    :type right: int
+    :param bottom: The greatest ordinate kept
+    :type bottom: int
+    :return: The pixels of :func:`outline` in the rectangle, some of them several times,
+             computed in time proportional to the size of the rectangle instead of the radius
+    :rtype: tuple of numpy arrays
+    :Example:
+
+    >>> dx, dy = clipped_outline(1000, 2, 600, -800, 900, 800)
+    >>> full = set(zip(*[v.tolist() for v in outline(1000, 2)]))
+    >>> set(zip(dx.tolist(), dy.tolist())) == {(x, y) for x, y in full if 600 <= x <= 900 and -800 <= y <= 800}
+    True
+    >>> dx, dy = clipped_outline(10**10, 1, 10**10 - 5, -2, 10**10, 2)
+    >>> sorted(set(zip(dx.tolist(), dy.tolist())))
+    [(10000000000, -2), (10000000000, -1), (10000000000, 0), (10000000000, 1), (10000000000, 2)]
+    """
+    Lx, Ly = [], []
+    for rad in range(max(radius - width + 1, 0), radius + 1):
+        last = int(rad / math.sqrt(2))
+        ## Les pixels (a, b) du huitième de cercle dont une coordonnée est dans le rectangle, puis leurs symétriques
+        for low, high, along in (left, right, True), (top, bottom, False):
+            for sign in 1, -1:
+                first, end = sorted((sign * low, sign * high))
+                a = np.arange(max(first, 0), min(end, last) + 1)
+                ## En flottants : rad * rad ne tient plus dans un entier de 64 bits au-delà de 3e9 pixels
+                b = np.rint(np.sqrt((rad - a).astype(float) * (rad + a))).astype(np.int64)
+                for other in b, -b:
+                    Lx.append(sign * a if along else other)
+                    Ly.append(other if along else sign * a)
+    dx, dy = np.concatenate(Lx), np.concatenate(Ly)
+    inside = (dx >= left) & (dx <= right) & (dy >= top) & (dy <= bottom)
+    return dx[inside], dy[inside]
+
+def draw_circles (buffer, x, y, r, scale = 1.0, origin = 0j, width = 1, color = 0, offset = (0, 0)):
+    """
+    Draws the outlines of many circles at once.
+
+    :param buffer: The pixels
+    :type buffer: numpy.ndarray
+    :param x: The abscissas of the centers
+    :type x: numpy array
+    :param y: The ordinates of the centers
+    :type y: numpy array
+    :param r: The radii
+    :type r: numpy array
+    :param scale: (Default value : 1) The number of pixels of the buffer for one unit
+    :type scale: float
+    :param origin: (Default value : 0) The point drawn on the pixel (0, 0)
+    :type origin: point
+    :param width: (Default value : 1) The width of the outlines, in pixels
+    :type width: int
+    :param color: (Default value : 0) The grey level of the outlines
+    :type color: int
+    :param offset: (Default value : (0, 0)) The pixel of the whole image which is the first pixel of the buffer,
+                   when the buffer is a tile of a bigger image
+    :type offset: tuple
+    :Action: Draws the outlines in the buffer, the parts out of the buffer are ignored
+    """
+    height, length = buffer.shape
+    cx = np.rint((np.asarray(x, dtype=float) - origin.real) * scale).astype(np.int64) - offset[0]
+    cy = np.rint((np.asarray(y, dtype=float) - origin.imag) * scale).astype(np.int64) - offset[1]
+    rr = np.rint(np.asarray(r, dtype=float) * scale).astype(np.int64)
+    visible = (cx + rr >= 0) & (cx - rr < length) & (cy + rr >= 0) & (cy - rr < height)
+    cx, cy, rr = cx[visible], cy[visible], rr[visible]
+    huge = rr > HUGE * max(height, length)
+    for i in np.flatnonzero(huge).tolist():
+        dx, dy = clipped_outline(int(rr[i]), width, -cx[i], -cy[i], length - 1 - cx[i], height - 1 - cy[i])
+        buffer[cy[i] + dy, cx[i] + dx] = color
+    cx, cy, rr = cx[~huge], cy[~huge], rr[~huge]
+    radii, group = np.unique(rr, return_inverse=True)
+    order = np.argsort(group, kind="stable")
+    bounds = np.searchsorted(group[order], np.arange(len(radii) + 1))
+    for i, radius in enumerate(radii):
+        members = order[bounds[i]:bounds[i + 1]]
+        dx, dy = outline(int(radius), width)
+        px = (cx[members, None] + dx[None, :]).ravel()
+        py = (cy[members, None] + dy[None, :]).ravel()
+        inside = (px >= 0) & (px < length) & (py >= 0) & (py < height)
+        buffer[py[inside], px[inside]] = color
+
+def draw_stream (buffer, circles, scale = 1.0, origin = 0j, width = 1, chunk = CHUNK):
+    """
+    Draws circles as they come, :data:`CHUNK` circles at a time.
+
+    :param buffer: The pixels
+    :type buffer: numpy.ndarray
+    :param circles: The circles
+    :type circles: iterable of circles or CircleArray
+    :param scale: (Default value : 1) The number of pixels of the buffer for one unit
+    :type scale: float
+    :param origin: (Default value : 0) The point drawn on the pixel (0, 0)
+    :type origin: point
+    :param width: (Default value : 1) The width of the outlines, in pixels
+    :type width: int
+    :param chunk: (Default value : 65536) The number of circles drawn at a time
+    :type chunk: int
+    """
+    if isinstance(circles, cir.CircleArray):
+        x, y, r = columns(circles)
+        for start in range(0, len(r), chunk):
+            draw_circles(buffer, x[start:start + chunk], y[start:start + chunk], r[start:start + chunk], scale, origin, width)
+        return
+    L = cir.CircleArray()
+    for circle in circles:
+        L.append(circle)
+        if len(L) == chunk:
+            draw_circles(buffer, *columns(L), scale, origin, width)
+            L = cir.CircleArray()
+    draw_circles(buffer, *columns(L), scale, origin, width)
+
+def columns (L):
+    """
+    :param L: Circles
+    :type L: CircleArray
+    :return: The abscissas, the ordinates and the radii of the circles, as :mod:`numpy` arrays sharing the memory of L
+    :rtype: tuple of numpy arrays
+    """
+    return (np.frombuffer(L.x, dtype=float) if len(L) else np.empty(0),
+            np.frombuffer(L.y, dtype=float) if len(L) else np.empty(0),
+            np.frombuffer(L.r, dtype=float) if len(L) else np.empty(0))
+
+def downsample (buffer, supersample):
+    """
+    :param buffer: The pixels
+    :type buffer: numpy.ndarray
+    :param supersample: How many pixels of the buffer make a pixel of the image, in each direction
+    :type supersample: int
+    :return: The pixels of the image, each one is the mean of `supersample`² pixels of the buffer
+    :rtype: numpy.ndarray
+    """
+    if supersample == 1:
+        return buffer
+    height, length = buffer.shape[0] // supersample, buffer.shape[1] // supersample
+    blocks = buffer[:height * supersample, :length * supersample].reshape(height, supersample, length, supersample)
+    return blocks.mean(axis=(1, 3)).round().astype(np.uint8)
+
+def save_png (buffer, filename, supersample = 1):
+    """
+    :param buffer: The pixels
+    :type buffer: numpy.ndarray
+    :param filename: The name of the image
+    :type filename: str
+    :param supersample: (Default value : 1) How many pixels of the buffer make a pixel of the image
+    :type supersample: int
+    :Action: Saves the image in a PNG file, with :mod:`PIL`
+    """
+    from PIL import Image
+    Image.fromarray(downsample(buffer, supersample), "L").save(filename)
+
+def __png_chunk (kind, data):
+    """
+    :return: A chunk of a PNG file : its length, its kind, its data and their checksum
+    :rtype: bytes
+    """
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+
+def encode_png (buffer, supersample = 1, level = 6):
+    """
+    Encodes the image in a grey PNG file in memory, without :mod:`PIL`.
+
+    :param buffer: The pixels
+    :type buffer: numpy.ndarray
+    :param supersample: (Default value : 1) How many pixels of the buffer make a pixel of the image
+    :type supersample: int
+    :param level: (Default value : 6) The compression level of :mod:`zlib`
+    :type level: int
+    :return: The content of the PNG file
+    :rtype: bytes
+    :Example:
+
+    >>> png = encode_png(make_buffer(4, 3))
+    >>> png[:8], struct.unpack(">II", png[16:24])
+    (b'\\x89PNG\\r\\n\\x1a\\n', (4, 3))
+    """
+    pixels = downsample(buffer, supersample)
+    height, length = pixels.shape
+    ## Chaque ligne commence par le type de filtre (0 : aucun)
+    lines = np.hstack([np.zeros((height, 1), dtype=np.uint8), pixels])
+    return (b"\x89PNG\r\n\x1a\n" + __png_chunk(b"IHDR", struct.pack(">IIBBBBB", length, height, 8, 0, 0, 0, 0))
+            + __png_chunk(b"IDAT", zlib.compress(lines.tobytes(), level)) + __png_chunk(b"IEND", b""))
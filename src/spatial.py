@@ -0,0 +1,241 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`spatial` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module finds quickly the circles of a big set in a region or near a point, with :mod:`numpy`.
+
+The radii of the circles of the fractal go from half a pixel to the whole
+image, so the index is a stack of grids : the cells of a level are two
+times bigger than the cells of the level below, and each circle is put in
+the cell containing its center in the first level whose cells are bigger
+than its diameter. A circle crossing a region has its center in a cell of
+its level crossing the region or next to it, so a query only looks at a few
+cells in each level. The cells of a level are the runs of a sorted array of
+keys, so they are found with :func:`numpy.searchsorted`.
+
+To use an index one has to:
+
+* build it from the circles with :func:`make_index`
+* get the circles crossing a rectangle with :func:`query_rect`
+* get the circles containing a point with :func:`query_point`,
+  or the smallest circle containing each point of an array with :func:`smallest_containing`
+* get the circles whose outline is the nearest to a point with :func:`nearest`
+
+The queries give the indices of the circles in the set used to build the
+index : :func:`query_rect` and :func:`query_point` in increasing order,
+:func:`smallest_containing` one index for each point, in the order of the
+points, and :func:`nearest` the nearest circle first (the smallest index
+first when two outlines are as near).
+
+.. topic:: This module uses functions from : :mod:`circles` and :mod:`raster` :
+
+    #. From :mod:`circles` :
+        * :class:`circles.CircleArray`
+    #. From :mod:`raster` :
+        * :func:`raster.columns`
+"""
+
+import numpy    as np
+import circles  as cir
+import raster
+import math
+
+ROW = 1 << 31
+
+def make_index (L):
+    """
+    :param L: The circles
+    :type L: list or CircleArray
+    :return: An index of the circles
+    :rtype: index
+    :Example:
+
+    >>> L = cir.CircleArray([cir.make_circle(0j, 10), cir.make_circle(30 + 0j, 1), cir.make_circle(5j, 2)])
+    >>> index = make_index(L)
+    >>> query_point(index, 5.5j).tolist()
+    [0, 2]
+    >>> query_rect(index, 25, -5, 40, 5).tolist()
+    [1]
+    >>> nearest(index, 28 + 0j).tolist()
+    [1]
+    """
+    if not isinstance(L, cir.CircleArray):
+        L = cir.CircleArray(L)
+    x, y, r = [np.array(column, dtype=float) for column in raster.columns(L)]
+    index = {"x" : x, "y" : y, "r" : r, "levels" : []}
+    if len(r) == 0:
+        return index
+    index["xmin"], index["ymin"] = x.min(), y.min()
+    ## La plus petite cellule contient le plus petit cercle
+    index["base"] = base = max(2 * r.min(), 1e-9)
+    level = np.maximum(np.ceil(np.log2(np.maximum(2 * r, base) / base)), 0).astype(np.int64)
+    for l in range(int(level.max()) + 1):
+        members = np.flatnonzero(level == l)
+        cell = base * 2.0 ** l
+        keys = __keys(index, cell, x[members], y[members])
+        order = np.argsort(keys, kind="stable")
+        index["levels"].append((cell, keys[order], members[order]))
+    return index
+
+def __cells (index, cell, x, y):
+    """
+    :return: The column and the row of the cells containing the points
+    :rtype: tuple of numpy arrays
+    """
+    return (np.floor((x - index["xmin"]) / cell).astype(np.int64),
+            np.floor((y - index["ymin"]) / cell).astype(np.int64))
+
+def __keys (index, cell, x, y):
+    """
+    :return: The keys of the cells containing the points
+    :rtype: numpy array
+    """
+    cx, cy = __cells(index, cell, x, y)
+    return cx * ROW + cy
+
+def __expand (lo, hi):
+    """
+    :return: For each range [lo, hi[, the number of the range and the values of the range, all the ranges one after the other
+    :rtype: tuple of numpy arrays
+    """
+    counts = np.maximum(hi - lo, 0)
+    owner = np.repeat(np.arange(len(lo)), counts)
+    return owner, lo[owner] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+def __candidates (index, left, top, right, bottom):
+    """
+    :return: The circles whose center is in a cell of their level next to the rectangle
+    :rtype: numpy array
+    """
+    Lfound = []
+    for cell, keys, members in index["levels"]:
+        ## Le rayon d'un cercle est au plus la moitié de la taille de sa cellule
+        cx0 = math.floor((left - cell - index["xmin"]) / cell)
+        cy0 = math.floor((top - cell - index["ymin"]) / cell)
+        cx1 = math.floor((right + cell - index["xmin"]) / cell)
+        cy1 = math.floor((bottom + cell - index["ymin"]) / cell)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(keys):
+            Lfound.append(members)  ## Moins de cercles que de cellules : on les garde tous
+            continue
+        columns = np.arange(cx0, cx1 + 1)
+        lo = np.searchsorted(keys, columns * ROW + cy0, "left")
+        hi = np.searchsorted(keys, columns * ROW + cy1, "right")
+        Lfound.append(members[__expand(lo, hi)[1]])
+    return np.concatenate(Lfound) if Lfound else np.empty(0, dtype=np.int64)
+
+def query_rect (index, left, top, right, bottom, outline = False):
+    """
+    :param index: An index given by :func:`make_index`
+    :type index: index
+    :param left: The smallest abscissa of the rectangle
+    :type left: float
+    :param top: The smallest ordinate of the rectangle
+    :type top: float
+    :param right: The greatest abscissa of the rectangle
+    :type right: float
+    :param bottom: The greatest ordinate of the rectangle
+    :type bottom: float
+    :param outline: (Default value : False) If True, the circles containing the whole rectangle are left out,
+                    only the circles whose outline crosses the rectangle are given
+    :type outline: bool
+    :return: The indices of the circles whose disc crosses the rectangle
+    :rtype: numpy array
+    """
+    if len(index["r"]) == 0:
+        return np.empty(0, dtype=np.int64)
+    found = __candidates(index, left, top, right, bottom)
+    x, y, r = index["x"][found], index["y"][found], index["r"][found]
+    dx = np.maximum(np.maximum(left - x, x - right), 0)
+    dy = np.maximum(np.maximum(top - y, y - bottom), 0)
+    keep = dx * dx + dy * dy <= r * r
+    if outline:
+        far_x = np.maximum(np.abs(left - x), np.abs(right - x))
+        far_y = np.maximum(np.abs(top - y), np.abs(bottom - y))
+        keep &= far_x * far_x + far_y * far_y >= r * r
+    return np.sort(found[keep])
+
+def __pairs (index, X, Y):
+    """
+    :return: The couples (point, circle) such that the point is strictly inside the circle
+    :rtype: tuple of numpy arrays
+    """
+    Lpoints, Lcircles = [], []
+    for cell, keys, members in index["levels"]:
+        cx, cy = __cells(index, cell, X, Y)
+        ## Le centre d'un cercle contenant le point est dans sa cellule ou une cellule voisine
+        for ox in (-1, 0, 1):
+            lo = np.searchsorted(keys, (cx + ox) * ROW + cy - 1, "left")
+            hi = np.searchsorted(keys, (cx + ox) * ROW + cy + 1, "right")
+            point, k = __expand(lo, hi)
+            circle = members[k]
+            inside = np.hypot(X[point] - index["x"][circle], Y[point] - index["y"][circle]) < index["r"][circle]
+            Lpoints.append(point[inside])
+            Lcircles.append(circle[inside])
+    if Lpoints == []:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(Lpoints), np.concatenate(Lcircles)
+
+def query_point (index, point):
+    """
+    :param index: An index given by :func:`make_index`
+    :type index: index
+    :param point: A point
+    :type point: point
+    :return: The indices of the circles containing the point
+    :rtype: numpy array
+    """
+    points, circles = __pairs(index, np.array([point.real]), np.array([point.imag]))
+    return np.sort(circles)
+
+def smallest_containing (index, X, Y):
+    """
+    :param index: An index given by :func:`make_index`
+    :type index: index
+    :param X: The abscissas of the points
+    :type X: numpy array
+    :param Y: The ordinates of the points
+    :type Y: numpy array
+    :return: For each point, the index of the smallest circle containing it, -1 if there is none
+    :rtype: numpy array
+    """
+    X, Y = np.asarray(X, dtype=float), np.asarray(Y, dtype=float)
+    points, circles = __pairs(index, X, Y)
+    ## Trie par rayon décroissant : le dernier cercle écrit pour un point est le plus petit
+    order = np.argsort(-index["r"][circles], kind="stable")
+    found = np.full(len(X), -1, dtype=np.int64)
+    found[points[order]] = circles[order]
+    return found
+
+def nearest (index, point, k = 1):
+    """
+    :param index: An index given by :func:`make_index`
+    :type index: index
+    :param point: A point
+    :type point: point
+    :param k: (Default value : 1) The number of circles
+    :type k: int
+    :return: The indices of the `k` circles whose outline is the nearest to the point, the nearest first
+    :rtype: numpy array
+    """
+    n = len(index["r"])
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    k = min(k, n)
+    x, y = point.real, point.imag
+    d = index["base"]
+    while True:
+        ## Tous les cercles dont le contour est à moins de d du point croisent ce carré
+        found = __candidates(index, x - d, y - d, x + d, y + d)
+        distance = np.abs(np.hypot(index["x"][found] - x, index["y"][found] - y) - index["r"][found])
+        close = distance <= d
+        if close.sum() >= k:
+            found, distance = found[close], distance[close]
+            order = np.lexsort((found, distance))[:k]
+            return found[order]
+        d *= 2
@@ -0,0 +1,266 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`stats` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module measures where the time of a long drawing goes, and tells how far it is.
+
+While stats are recorded (between :func:`start` and :func:`stop`), the
+functions of the fractal add to them :
+
+* the time spent in each phase : "crown" (:func:`fractals.make_crown`), "apollonius"
+  (filling the crowns), "drawing", "encoding" (saving the image) and "waiting" (for the
+  processes of :mod:`parallel`). The time of a phase does not count the phases inside it,
+  so the drawing does not count the computation of the circles it draws
+* the number of circles of each crown depth
+* the counters "pruned_size" (gaps left because their circles are smaller than the
+  size limit), "pruned_view" (gaps out of the viewport) and "small_soddy_failures"
+  (gaps left because :func:`soddy.small_soddy` found no circle, only with the soddy
+  engine). Every engine counts "pruned_size" for every crown, the symmetric and
+  template engines from the circles of the crown once it is filled. "pruned_view" is
+  counted with a viewport, which always fills the gaps like the descartes engine
+
+The first crown holds all the others, so the part of the drawing done is
+the area of the circles of the first crown already drawn with all their
+crowns. It gives the remaining time : the progress function given to
+:func:`make_stats` gets them at most every `period` seconds. When nothing
+is recorded, the functions of this module do nothing.
+
+The stats are only recorded in the thread which called :func:`start` :
+the fractals computed at the same time by other threads, like the circles
+of :mod:`viewer`, do not change them.
+
+In the processes of :mod:`parallel`, the stats are recorded by each task
+and added to those of the main process : the times of the phases are
+then the sum of the times of all the processes.
+
+To measure a drawing one has to:
+
+* create the stats with :func:`make_stats`, with :func:`print_progress` or any other progress function
+* record them with :func:`start` and :func:`stop`
+* read them with :func:`summary` or save them in a JSON file with :func:`save`
+"""
+
+import contextlib
+import json
+import sys
+import threading
+import time
+
+PERIOD = 1.0
+current = None  ## Les stats enregistrées, None si aucune, par le thread current["thread"]
+
+def make_stats (progress = None, period = PERIOD):
+    """
+    :param progress: (Default value : None) A function called with the :func:`summary` of the stats
+                     while the fractal is drawn
+    :type progress: function
+    :param period: (Default value : 1) The least time in seconds between two calls of `progress`
+    :type period: float
+    :return: Empty stats
+    :rtype: stats
+    :Example:
+
+    >>> stats = start(make_stats())
+    >>> count("pruned_size", 3)
+    >>> count_circles(2, 10)
+    >>> with timer("crown"):
+    ...     pass
+    >>> report = summary(stop())
+    >>> report["counters"], report["circles"], report["total"], sorted(report["timers"])
+    ({'pruned_size': 3}, {'2': 10}, 10, ['crown'])
+    """
+    return {"timers" : {}, "counters" : {}, "circles" : {}, "start" : time.perf_counter(), "end" : None,
+            "done" : 0.0, "progress" : progress, "period" : period, "last" : 0.0, "stack" : [], "thread" : None}
+
+def start (stats):
+    """
+    :param stats: Stats given by :func:`make_stats`
+    :type stats: stats
+    :return: The stats, which are now recorded
+    :rtype: stats
+    """
+    global current
+    stats["start"] = time.perf_counter()
+    stats["thread"] = threading.get_ident()
+    current = stats
+    return stats
+
+def stop ():
+    """
+    :return: The stats recorded, which are not recorded anymore, None if there were none
+    :rtype: stats
+    """
+    global current
+    stats, current = current, None
+    if stats is not None:
+        stats["end"] = time.perf_counter()
+    return stats
+
+def __recorded ():
+    """
+    :return: The stats recorded by the thread calling this function, None if there are none
+    :rtype: stats
+    """
+    stats = current
+    if stats is None or stats["thread"] != threading.get_ident():
+        return None
+    return stats
+
+def recording ():
+    """
+    :return: True if stats are recorded by the thread calling this function
+    :rtype: bool
+    """
+    return __recorded() is not None
+
+def count (name, n = 1):
+    """
+    :param name: The name of a counter
+    :type name: str
+    :param n: (Default value : 1) The number added to the counter
+    :type n: int
+    """
+    stats = __recorded()
+    if stats is not None and n != 0:
+        stats["counters"][name] = stats["counters"].get(name, 0) + n
+
+def count_circles (depth, n = 1):
+    """
+    :param depth: A crown depth
+    :type depth: int
+    :param n: (Default value : 1) The number of circles of this crown depth
+    :type n: int
+    """
+    stats = __recorded()
+    if stats is not None:
+        stats["circles"][depth] = stats["circles"].get(depth, 0) + n
+
+@contextlib.contextmanager
+def timer (phase):
+    """
+    :param phase: The name of the phase
+    :type phase: str
+    :Action: Adds the time of the block of the `with` statement to the phase, without the time of the phases inside
+    """
+    stats = __recorded()
+    if stats is None:
+        yield
+        return
+    frame = [time.perf_counter(), 0.0]
+    stats["stack"].append(frame)
+    try:
+        yield
+    finally:
+        stats["stack"].pop()
+        elapsed = time.perf_counter() - frame[0]
+        stats["timers"][phase] = stats["timers"].get(phase, 0.0) + elapsed - frame[1]
+        if stats["stack"] != []:
+            stats["stack"][-1][1] += elapsed  ## Le temps ne compte pas dans la phase englobante
+
+def timed (phase, iterable):
+    """
+    :param phase: The name of the phase
+    :type phase: str
+    :param iterable: Values computed when they are asked
+    :type iterable: iterable
+    :return: The same values, the time spent computing them is added to the phase
+    :rtype: iterator
+    """
+    if __recorded() is None:
+        return iter(iterable)
+    return __timed(phase, iter(iterable))
+
+def __timed (phase, iterator):
+    """
+    :return: The values of the iterator, each one computed in a :func:`timer`
+    :rtype: generator
+    """
+    while True:
+        with timer(phase):
+            value = next(iterator, iterator)
+        if value is iterator:
+            return
+        yield value
+
+def progress (done):
+    """
+    :param done: The part of the drawing done, between 0 and 1
+    :type done: float
+    :Action: Calls the progress function of the stats if the last call was more than `period` seconds ago
+    """
+    stats = __recorded()
+    if stats is None:
+        return
+    stats["done"] = done
+    now = time.perf_counter()
+    if stats["progress"] is not None and (now - stats["last"] >= stats["period"] or done >= 1):
+        stats["last"] = now
+        stats["progress"](summary(stats))
+
+def merge (stats):
+    """
+    :param stats: Stats recorded elsewhere, by another process
+    :type stats: stats
+    :Action: Adds their times, counters and circles to the stats recorded
+    """
+    recorded = __recorded()
+    if recorded is None or stats is None:
+        return
+    for key in ("timers", "counters", "circles"):
+        for name, value in stats[key].items():
+            recorded[key][name] = recorded[key].get(name, 0) + value
+
+def summary (stats):
+    """
+    :param stats: Stats given by :func:`make_stats`
+    :type stats: stats
+    :return: The time elapsed, the part done, the remaining time (None if unknown), the times of the phases,
+             the counters, the number of circles of each crown depth, their total and the number of circles per second
+    :rtype: dict
+    """
+    elapsed = (stats["end"] or time.perf_counter()) - stats["start"]
+    done = stats["done"]
+    total = sum(stats["circles"].values())
+    return {"elapsed" : elapsed, "done" : done, "eta" : elapsed * (1 - done) / done if done > 0 else None,
+            "timers" : dict(stats["timers"]), "counters" : dict(stats["counters"]),
+            "circles" : {str(depth) : n for depth, n in sorted(stats["circles"].items())},
+            "total" : total, "rate" : total / elapsed if elapsed > 0 else None}
+
+def __clock (seconds):
+    """
+    :return: The time as hours, minutes and seconds
+    :rtype: str
+    :Example:
+
+    >>> __clock(3725.2)
+    '1:02:05'
+    """
+    seconds = int(seconds)
+    return "%d:%02d:%02d" % (seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+def print_progress (report):
+    """
+    :param report: The :func:`summary` of the stats
+    :type report: dict
+    :Action: Prints the part done, the number of circles and the remaining time
+    """
+    eta = "?" if report["eta"] is None else __clock(report["eta"])
+    print("%5.1f %%  %d circles  %s elapsed  %s left" % (100 * report["done"], report["total"], __clock(report["elapsed"]), eta))
+    sys.stdout.flush()
+
+def save (stats, filename):
+    """
+    :param stats: Stats given by :func:`make_stats`
+    :type stats: stats
+    :param filename: The name of the JSON file
+    :type filename: str
+    :Action: Saves the :func:`summary` of the stats
+    """
+    with open(filename, "w") as f:
+        json.dump(summary(stats), f, indent = 1, sort_keys = True)
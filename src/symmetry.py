@@ -0,0 +1,124 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`symmetry` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module fills a crown with the apollonius fractal using its symmetry.
+
+The `n` circles of a crown given by :func:`fractals.make_crown` are evenly
+spaced, so a rotation of 2π/n around the center of the crown sends each gap
+on the next one. Only the two gaps between the first two circles of the
+crown (against the great circle and against the inner circle) are filled,
+the other ones are given by complex rotations with :mod:`numpy`.
+
+The gaps left because their circles are too small are not counted while the
+two gaps are filled, but for the whole crown by :func:`count_pruned`, from
+the generations of its circles : :func:`crown_columns` also fills the
+templates of :mod:`templates`, which are not the crowns drawn.
+
+To fill a crown one has to:
+
+* use :func:`apollonius` to add the circles at the end of the crown
+* or :func:`iter_apollonius` to get them one after the other
+
+.. topic:: This module uses functions from : :mod:`circles`, :mod:`apollonian` and :mod:`stats` :
+
+    #. From :mod:`circles` :
+        * :func:`circles.make_circle`
+        * :func:`circles.get_center`
+        * :class:`circles.CircleArray`
+    #. From :mod:`apollonian` :
+        * :func:`apollonian.walk_gap`
+    #. From :mod:`stats` :
+        * :func:`stats.recording`
+        * :func:`stats.count`
+"""
+
+import numpy    as np
+import circles  as cir
+import apollonian as ap
+import stats    as st
+
+def crown_columns (L, depth, min_radius = ap.MIN_RADIUS):
+    """
+    :param L: A list generate with the :func:`fractals.make_crown` function
+    :type L: list or CircleArray
+    :param depth: The depth of the fractal
+    :type depth: int
+    :param min_radius: (Default value : 0.5) A gap is filled only if its three circles are bigger
+    :type min_radius: float
+    :return: The centers, the radii, the apollonius generations and the radius of the smallest circle
+             of the gap of each circle filling the crown, in the order of :func:`fractals.apollonius`
+    :rtype: tuple of numpy arrays
+    """
+    n = len(L) - 2
+    Lk, Lw, Lg, Lopen = [], [], [], []
+    for c in L[0], L[1]:
+        for (k, w), generation, r_min in ap.walk_gap(c, L[2], L[3], depth, min_radius, counted = False):
+            Lk.append(k)
+            Lw.append(w)
+            Lg.append(generation)
+            Lopen.append(r_min)
+    center = cir.get_center(L[0])
+    k, w = np.array(Lk, dtype=float), np.array(Lw, dtype=complex)
+    ## Le trou entre les cercles i et i+1 est le trou entre les cercles 2 et 3 tourné de 2π(i-2)/n,
+    ## et fractals.apollonius commence par le trou entre le dernier cercle et le cercle 2
+    rotations = np.exp(2j * np.pi * ((np.arange(n) - 1) % n) / n)
+    z = center + ((w / k - center)[None, :] * rotations[:, None]).ravel()
+    return (z, np.tile(1 / k, n), np.tile(np.array(Lg, dtype=np.int32), n),
+            np.tile(np.array(Lopen, dtype=float), n))
+
+def count_pruned (nb_gaps, g, depth):
+    """
+    Each gap tried gives a circle or is left, and each circle of a generation before the last one gives
+    three gaps to try.
+
+    :param nb_gaps: The number of gaps of the crown
+    :type nb_gaps: int
+    :param g: The apollonius generations of the circles filling them
+    :type g: numpy.ndarray
+    :param depth: The depth of the fractal
+    :type depth: int
+    :Action: Adds the gaps left because their circles are too small to the counter "pruned_size" of :mod:`stats`
+    """
+    if depth != 0 and st.recording():
+        st.count("pruned_size", nb_gaps + 3 * int((g < depth).sum()) - len(g))
+
+def apollonius (L, depth):
+    """
+    Fills a crown with the apollonius fractal.
+    It gives the same circles, in the same order, as :func:`apollonian.apollonius`.
+
+    :param L: A list generate with the :func:`fractals.make_crown` function
+    :type L: list or CircleArray
+    :param depth: The depth of the fractal
+    :type depth: int
+    :Action: add the new circles at the end of the list L
+    """
+    z, r, g, r_min = crown_columns(L, depth)
+    count_pruned(2 * (len(L) - 2), g, depth)
+    if isinstance(L, cir.CircleArray):
+        L.extend_columns(z.real, z.imag, r, generation = g)
+    else:
+        L += [cir.make_circle(complex(c), float(radius)) for c, radius in zip(z, r)]
+
+def iter_apollonius (L, depth):
+    """
+    Gives the circles of the apollonius fractal of a crown one after the other.
+
+    :param L: A list generate with the :func:`fractals.make_crown` function
+    :type L: list or CircleArray
+    :param depth: The depth of the fractal
+    :type depth: int
+    :return: The same circles as :func:`apollonius`, L is not changed
+    :rtype: generator
+    """
+    z, r, g, r_min = crown_columns(L, depth)
+    count_pruned(2 * (len(L) - 2), g, depth)
+    for c, radius in zip(z, r):
+        yield cir.make_circle(complex(c), float(radius))
@@ -0,0 +1,127 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`templates` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module fills the crowns of :func:`fractals.final` by copying a filled crown of radius 1.
+
+A crown of `nb_circle` circles filled with the apollonius fractal always has
+the same shape, only its center and its radius change. So the crown of
+radius 1 centered on 0 is filled once (the template) and each crown is given
+by a translation and a scaling of the template with :mod:`numpy`.
+
+A circle is drawn only if the three circles of its gap are bigger than 0.5
+(:data:`apollonian.MIN_RADIUS`). In a template of radius 1 this is
+0.5 / radius, so the template keeps, for each circle, the radius of the
+smallest circle of its gap and a crown only takes the circles of the
+template whose gap is big enough once scaled. The templates are filled down
+to a power of two smaller than 0.5 / radius, so one template is shared by
+all the crowns whose radius are in the same octave. The gaps left in a
+crown are counted by :func:`symmetry.count_pruned`, not while its template
+is filled.
+
+To fill a crown one has to:
+
+* use :func:`apollonius` to add the circles at the end of the crown
+* or :func:`iter_apollonius` to get them one after the other
+
+.. topic:: This module uses functions from : :mod:`circles`, :mod:`symmetry` and :mod:`generator` :
+
+    #. From :mod:`circles` :
+        * :func:`circles.make_circle`
+        * :func:`circles.get_center`
+        * :func:`circles.get_radius`
+        * :class:`circles.CircleArray`
+    #. From :mod:`symmetry` :
+        * :func:`symmetry.crown_columns`
+        * :func:`symmetry.count_pruned`
+    #. From :mod:`generator` :
+        * :func:`generator.make_crown`
+"""
+
+import circles  as cir
+import apollonian as ap
+import symmetry as sym
+import generator as gen
+import functools
+import math
+
+CACHE_SIZE = 64
+
+@functools.lru_cache(maxsize = CACHE_SIZE)
+def template (nb_circle, apo_depth, cutoff):
+    """
+    Fills the crown of radius 1 centered on 0, with :func:`symmetry.crown_columns`.
+
+    :param nb_circle: The number of circles of the crown
+    :type nb_circle: int
+    :param apo_depth: The depth of the apollonius fractal
+    :type apo_depth: int
+    :param cutoff: The radius under which a circle of a gap is not filled
+    :type cutoff: float
+    :return: The centers, the radii, the apollonius generations and the radius of the smallest
+             circle of the gap of each circle, in the order of :func:`fractals.apollonius`
+    :rtype: tuple of numpy arrays
+    """
+    return sym.crown_columns(gen.make_crown(cir.make_circle(0j, 1), nb_circle), apo_depth, cutoff)
+
+def __cutoff (radius):
+    """
+    :return: The power of two just under the smallest radius of a gap to fill in a template
+    :rtype: float
+    """
+    return 2.0 ** math.floor(math.log2(ap.MIN_RADIUS / radius))
+
+def crown_columns (L, depth):
+    """
+    :param L: A list generate with the :func:`fractals.make_crown` function
+    :type L: list or CircleArray
+    :param depth: The depth of the fractal
+    :type depth: int
+    :return: The centers, the radii and the apollonius generations of the circles filling the crown
+    :rtype: tuple of numpy arrays
+    """
+    great = L[0]
+    center, radius = cir.get_center(great), cir.get_radius(great)
+    z, r, g, r_min = template(len(L) - 2, depth, __cutoff(radius))
+    mask = r_min * radius > ap.MIN_RADIUS
+    return center + radius * z[mask], radius * r[mask], g[mask]
+
+def apollonius (L, depth):
+    """
+    Fills a crown with the apollonius fractal.
+    It gives the same circles, in the same order, as :func:`apollonian.apollonius`.
+
+    :param L: A list generate with the :func:`fractals.make_crown` function
+    :type L: list or CircleArray
+    :param depth: The depth of the fractal
+    :type depth: int
+    :Action: add the new circles at the end of the list L
+    """
+    z, r, g = crown_columns(L, depth)
+    sym.count_pruned(2 * (len(L) - 2), g, depth)
+    if isinstance(L, cir.CircleArray):
+        L.extend_columns(z.real, z.imag, r, generation = g)
+    else:
+        L += [cir.make_circle(complex(c), float(radius)) for c, radius in zip(z, r)]
+
+def iter_apollonius (L, depth):
+    """
+    Gives the circles of the apollonius fractal of a crown one after the other.
+
+    :param L: A list generate with the :func:`fractals.make_crown` function
+    :type L: list or CircleArray
+    :param depth: The depth of the fractal
+    :type depth: int
+    :return: The same circles as :func:`apollonius`, L is not changed
+    :rtype: generator
+    """
+    z, r, g = crown_columns(L, depth)
+    sym.count_pruned(2 * (len(L) - 2), g, depth)
+    for c, radius in zip(z, r):
+        yield cir.make_circle(complex(c), float(radius))
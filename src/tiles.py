@@ -0,0 +1,284 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`tiles` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module draws images too big for the memory, tile by tile, in a file.
+
+A canvas is cut in square tiles of `tile` × `tile` pixels, stored one
+after the other in a file on the disk. Only the tiles touched by the
+circles being drawn are mapped in memory (with :class:`numpy.memmap`), so
+the memory used does not depend on the size of the image. The file keeps
+the ink (0 is white) so a new canvas is an empty sparse file.
+
+Each circle is drawn only in the tiles crossed by its outline. When all
+the circles are drawn the image is written tile by tile, as a single PNG
+written a few lines at a time, or as a pyramid of PNG tiles for a map
+viewer.
+
+To draw a big image one has to:
+
+* create a canvas with :func:`make_canvas`
+* draw the circles as they come with :func:`draw_stream`
+* save the image with :func:`save_png` or :func:`save_pyramid`, smoothed if the circles were drawn bigger
+
+.. topic:: This module uses functions from : :mod:`circles` and :mod:`raster` :
+
+    #. From :mod:`circles` :
+        * :class:`circles.CircleArray`
+    #. From :mod:`raster` :
+        * :func:`raster.draw_circles`
+        * :func:`raster.columns`
+        * :func:`raster.downsample`
+        * :data:`raster.CHUNK`
+"""
+
+import numpy    as np
+import circles  as cir
+import raster
+import os
+import math
+import struct
+import zlib
+
+TILE = 1024
+LINES = 64
+
+def make_canvas (filename, width, height, tile = TILE):
+    """
+    :param filename: The file keeping the tiles
+    :type filename: str
+    :param width: The width of the image
+    :type width: int
+    :param height: The height of the image
+    :type height: int
+    :param tile: (Default value : 1024) The size of a tile, in pixels
+    :type tile: int
+    :return: A white canvas
+    :rtype: canvas
+    """
+    cols, rows = -(-width // tile), -(-height // tile)
+    with open(filename, "wb") as f:
+        f.truncate(cols * rows * tile * tile)     ## Un fichier creux, rempli de 0
+    return {"filename" : filename, "width" : width, "height" : height,
+            "tile" : tile, "cols" : cols, "rows" : rows}
+
+def tile_view (canvas, tx, ty):
+    """
+    :param canvas: A canvas
+    :type canvas: canvas
+    :param tx: The column of the tile
+    :type tx: int
+    :param ty: The row of the tile
+    :type ty: int
+    :return: The ink of the tile, mapped from the file
+    :rtype: numpy.memmap
+    """
+    tile = canvas["tile"]
+    return np.memmap(canvas["filename"], dtype=np.uint8, mode="r+",
+                     offset = (ty * canvas["cols"] + tx) * tile * tile, shape = (tile, tile))
+
+def draw_circles (canvas, x, y, r, scale = 1.0, origin = 0j, width = 1):
+    """
+    Draws many circles at once, each one in the tiles crossed by its outline.
+
+    :param canvas: A canvas
+    :type canvas: canvas
+    :param x: The abscissas of the centers
+    :type x: numpy array
+    :param y: The ordinates of the centers
+    :type y: numpy array
+    :param r: The radii
+    :type r: numpy array
+    :param scale: (Default value : 1) The number of pixels for one unit
+    :type scale: float
+    :param origin: (Default value : 0) The point drawn on the pixel (0, 0)
+    :type origin: point
+    :param width: (Default value : 1) The width of the outlines, in pixels
+    :type width: int
+    """
+    tile, cols, rows = canvas["tile"], canvas["cols"], canvas["rows"]
+    cx = (np.asarray(x, dtype=float) - origin.real) * scale
+    cy = (np.asarray(y, dtype=float) - origin.imag) * scale
+    rr = np.asarray(r, dtype=float) * scale
+    tx0 = np.clip(np.floor((cx - rr - width - 1) / tile), 0, cols).astype(np.int64)
+    tx1 = np.clip(np.floor((cx + rr + width + 1) / tile), -1, cols - 1).astype(np.int64)
+    ty0 = np.clip(np.floor((cy - rr - width - 1) / tile), 0, rows).astype(np.int64)
+    ty1 = np.clip(np.floor((cy + rr + width + 1) / tile), -1, rows - 1).astype(np.int64)
+    nx, ny = np.maximum(tx1 - tx0 + 1, 0), np.maximum(ty1 - ty0 + 1, 0)
+    ## Un couple (cercle, tuile) pour chaque tuile de la boîte englobante du cercle
+    counts = nx * ny
+    circle = np.repeat(np.arange(len(rr)), counts)
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    tx = tx0[circle] + k % np.maximum(nx[circle], 1)
+    ty = ty0[circle] + k // np.maximum(nx[circle], 1)
+    ## On oublie les tuiles que le contour ne traverse pas (à l'intérieur d'un grand cercle)
+    dx = np.maximum(np.maximum(tx * tile - cx[circle], cx[circle] - (tx + 1) * tile), 0)
+    dy = np.maximum(np.maximum(ty * tile - cy[circle], cy[circle] - (ty + 1) * tile), 0)
+    far_x = np.maximum(np.abs(tx * tile - cx[circle]), np.abs((tx + 1) * tile - cx[circle]))
+    far_y = np.maximum(np.abs(ty * tile - cy[circle]), np.abs((ty + 1) * tile - cy[circle]))
+    crossed = (np.hypot(dx, dy) <= rr[circle] + width + 1) & (np.hypot(far_x, far_y) >= rr[circle] - width - 1)
+    circle, key = circle[crossed], (ty * cols + tx)[crossed]
+    order = np.argsort(key, kind="stable")
+    circle, key = circle[order], key[order]
+    x, y, r = np.asarray(x, dtype=float), np.asarray(y, dtype=float), np.asarray(r, dtype=float)
+    for start, end in zip(*__runs(key)):
+        ty, tx = divmod(int(key[start]), cols)
+        members = circle[start:end]
+        view = tile_view(canvas, tx, ty)
+        raster.draw_circles(view, x[members], y[members], r[members], scale, origin, width,
+                            color = 255, offset = (tx * tile, ty * tile))
+        view.flush()
+        del view
+
+def __runs(key):
+    """
+    :return: The beginnings and the ends of the runs of equal values of the sorted array `key`
+    :rtype: tuple of numpy arrays
+    """
+    if len(key) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], key[1:] != key[:-1])))
+    return starts, np.append(starts[1:], len(key))
+
+def draw_stream (canvas, circles, scale = 1.0, origin = 0j, width = 1, chunk = raster.CHUNK):
+    """
+    Draws circles as they come, `chunk` circles at a time.
+
+    :param canvas: A canvas
+    :type canvas: canvas
+    :param circles: The circles
+    :type circles: iterable of circles or CircleArray
+    :param scale: (Default value : 1) The number of pixels for one unit
+    :type scale: float
+    :param origin: (Default value : 0) The point drawn on the pixel (0, 0)
+    :type origin: point
+    :param width: (Default value : 1) The width of the outlines, in pixels
+    :type width: int
+    :param chunk: (Default value : 65536) The number of circles drawn at a time
+    :type chunk: int
+    """
+    if isinstance(circles, cir.CircleArray):
+        x, y, r = raster.columns(circles)
+        for start in range(0, len(r), chunk):
+            draw_circles(canvas, x[start:start + chunk], y[start:start + chunk], r[start:start + chunk], scale, origin, width)
+        return
+    L = cir.CircleArray()
+    for circle in circles:
+        L.append(circle)
+        if len(L) == chunk:
+            draw_circles(canvas, *raster.columns(L), scale, origin, width)
+            L = cir.CircleArray()
+    draw_circles(canvas, *raster.columns(L), scale, origin, width)
+
+def __png_chunk(f, kind, data):
+    f.write(struct.pack(">I", len(data)) + kind + data)
+    f.write(struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff))
+
+def iter_lines (canvas, lines = LINES):
+    """
+    :param canvas: A canvas
+    :type canvas: canvas
+    :param lines: (Default value : 64) The number of lines read at a time
+    :type lines: int
+    :return: The grey levels of the image, `lines` lines at a time
+    :rtype: generator of numpy arrays
+    """
+    tile, width, height = canvas["tile"], canvas["width"], canvas["height"]
+    for ty in range(canvas["rows"]):
+        for top in range(0, min(tile, height - ty * tile), lines):
+            bottom = min(top + lines, tile, height - ty * tile)
+            strip = np.empty((bottom - top, canvas["cols"] * tile), dtype=np.uint8)
+            for tx in range(canvas["cols"]):
+                view = tile_view(canvas, tx, ty)
+                strip[:, tx * tile:(tx + 1) * tile] = view[top:bottom]
+                del view
+            yield 255 - strip[:, :width]
+
+def save_png (canvas, filename, supersample = 1):
+    """
+    Writes the image in a grey PNG file, a few lines at a time.
+
+    :param canvas: A canvas
+    :type canvas: canvas
+    :param filename: The name of the image
+    :type filename: str
+    :param supersample: (Default value : 1) How many pixels of the canvas make a pixel of the image, in each direction,
+                        like in :func:`raster.save_png`
+    :type supersample: int
+    """
+    compressor = zlib.compressobj(6)
+    with open(filename, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        __png_chunk(f, b"IHDR", struct.pack(">IIBBBBB", canvas["width"] // supersample, canvas["height"] // supersample,
+                                            8, 0, 0, 0, 0))
+        for strip in __downsampled(iter_lines(canvas), supersample):
+            ## Chaque ligne commence par le type de filtre (0 : aucun)
+            lines = np.hstack([np.zeros((len(strip), 1), dtype=np.uint8), strip])
+            data = compressor.compress(lines.tobytes())
+            if data:
+                __png_chunk(f, b"IDAT", data)
+        __png_chunk(f, b"IDAT", compressor.flush())
+        __png_chunk(f, b"IEND", b"")
+
+def __downsampled (strips, supersample):
+    """
+    :return: The strips of lines, each pixel the mean of `supersample`² pixels, with the lines left over
+             from a strip kept for the next one
+    :rtype: generator of numpy arrays
+    """
+    left = None
+    for strip in strips:
+        if left is not None and len(left) != 0:
+            strip = np.vstack([left, strip])
+        lines = len(strip) // supersample * supersample
+        left = strip[lines:]
+        if lines != 0:
+            yield raster.downsample(strip[:lines], supersample)
+
+def save_pyramid (canvas, directory, supersample = 1):
+    """
+    Writes the image as a pyramid of PNG tiles `directory/z/x/y.png`, like the maps on the web :
+    the last level has the tiles of the canvas, each level above is two times smaller.
+
+    :param canvas: A canvas
+    :type canvas: canvas
+    :param directory: The directory of the pyramid
+    :type directory: str
+    :param supersample: (Default value : 1) How many pixels of the canvas make a pixel of the image :
+                        the tiles of the last level are `supersample` times smaller than the ones of the canvas
+    :type supersample: int
+    :return: The number of levels
+    :rtype: int
+    :UC: the size of the tiles of the canvas is a multiple of `supersample`
+    """
+    from PIL import Image
+    tile = canvas["tile"] // supersample
+    zmax = max(0, math.ceil(math.log2(max(canvas["cols"], canvas["rows"]))))
+    def path(z, x, y):
+        return os.path.join(directory, str(z), str(x), "%d.png" % y)
+    for ty in range(canvas["rows"]):
+        for tx in range(canvas["cols"]):
+            view = tile_view(canvas, tx, ty)
+            os.makedirs(os.path.dirname(path(zmax, tx, ty)), exist_ok=True)
+            Image.fromarray(raster.downsample(255 - np.asarray(view), supersample), "L").save(path(zmax, tx, ty))
+            del view
+    cols, rows = canvas["cols"], canvas["rows"]
+    for z in range(zmax - 1, -1, -1):
+        cols, rows = -(-cols // 2), -(-rows // 2)
+        for tx in range(cols):
+            for ty in range(rows):
+                ## Une tuile est la réduction des quatre tuiles du niveau en dessous
+                block = np.full((2 * tile, 2 * tile), 255, dtype=np.uint8)
+                for i in range(2):
+                    for j in range(2):
+                        if os.path.exists(path(z + 1, 2*tx + i, 2*ty + j)):
+                            block[j*tile:(j+1)*tile, i*tile:(i+1)*tile] = np.asarray(Image.open(path(z + 1, 2*tx + i, 2*ty + j)))
+                os.makedirs(os.path.dirname(path(z, tx, ty)), exist_ok=True)
+                Image.fromarray(raster.downsample(block, 2), "L").save(path(z, tx, ty))
+    return zmax + 1
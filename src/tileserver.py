@@ -0,0 +1,408 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`tileserver` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module serves the fractal as PNG tiles `/z/x/y.png` on a local HTTP server, for a map viewer of the web like Leaflet.
+
+At the zoom level z, the square of the fractal (of side `size`, the first
+circle is centered on (size/2, size/2)) is cut in 2^z × 2^z tiles of
+:data:`TILE` pixels, like the levels of :func:`tiles.save_pyramid`. A tile
+is drawn when it is asked, with only the circles seen in it and bigger than
+a pixel (see the viewports of :mod:`generator`), by a process of a pool :
+the server only waits for the processes, so it keeps answering while the
+tiles are drawn. A tile asked again while it is drawn is drawn once.
+
+The tiles drawn are kept in memory, at most `memory` bytes of PNG, the
+tiles asked the longest time ago are forgotten first. If a directory is
+given, they are also written in it, `directory/key/z/x/y.png` where the key
+is the hash of the fractal (see :func:`cache.cache_key`), and read from it
+when they are not in memory anymore : the directory is not emptied.
+
+The server only uses the standard library, and :mod:`numpy` to draw. It
+only listens on the computer itself (127.0.0.1). Its page `/` shows the
+tiles with Leaflet, loaded from the web by the browser.
+
+The crowns are never random : `nb_circle` must be at least 3, the circles
+of a random crown would depend on the tiles already drawn.
+
+To serve a fractal one has to:
+
+* give its parameters with :func:`make_fractal`
+* create the server with :func:`make_server`
+* run it with :func:`run` until it is interrupted, or with :func:`serve` in a loop of :mod:`asyncio`
+* or get the tiles without HTTP with :func:`get_tile`, and stop the processes with :func:`close`
+
+.. topic:: This module uses functions from : :mod:`viewport`, :mod:`raster`, :mod:`generator` and :mod:`cache` :
+
+    #. From :mod:`viewport` :
+        * :func:`viewport.make_viewport`
+        * :func:`viewport.get_scale`
+        * :func:`viewport.get_origin`
+    #. From :mod:`raster` (needs :mod:`numpy`) :
+        * :func:`raster.make_buffer`
+        * :func:`raster.clipped_outline`
+        * :func:`raster.draw_stream`
+        * :func:`raster.encode_png`
+    #. From :mod:`generator` :
+        * :func:`generator.iter_final`
+    #. From :mod:`cache` :
+        * :func:`cache.cache_key`
+"""
+
+import viewport as vp
+import generator as gen
+import cache
+import asyncio
+import collections
+import concurrent.futures
+import os
+import re
+
+TILE = 256
+MEMORY = 64 << 20
+MAX_ZOOM = 36       ## Un pixel y vaut encore 256 fois la précision des flottants des coordonnées, 2^-52 × size
+HOST = "127.0.0.1"
+PORT = 8080
+
+PATH = re.compile(r"^/(\d+)/(\d+)/(\d+)\.png$")
+REASONS = {200 : "OK", 400 : "Bad Request", 404 : "Not Found", 405 : "Method Not Allowed", 500 : "Internal Server Error"}
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Appollonius Fractals</title>
+<link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css">
+<script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
+<style>html, body, #map { height : 100%%; margin : 0; background : white; }</style>
+</head>
+<body>
+<div id="map"></div>
+<script>
+var bounds = [[-%(tile)d, 0], [0, %(tile)d]];
+var map = L.map("map", {crs : L.CRS.Simple, minZoom : 0, maxZoom : %(zoom)d, maxBounds : bounds});
+L.tileLayer("/{z}/{x}/{y}.png", {tileSize : %(tile)d, noWrap : true, bounds : bounds, maxZoom : %(zoom)d}).addTo(map);
+map.fitBounds(bounds);
+</script>
+</body>
+</html>
+"""
+
+def make_fractal (size, apo_depth, crown_depth, nb_circle, engine = "soddy"):
+    """
+    :param size: The side of the square of the fractal, the diameter of the first circle
+    :type size: float
+    :param apo_depth: The depth of the apollonius fractal
+    :type apo_depth: int
+    :param crown_depth: The depth of the crown fractal
+    :type crown_depth: int
+    :param nb_circle: The number of circle in the crown
+    :type nb_circle: int
+    :param engine: (Default value : "soddy") The engine computing the apollonius fractals, one of :data:`generator.ENGINES`
+    :type engine: str
+    :return: The parameters of the fractal
+    :rtype: dict
+    :UC: size > 0, apo_depth >= 0, crown_depth >= 1, nb_circle >= 3
+    """
+    return {"size" : size, "apo_depth" : apo_depth, "crown_depth" : crown_depth, "nb_circle" : nb_circle, "engine" : engine}
+
+def tile_view (fractal, z, x, y, tile = TILE):
+    """
+    :param fractal: The parameters given by :func:`make_fractal`
+    :type fractal: dict
+    :param z: The zoom level
+    :type z: int
+    :param x: The column of the tile
+    :type x: int
+    :param y: The row of the tile
+    :type y: int
+    :param tile: (Default value : 256) The size of a tile, in pixels
+    :type tile: int
+    :return: The viewport of the tile
+    :rtype: viewport
+    :Example:
+
+    >>> view = tile_view(make_fractal(1000, 5, 2, 3), 2, 1, 3)
+    >>> view["left"], view["top"], view["right"], view["bottom"], view["scale"]
+    (250.0, 750.0, 500.0, 1000.0, 1.024)
+    """
+    side = fractal["size"] / 2 ** z
+    return vp.make_viewport(x * side, y * side, (x + 1) * side, (y + 1) * side, tile / side)
+
+def draw_tile (fractal, z, x, y, tile = TILE):
+    """
+    Draws the circles seen in a tile. The circles much bigger than the tile, like the first circle
+    at a deep zoom, are only computed in the tile (see :func:`raster.clipped_outline`), so a tile
+    costs about the same time at every zoom level up to :data:`MAX_ZOOM`.
+
+    :param fractal: The parameters given by :func:`make_fractal`
+    :type fractal: dict
+    :param z: The zoom level
+    :type z: int
+    :param x: The column of the tile
+    :type x: int
+    :param y: The row of the tile
+    :type y: int
+    :param tile: (Default value : 256) The size of a tile, in pixels
+    :type tile: int
+    :return: The pixels of the tile
+    :rtype: numpy.ndarray
+    :Example:
+
+    >>> ## Au bord gauche du premier cercle, qui y touche un cercle de son trou : la première colonne
+    >>> pixels = draw_tile(make_fractal(1000, 1000, 2, 5), MAX_ZOOM, 0, 2 ** (MAX_ZOOM - 1))
+    >>> bool((pixels[:, 0] < 255).all()), int((pixels[:, 1:] < 255).sum())
+    (True, 0)
+    """
+    import raster
+    view = tile_view(fractal, z, x, y, tile)
+    half = fractal["size"] / 2
+    buffer = raster.make_buffer(tile, tile)
+    raster.draw_stream(buffer, gen.iter_final(half, half, half, fractal["apo_depth"], fractal["crown_depth"],
+                                              fractal["nb_circle"], fractal["engine"], view),
+                       vp.get_scale(view), vp.get_origin(view))
+    return buffer
+
+def render_tile (fractal, z, x, y, tile = TILE, path = None):
+    """
+    Draws a tile with :func:`draw_tile` and encodes it. It is the work of the processes of the server.
+
+    :param fractal: The parameters given by :func:`make_fractal`
+    :type fractal: dict
+    :param z: The zoom level
+    :type z: int
+    :param x: The column of the tile
+    :type x: int
+    :param y: The row of the tile
+    :type y: int
+    :param tile: (Default value : 256) The size of a tile, in pixels
+    :type tile: int
+    :param path: (Default value : None) If given, the PNG file is also written there
+    :type path: str
+    :return: The content of the PNG file of the tile
+    :rtype: bytes
+    :Example:
+
+    >>> png = render_tile(make_fractal(1000, 5, 2, 3), 0, 0, 0)
+    >>> png[1:4], len(png) > 1000
+    (b'PNG', True)
+    """
+    import raster
+    png = raster.encode_png(draw_tile(fractal, z, x, y, tile))
+    if path is not None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = "%s.%d.tmp" % (path, os.getpid())
+        with open(temporary, "wb") as f:
+            f.write(png)
+        os.replace(temporary, path)
+    return png
+
+def make_server (fractal, workers = 1, memory = MEMORY, directory = None, tile = TILE):
+    """
+    :param fractal: The parameters given by :func:`make_fractal`
+    :type fractal: dict
+    :param workers: (Default value : 1) The number of processes drawing the tiles
+    :type workers: int
+    :param memory: (Default value : 64 MiB) The greatest size of the tiles kept in memory, in bytes
+    :type memory: int
+    :param directory: (Default value : None) If given, the tiles are also kept in this directory
+    :type directory: str
+    :param tile: (Default value : 256) The size of a tile, in pixels
+    :type tile: int
+    :return: A server, whose processes are started
+    :rtype: server
+    :UC: workers >= 1
+    """
+    if directory is not None:
+        directory = os.path.join(directory, cache.cache_key(dict(fractal, tile = tile))[:16])
+    pool = concurrent.futures.ProcessPoolExecutor(workers)
+    ## Les processus sont créés tout de suite : créés pendant une connexion, ils en garderaient la socket ouverte
+    for future in [pool.submit(os.getpid) for i in range(workers)]:
+        future.result()
+    return {"fractal" : fractal, "tile" : tile, "directory" : directory, "pool" : pool,
+            "memory" : collections.OrderedDict(), "memory_size" : memory, "kept" : 0,
+            "pending" : {}, "counters" : {"memory" : 0, "disk" : 0, "drawn" : 0}}
+
+def close (server):
+    """
+    :param server: A server given by :func:`make_server`
+    :type server: server
+    :Action: Stops the processes of the server
+    """
+    server["pool"].shutdown(cancel_futures = True)
+
+def __path (server, key):
+    """
+    :return: The name of the file of the tile in the directory of the server, None if there is no directory
+    :rtype: str
+    """
+    if server["directory"] is None:
+        return None
+    z, x, y = key
+    return os.path.join(server["directory"], str(z), str(x), "%d.png" % y)
+
+def __keep (server, key, png):
+    """
+    :Action: Puts the tile in memory, and forgets the tiles asked the longest time ago if the memory is full
+    """
+    memory = server["memory"]
+    if key in memory:
+        server["kept"] -= len(memory.pop(key))
+    memory[key] = png
+    server["kept"] += len(png)
+    while server["kept"] > server["memory_size"] and len(memory) > 1:
+        old_key, old = memory.popitem(last = False)
+        server["kept"] -= len(old)
+
+def __drawn (server, key, future):
+    """
+    :Action: Puts the tile drawn in memory once its drawing is over, even if no client waits for it anymore
+    """
+    if server["pending"].get(key) is future:
+        del server["pending"][key]
+    if not future.cancelled() and future.exception() is None:
+        __keep(server, key, future.result())
+
+def is_tile (z, x, y):
+    """
+    :return: True if the tile is in the square of the fractal
+    :rtype: bool
+    :Example:
+
+    >>> is_tile(0, 0, 0), is_tile(2, 3, 1), is_tile(2, 4, 1), is_tile(MAX_ZOOM + 1, 0, 0)
+    (True, True, False, False)
+    """
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+async def get_tile (server, z, x, y):
+    """
+    :param server: A server given by :func:`make_server`
+    :type server: server
+    :param z: The zoom level
+    :type z: int
+    :param x: The column of the tile
+    :type x: int
+    :param y: The row of the tile
+    :type y: int
+    :return: The content of the PNG file of the tile, from the memory, from the directory or drawn by a process
+    :rtype: bytes
+    :UC: is_tile(z, x, y)
+    """
+    key = (z, x, y)
+    if key in server["memory"]:
+        server["memory"].move_to_end(key)
+        server["counters"]["memory"] += 1
+        return server["memory"][key]
+    path = __path(server, key)
+    if path is not None and os.path.exists(path):
+        with open(path, "rb") as f:
+            png = f.read()
+        server["counters"]["disk"] += 1
+        __keep(server, key, png)
+        return png
+    if key not in server["pending"]:  ## Les demandes de la même tuile attendent le même dessin
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(server["pool"], render_tile, server["fractal"], z, x, y, server["tile"], path)
+        future.add_done_callback(lambda future: __drawn(server, key, future))
+        server["pending"][key] = future
+        server["counters"]["drawn"] += 1
+    ## Le dessin continue si le client s'en va, un autre client le voudra peut-être
+    return await asyncio.shield(server["pending"][key])
+
+async def __answer (server, method, target):
+    """
+    :return: The status, the type and the content of the answer to the request
+    :rtype: tuple
+    """
+    if method not in ("GET", "HEAD"):
+        return 405, "text/plain", b"Only GET and HEAD are allowed.\n"
+    path = target.split("?")[0]
+    if path in ("/", "/index.html"):
+        return 200, "text/html; charset=utf-8", (PAGE % {"tile" : server["tile"], "zoom" : MAX_ZOOM}).encode("utf-8")
+    match = PATH.match(path)
+    if match is None or not is_tile(*[int(v) for v in match.groups()]):
+        return 404, "text/plain", b"No such tile.\n"
+    try:
+        return 200, "image/png", await get_tile(server, *[int(v) for v in match.groups()])
+    except Exception as error:
+        return 500, "text/plain", ("%s\n" % error).encode("utf-8")
+
+async def __handle (server, reader, writer):
+    """
+    :Action: Answers the requests of a connection, until the client closes it or asks to close it
+    """
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            headers = {}
+            while True:
+                header = await reader.readline()
+                if header in (b"\r\n", b"\n", b""):
+                    break
+                name, colon, value = header.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            request = line.decode("latin-1").split()
+            if len(request) != 3:
+                status, kind, body = 400, "text/plain", b"Bad request.\n"
+                keep = False
+            else:
+                method, target, version = request
+                status, kind, body = await __answer(server, method, target)
+                keep = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+            head = ["HTTP/1.1 %d %s" % (status, REASONS[status]), "Content-Type: %s" % kind,
+                    "Content-Length: %d" % len(body), "Connection: %s" % ("keep-alive" if keep else "close")]
+            if status == 200 and kind == "image/png":
+                head.append("Cache-Control: max-age=86400")
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+            if request[:1] != ["HEAD"]:
+                writer.write(body)
+            await writer.drain()
+            if not keep:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def serve (server, port = PORT, host = HOST):
+    """
+    :param server: A server given by :func:`make_server`
+    :type server: server
+    :param port: (Default value : 8080) The port listened, 0 for any free port
+    :type port: int
+    :param host: (Default value : "127.0.0.1") The address listened
+    :type host: str
+    :return: The server of :mod:`asyncio`, which answers while the loop runs
+    :rtype: asyncio.Server
+    """
+    return await asyncio.start_server(lambda reader, writer: __handle(server, reader, writer), host, port)
+
+def run (server, port = PORT, host = HOST):
+    """
+    :param server: A server given by :func:`make_server`
+    :type server: server
+    :param port: (Default value : 8080) The port listened
+    :type port: int
+    :param host: (Default value : "127.0.0.1") The address listened
+    :type host: str
+    :Action: Answers the requests until Ctrl-C, then stops the processes
+    """
+    async def forever():
+        listening = await serve(server, port, host)
+        print("Serving the tiles on http://%s:%d/ (Ctrl-C to stop)." % (host, port))
+        async with listening:
+            await listening.serve_forever()
+    try:
+        asyncio.run(forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close(server)
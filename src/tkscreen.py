@@ -0,0 +1,202 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`tkscreen` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module draws the circles in the Tkinter window little by little, without freezing it.
+
+Every oval of a :class:`tkinter.Canvas` is an object kept by Tk, so a
+fractal of millions of circles would take minutes and gigabytes to appear.
+Here the circles are drawn with :mod:`raster` in an array of pixels shown by
+a single :class:`tkinter.PhotoImage` ; only the circles bigger than
+:data:`BIG` pixels, which are few, are ovals of the canvas. Without
+:mod:`numpy` every circle is an oval.
+
+The drawing is done in the event loop of Tk : every call given to
+:meth:`tkinter.Misc.after` draws the circles during :data:`BUDGET` seconds,
+then updates the rows of the image which changed and gives the hand back
+to Tk. The circles are taken, so computed, by chunks : the size of each
+chunk comes from the speed of the last one, so that it ends before the
+budget, at most :data:`CHUNK` circles. So the window opens at once and
+fills in while the fractal is computed.
+
+To draw the circles one has to:
+
+* create the image in the canvas with :func:`make_screen`
+* give the circles to :func:`animate` before calling :meth:`tkinter.Misc.mainloop`
+
+.. topic:: This module uses functions from : :mod:`circles` and :mod:`raster` :
+
+    #. From :mod:`circles` :
+        * :func:`circles.get_center`
+        * :func:`circles.get_radius`
+        * :class:`circles.CircleArray`
+    #. From :mod:`raster` (needs :mod:`numpy`) :
+        * :func:`raster.make_buffer`
+        * :func:`raster.draw_circles`
+        * :func:`raster.columns`
+"""
+
+import circles  as cir
+import itertools
+import time
+
+try :
+    import numpy    as np
+    import raster
+except ImportError :
+    np = raster = None
+
+CHUNK = 4096
+FIRST = 64      ## Cercles du premier paquet, avant de connaître la vitesse
+BUDGET = 0.05   ## Secondes de dessin avant de rendre la main à Tk
+BIG = 128       ## Rayon en pixels au-delà duquel un cercle est un oval du canevas
+
+def make_screen (canvas, width, height):
+    """
+    :param canvas: The canvas of the window
+    :type canvas: tkinter.Canvas
+    :param width: The width of the image
+    :type width: int
+    :param height: The height of the image
+    :type height: int
+    :return: A screen, the image shown in the canvas and its pixels
+    :rtype: screen
+    """
+    screen = {"canvas" : canvas, "photo" : None, "buffer" : None, "rows" : None}
+    if raster is not None:
+        import tkinter as tk
+        screen["photo"] = tk.PhotoImage(master = canvas, width = width, height = height)
+        screen["buffer"] = raster.make_buffer(width, height)
+        canvas.create_image(0, 0, image = screen["photo"], anchor = "nw")
+    return screen
+
+def __taker (circles):
+    """
+    :return: A function giving the abscissas, the ordinates and the radii of the `n` next circles,
+             fewer at the end
+    :rtype: function
+    """
+    if isinstance(circles, cir.CircleArray):
+        x, y, r = circles.x, circles.y, circles.r
+        position = 0
+        def take(n):
+            nonlocal position
+            start, position = position, position + n
+            return x[start:position], y[start:position], r[start:position]
+        return take
+    circles = iter(circles)
+    def take(n):
+        L = [(cir.get_center(c), cir.get_radius(c)) for c in itertools.islice(circles, n)]
+        return [c.real for c, r in L], [c.imag for c, r in L], [r for c, r in L]
+    return take
+
+def __draw_ovals (screen, x, y, r):
+    """
+    :Action: Draws the circles, in pixels, as ovals of the canvas above the image
+    """
+    for cx, cy, cr in zip(x, y, r):
+        screen["canvas"].create_oval(cx - cr, cy - cr, cx + cr, cy + cr, width = 1, outline = "black")
+
+def draw (screen, x, y, r, scale = 1.0, origin = 0j):
+    """
+    :param screen: A screen given by :func:`make_screen`
+    :type screen: screen
+    :param x: The abscissas of the centers
+    :type x: sequence
+    :param y: The ordinates of the centers
+    :type y: sequence
+    :param r: The radii
+    :type r: sequence
+    :param scale: (Default value : 1) The number of pixels for one unit
+    :type scale: float
+    :param origin: (Default value : 0) The point drawn on the pixel (0, 0)
+    :type origin: point
+    :Action: Draws the circles, the image is updated by :func:`refresh`
+    """
+    if screen["buffer"] is None:
+        __draw_ovals(screen, [(v - origin.real) * scale for v in x], [(v - origin.imag) * scale for v in y],
+                     [v * scale for v in r])
+        return
+    x, y, r = (np.asarray(x, dtype=float), np.asarray(y, dtype=float), np.asarray(r, dtype=float))
+    big = r * scale > BIG
+    if big.any():
+        __draw_ovals(screen, (x[big] - origin.real) * scale, (y[big] - origin.imag) * scale, r[big] * scale)
+        x, y, r = x[~big], y[~big], r[~big]
+    if len(r) == 0:
+        return
+    raster.draw_circles(screen["buffer"], x, y, r, scale, origin)
+    ## Les lignes de l'image touchées par les cercles
+    height = screen["buffer"].shape[0]
+    top = max(int(np.floor(((y - r).min() - origin.imag) * scale)) - 1, 0)
+    bottom = min(int(np.ceil(((y + r).max() - origin.imag) * scale)) + 2, height)
+    if top < bottom:
+        rows = screen["rows"]
+        screen["rows"] = (top, bottom) if rows is None else (min(rows[0], top), max(rows[1], bottom))
+
+def refresh (screen):
+    """
+    :param screen: A screen given by :func:`make_screen`
+    :type screen: screen
+    :Action: Copies the rows of the pixels changed since the last call in the image of the window
+    """
+    if screen["rows"] is None:
+        return
+    top, bottom = screen["rows"]
+    band = screen["buffer"][top:bottom]
+    ## Une image PGM binaire, lue par Tk sans passer par du texte
+    data = b"P5 %d %d 255\n" % (band.shape[1], band.shape[0]) + band.tobytes()
+    screen["photo"].put(data, to = (0, top))
+    screen["rows"] = None
+
+def animate (screen, circles, scale = 1.0, origin = 0j, budget = BUDGET, chunk = CHUNK, done = None):
+    """
+    Draws the circles in the event loop of Tk, a few at a time.
+
+    :param screen: A screen given by :func:`make_screen`
+    :type screen: screen
+    :param circles: The circles, taken only when they are drawn
+    :type circles: iterable of circles or CircleArray
+    :param scale: (Default value : 1) The number of pixels for one unit
+    :type scale: float
+    :param origin: (Default value : 0) The point drawn on the pixel (0, 0)
+    :type origin: point
+    :param budget: (Default value : 0.05) The time in seconds spent drawing between two updates of the window
+    :type budget: float
+    :param chunk: (Default value : 4096) The greatest number of circles drawn at a time
+    :type chunk: int
+    :param done: (Default value : None) A function called without parameters when all the circles are drawn
+    :type done: function
+    :Action: Schedules the drawing with :meth:`tkinter.Misc.after` and returns at once
+    """
+    take = __taker(circles)
+    canvas = screen["canvas"]
+    size = min(chunk, FIRST)
+    def step():
+        nonlocal size
+        end = time.perf_counter() + budget
+        while True:
+            start = time.perf_counter()
+            x, y, r = take(size)
+            if len(r) != 0:
+                draw(screen, x, y, r, scale, origin)
+            if len(r) < size:
+                break
+            now = time.perf_counter()
+            rate = len(r) / max(now - start, 1e-6)
+            if now >= end:
+                size = max(1, min(chunk, int(rate * budget)))
+                refresh(screen)
+                canvas.after(1, step)
+                return
+            ## Les cercles sont calculés en les prenant : le paquet suivant tient dans le temps qui reste
+            size = max(1, min(chunk, int(rate * (end - now))))
+        refresh(screen)
+        if done is not None:
+            done()
+    canvas.after(0, step)
@@ -0,0 +1,184 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`vector` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module writes the circles in a SVG or PDF file as they come, to print the fractal at any size.
+
+The circles are never kept : they are written in text :data:`CHUNK`
+circles at a time, with a fixed number of decimals, so the memory used does
+not depend on the number of circles. A SVG file whose name ends with
+".svgz" is compressed with :mod:`gzip`. In a PDF file, each circle is
+drawn with four Bézier curves in a single page whose content is compressed
+with :mod:`zlib` while it is written ; its length and the positions of the
+objects of the file are only known at the end, so they are written after
+the page.
+
+The circles smaller than `min_radius` pixels can be left out, so the size
+of the file stays bounded however deep the fractal is.
+
+To save the fractal one has to:
+
+* give the circles to :func:`write_svg`
+* or to :func:`write_pdf`
+
+.. topic:: This module uses functions from : :mod:`circles` :
+
+    #. From :mod:`circles` :
+        * :func:`circles.get_center`
+        * :func:`circles.get_radius`
+        * :class:`circles.CircleArray`
+"""
+
+import circles  as cir
+import gzip
+import zlib
+
+CHUNK = 4096
+KAPPA = 0.5522847498  ## Une courbe de Bézier proche d'un quart de cercle de rayon 1
+
+def __columns (circles):
+    """
+    :return: The abscissa, the ordinate and the radius of each circle
+    :rtype: iterator of tuples
+    """
+    if isinstance(circles, cir.CircleArray):
+        return zip(circles.x, circles.y, circles.r)  ## Sans créer un dict par cercle
+    return ((c.real, c.imag, r) for c, r in ((cir.get_center(c), cir.get_radius(c)) for c in circles))
+
+def __chunks (circles, scale, origin, min_radius, chunk):
+    """
+    :return: The circles seen in pixels and at least `min_radius` pixels big, `chunk` circles at a time
+    :rtype: generator of lists of tuples
+    """
+    L = []
+    for x, y, r in __columns(circles):
+        r = r * scale
+        if r >= min_radius:
+            L.append(((x - origin.real) * scale, (y - origin.imag) * scale, r))
+            if len(L) == chunk:
+                yield L
+                L = []
+    if L != []:
+        yield L
+
+def write_svg (filename, circles, width, height, scale = 1.0, origin = 0j, min_radius = 0.0, precision = 2, chunk = CHUNK):
+    """
+    Writes the circles in a SVG file, compressed if its name ends with ".svgz".
+
+    :param filename: The name of the file
+    :type filename: str
+    :param circles: The circles
+    :type circles: iterable of circles or CircleArray
+    :param width: The width of the image, in pixels
+    :type width: int
+    :param height: The height of the image, in pixels
+    :type height: int
+    :param scale: (Default value : 1) The number of pixels for one unit
+    :type scale: float
+    :param origin: (Default value : 0) The point drawn on the pixel (0, 0)
+    :type origin: point
+    :param min_radius: (Default value : 0) The circles smaller than this radius, in pixels, are left out
+    :type min_radius: float
+    :param precision: (Default value : 2) The number of decimals of the numbers
+    :type precision: int
+    :param chunk: (Default value : 4096) The number of circles written at a time
+    :type chunk: int
+    :return: The number of circles written
+    :rtype: int
+    """
+    element = '<circle cx="%.{0}f" cy="%.{0}f" r="%.{0}f"/>\n'.format(precision)
+    f = gzip.open(filename, "wt") if filename.endswith(".svgz") else open(filename, "w")
+    count = 0
+    with f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<svg xmlns="http://www.w3.org/2000/svg" width="%d" height="%d" viewBox="0 0 %d %d">\n'
+                % (width, height, width, height))
+        f.write('<rect width="100%" height="100%" fill="white"/>\n')
+        f.write('<g fill="none" stroke="black" stroke-width="1">\n')
+        for L in __chunks(circles, scale, origin, min_radius, chunk):
+            f.write("".join([element % c for c in L]))
+            count += len(L)
+        f.write('</g>\n</svg>\n')
+    return count
+
+def __pdf_circle (x, y, r, number):
+    """
+    :return: The PDF path of the circle, four Bézier curves starting on its right
+    :rtype: str
+    """
+    k = KAPPA * r
+    values = (x + r, y,
+              x + r, y + k, x + k, y + r, x, y + r,
+              x - k, y + r, x - r, y + k, x - r, y,
+              x - r, y - k, x - k, y - r, x, y - r,
+              x + k, y - r, x + r, y - k, x + r, y)
+    return number % values
+
+def write_pdf (filename, circles, width, height, scale = 1.0, origin = 0j, min_radius = 0.0, precision = 2, chunk = CHUNK):
+    """
+    Writes the circles in a PDF file of one page.
+
+    :param filename: The name of the file
+    :type filename: str
+    :param circles: The circles
+    :type circles: iterable of circles or CircleArray
+    :param width: The width of the page, in points
+    :type width: int
+    :param height: The height of the page, in points
+    :type height: int
+    :param scale: (Default value : 1) The number of points for one unit
+    :type scale: float
+    :param origin: (Default value : 0) The point drawn on the top left corner of the page
+    :type origin: point
+    :param min_radius: (Default value : 0) The circles smaller than this radius, in points, are left out
+    :type min_radius: float
+    :param precision: (Default value : 2) The number of decimals of the numbers
+    :type precision: int
+    :param chunk: (Default value : 4096) The number of circles written at a time
+    :type chunk: int
+    :return: The number of circles written
+    :rtype: int
+    """
+    f_ = "%.{0}f".format(precision)
+    number = (f_ + " " + f_ + " m\n") + (" ".join([f_] * 6) + " c\n") * 4 + "s\n"
+    offsets = []
+    count = 0
+    with open(filename, "wb") as f:
+        def start_object():
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % len(offsets))
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        start_object()
+        f.write(b"<< /Type /Catalog /Pages 2 0 R >>\nendobj\n")
+        start_object()
+        f.write(b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>\nendobj\n")
+        start_object()
+        f.write(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents 4 0 R /Resources << >> >>\nendobj\n"
+                % (width, height))
+        ## La longueur du contenu n'est connue qu'à la fin : elle est dans l'objet 5
+        start_object()
+        f.write(b"<< /Length 5 0 R /Filter /FlateDecode >>\nstream\n")
+        begin = f.tell()
+        compressor = zlib.compressobj(6)
+        ## L'axe des ordonnées du PDF monte, celui de l'image descend
+        f.write(compressor.compress(b"1 w 0 G 1 0 0 -1 0 %d cm\n" % height))
+        for L in __chunks(circles, scale, origin, min_radius, chunk):
+            f.write(compressor.compress("".join([__pdf_circle(x, y, r, number) for x, y, r in L]).encode("ascii")))
+            count += len(L)
+        f.write(compressor.flush())
+        length = f.tell() - begin
+        f.write(b"\nendstream\nendobj\n")
+        start_object()
+        f.write(b"%d\nendobj\n" % length)
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(offsets) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(offsets) + 1, xref))
+    return count
@@ -0,0 +1,375 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`viewer` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module shows the fractal in the Tkinter window with zoom (mouse wheel) and move (drag with the left button).
+
+After each move, only the circles seen in the new viewport and bigger than
+a pixel are computed, by a thread, so the window keeps answering. While
+the thread works, the last image is moved and zoomed at once to the new
+viewport, then it is replaced by the new image.
+
+The circles of the fractal are nested in crowns : all the circles of a
+crown, those of the crown itself and of its apollonius fractal, are its
+subtree. The subtree of a crown is computed for a scale rounded up to a
+power of 2, so it is the same for all the zooms between two powers of 2
+and for all the moves : each circle keeps the size of the gap it fills, and
+only the circles whose gap is bigger than half a pixel at the scale of the
+viewport are drawn, like in :func:`generator.iter_final`. The subtree is
+kept in a cache of at most `cache_size` circles, the crowns used the
+longest time ago are forgotten first. Only
+the crowns whose radius is bigger than the window are computed for the
+viewport, without cache : they are few, and most of their circles are out
+of it.
+
+The crowns are never random : `nb_circle` must be at least 3.
+
+To use the viewer one has to:
+
+* create it in the canvas of the window with :func:`make_viewer`
+* change its viewport with the mouse, or with :func:`zoom`, :func:`move` and :func:`set_view`
+* stop its thread with :func:`close` once the main loop of Tk is over
+
+.. topic:: This module uses functions from : :mod:`circles`, :mod:`viewport`, :mod:`raster`, :mod:`generator` and :mod:`apollonian` :
+
+    #. From :mod:`circles` :
+        * :func:`circles.make_circle`
+        * :class:`circles.CircleArray`
+    #. From :mod:`viewport` :
+        * :func:`viewport.make_viewport`
+        * :func:`viewport.get_origin`
+        * :func:`viewport.get_scale`
+    #. From :mod:`raster` :
+        * :func:`raster.make_buffer`
+        * :func:`raster.draw_circles`
+        * :func:`raster.columns`
+    #. From :mod:`generator` :
+        * :func:`generator.make_crown`
+        * :func:`generator.crown_gaps`
+    #. From :mod:`apollonian` :
+        * :data:`apollonian.MIN_RADIUS`
+        * :func:`apollonian.walk_gap`
+        * :func:`apollonian.to_circle`
+"""
+
+import numpy    as np
+import circles  as cir
+import viewport as vp
+import raster
+import generator as gen
+import apollonian as ap
+import collections
+import itertools
+import math
+import threading
+import time
+
+CACHE_SIZE = 1 << 22
+CHUNK = 1 << 14
+ZOOM = 1.25     ## Zoom pour un cran de la molette
+POLL = 30       ## Millisecondes entre deux regards sur le travail du thread
+
+def make_viewer (canvas, width, height, x, y, radius, apo_depth, crown_depth, nb_circle, view = None, cache_size = CACHE_SIZE):
+    """
+    :param canvas: The canvas of the window
+    :type canvas: tkinter.Canvas
+    :param width: The width of the image
+    :type width: int
+    :param height: The height of the image
+    :type height: int
+    :param x: The center of first circle
+    :type x: float
+    :param y: The center of first circle
+    :type y: float
+    :param radius: The radius of the first circle
+    :type radius: float
+    :param apo_depth: The depth of the apollonius fractal
+    :type apo_depth: int
+    :param crown_depth: The depth of the crown fractal
+    :type crown_depth: int
+    :param nb_circle: The number of circle in the crown
+    :type nb_circle: int
+    :param view: (Default value : None) The first viewport, only its origin and its scale are used,
+                 the whole image without zoom if None
+    :type view: viewport
+    :param cache_size: (Default value : 4194304) The greatest number of circles kept in the cache
+    :type cache_size: int
+    :return: A viewer, whose thread draws the fractal in the canvas
+    :rtype: viewer
+    :UC: nb_circle >= 3
+    """
+    import tkinter as tk
+    if view is None:
+        view = vp.make_viewport(0, 0, width, height, 1)
+    viewer = {"canvas" : canvas, "width" : width, "height" : height,
+              "fractal" : (x, y, radius, apo_depth, crown_depth, nb_circle),
+              "cache" : collections.OrderedDict(), "cache_size" : cache_size, "cached" : 0,
+              "lock" : threading.Lock(), "wake" : threading.Event(), "closed" : False,
+              "generation" : 0, "view" : view, "drawing" : None, "finished" : None,
+              "shown" : None, "shown_view" : None, "drag" : None,
+              "photo" : tk.PhotoImage(master = canvas, width = width, height = height)}
+    canvas.create_image(0, 0, image = viewer["photo"], anchor = "nw")
+    canvas.bind("<ButtonPress-1>", lambda event: __press(viewer, event))
+    canvas.bind("<B1-Motion>", lambda event: __drag(viewer, event))
+    canvas.bind("<MouseWheel>", lambda event: zoom(viewer, event.x, event.y, ZOOM if event.delta > 0 else 1 / ZOOM))
+    canvas.bind("<Button-4>", lambda event: zoom(viewer, event.x, event.y, ZOOM))   ## La molette sous X11
+    canvas.bind("<Button-5>", lambda event: zoom(viewer, event.x, event.y, 1 / ZOOM))
+    viewer["thread"] = threading.Thread(target = __work, args = (viewer,), daemon = True)
+    viewer["thread"].start()
+    set_view(viewer, __view_at(viewer, vp.get_origin(view), vp.get_scale(view)))
+    canvas.after(POLL, __poll, viewer)
+    return viewer
+
+def close (viewer):
+    """
+    :param viewer: A viewer given by :func:`make_viewer`
+    :type viewer: viewer
+    :Action: Stops the thread of the viewer
+    """
+    viewer["closed"] = True
+    viewer["wake"].set()
+    viewer["thread"].join()
+
+def set_view (viewer, view):
+    """
+    :param viewer: A viewer given by :func:`make_viewer`
+    :type viewer: viewer
+    :param view: The new viewport
+    :type view: viewport
+    :Action: Asks the thread for the image of the viewport, the image being drawn is given up
+    """
+    with viewer["lock"]:
+        viewer["view"] = view
+        viewer["generation"] += 1
+    viewer["wake"].set()
+
+def __view_at (viewer, origin, scale):
+    """
+    :return: The viewport of the window whose pixel (0, 0) is `origin`
+    :rtype: viewport
+    """
+    return vp.make_viewport(origin.real, origin.imag, origin.real + viewer["width"] / scale,
+                            origin.imag + viewer["height"] / scale, scale)
+
+def zoom (viewer, x, y, factor):
+    """
+    :param viewer: A viewer given by :func:`make_viewer`
+    :type viewer: viewer
+    :param x: The abscissa of the pixel which does not move
+    :type x: int
+    :param y: The ordinate of the pixel which does not move
+    :type y: int
+    :param factor: The zoom, more than 1 to come closer
+    :type factor: float
+    :Action: Zooms the viewport around the pixel
+    """
+    view = viewer["view"]
+    scale = vp.get_scale(view)
+    point = vp.get_origin(view) + complex(x, y) / scale
+    set_view(viewer, __view_at(viewer, point - complex(x, y) / (scale * factor), scale * factor))
+
+def move (viewer, dx, dy):
+    """
+    :param viewer: A viewer given by :func:`make_viewer`
+    :type viewer: viewer
+    :param dx: The number of pixels the image moves to the right
+    :type dx: int
+    :param dy: The number of pixels the image moves down
+    :type dy: int
+    :Action: Moves the viewport
+    """
+    view = viewer["view"]
+    scale = vp.get_scale(view)
+    set_view(viewer, __view_at(viewer, vp.get_origin(view) - complex(dx, dy) / scale, scale))
+
+def __press (viewer, event):
+    """
+    :Action: Keeps the pixel where the drag starts
+    """
+    viewer["drag"] = (event.x, event.y)
+
+def __drag (viewer, event):
+    """
+    :Action: Moves the viewport with the mouse
+    """
+    if viewer["drag"] is not None:
+        x, y = viewer["drag"]
+        viewer["drag"] = (event.x, event.y)
+        move(viewer, event.x - x, event.y - y)
+
+##########################
+## Le travail du thread ##
+##########################
+
+def __keep (viewer, key, children):
+    """
+    :Action: Puts the subtree of a crown in the cache, and forgets the crowns used the longest time ago if it is full
+    """
+    cache = viewer["cache"]
+    cache[key] = children
+    viewer["cached"] += len(children[2])
+    while viewer["cached"] > viewer["cache_size"] and len(cache) > 1:
+        old_key, old = cache.popitem(last = False)
+        viewer["cached"] -= len(old[2])
+
+def __subtree (viewer, x, y, r, view, level):
+    """
+    :return: The abscissas, the ordinates and the radii of the circles of the crown inside the circle,
+             and of its apollonius fractal, down to half a pixel at the scale `level`, and the radius of the
+             smallest circle of the gap each circle fills (infinite for the crown)
+    :rtype: tuple of numpy arrays
+    """
+    x0, y0, radius, apo_depth, crown_depth, nb_circle = viewer["fractal"]
+    whole = r * level <= max(viewer["width"], viewer["height"])
+    key = (x, y, r, level)
+    if whole and key in viewer["cache"]:
+        viewer["cache"].move_to_end(key)
+        return viewer["cache"][key]
+    if whole:  ## Toute la couronne, utile quel que soit le déplacement
+        view = vp.make_viewport(x - r, y - r, x + r, y + r, level)
+    else:
+        view = vp.make_viewport(view["left"], view["top"], view["right"], view["bottom"], level)
+    Lcrown = gen.make_crown(cir.make_circle(complex(x, y), r), nb_circle)
+    L = cir.CircleArray(Lcrown[1:])
+    Lgap = [math.inf] * len(L)
+    for c1, c2, c3 in gen.crown_gaps(Lcrown):
+        for new, generation, r_min in ap.walk_gap(c1, c2, c3, apo_depth, view = view):
+            L.append(ap.to_circle(new))
+            Lgap.append(r_min)
+    children = tuple(column.copy() for column in raster.columns(L)) + (np.array(Lgap, dtype=float),)
+    if whole:
+        __keep(viewer, key, children)
+    return children
+
+def render (viewer, view, buffer, current = None):
+    """
+    Draws the circles of the fractal seen in the viewport.
+
+    :param viewer: A viewer given by :func:`make_viewer`
+    :type viewer: viewer
+    :param view: The viewport
+    :type view: viewport
+    :param buffer: The pixels of the image, see :func:`raster.make_buffer`
+    :type buffer: numpy.ndarray
+    :param current: (Default value : None) A function without parameters, the drawing stops when it gives False
+    :type current: function
+    :return: True if the whole image is drawn
+    :rtype: bool
+    """
+    x, y, radius, apo_depth, crown_depth, nb_circle = viewer["fractal"]
+    scale, origin = vp.get_scale(view), vp.get_origin(view)
+    level = 2.0 ** math.ceil(math.log2(scale))
+    left, top, right, bottom = view["left"], view["top"], view["right"], view["bottom"]
+    raster.draw_circles(buffer, [x], [y], [radius], scale, origin)
+    ## Chaque élément de la pile est un cercle contenant une couronne et la profondeur de cette couronne
+    stack = [(x, y, radius, crown_depth)]
+    Lwaiting, waiting = [], 0
+    while stack != []:
+        if current is not None and not current():
+            return False
+        x, y, r, depth = stack.pop()
+        if depth == 0 or r * scale <= 1:
+            continue
+        cx, cy, cr, cgap = __subtree(viewer, x, y, r, view, level)
+        dx = np.maximum(np.maximum(left - cx, cx - right), 0)
+        dy = np.maximum(np.maximum(top - cy, cy - bottom), 0)
+        ## Le sous-arbre descend jusqu'à la puissance de 2 suivante : seuls les trous assez grands à cette échelle
+        seen = (dx * dx + dy * dy <= cr * cr) & (cgap * scale > ap.MIN_RADIUS)
+        Lwaiting.append((cx[seen], cy[seen], cr[seen]))
+        waiting += len(Lwaiting[-1][2])
+        if waiting >= CHUNK:  ## Les petites couronnes sont dessinées ensemble
+            raster.draw_circles(buffer, *[np.concatenate(column) for column in zip(*Lwaiting)], scale, origin)
+            Lwaiting, waiting = [], 0
+        if depth > 1:
+            crowned = seen & (cr * scale > 1)
+            stack.extend(zip(cx[crowned].tolist(), cy[crowned].tolist(), cr[crowned].tolist(), itertools.repeat(depth - 1)))
+    if Lwaiting != []:
+        raster.draw_circles(buffer, *[np.concatenate(column) for column in zip(*Lwaiting)], scale, origin)
+    return True
+
+def __work (viewer):
+    """
+    :Action: The loop of the thread : draws the image of the last viewport asked, until the viewer is closed
+    """
+    while True:
+        viewer["wake"].wait()
+        viewer["wake"].clear()
+        if viewer["closed"]:
+            return
+        with viewer["lock"]:
+            generation, view = viewer["generation"], viewer["view"]
+        buffer = raster.make_buffer(viewer["width"], viewer["height"])
+        viewer["drawing"] = (generation, buffer, view, time.perf_counter())
+        if render(viewer, view, buffer, lambda: viewer["generation"] == generation and not viewer["closed"]):
+            viewer["finished"] = (generation, buffer, view)
+
+#################################
+## L'affichage dans la fenêtre ##
+#################################
+
+def __show (viewer, buffer, view):
+    """
+    :Action: Puts the pixels in the image of the window
+    """
+    data = b"P5 %d %d 255\n" % (buffer.shape[1], buffer.shape[0]) + buffer.tobytes()
+    viewer["photo"].put(data, to = (0, 0))
+    viewer["shown_view"] = view
+
+def preview (buffer, view, new_view, width, height):
+    """
+    :param buffer: The pixels of the image of a viewport
+    :type buffer: numpy.ndarray
+    :param view: The viewport of the image
+    :type view: viewport
+    :param new_view: Another viewport
+    :type new_view: viewport
+    :param width: The width of the new image
+    :type width: int
+    :param height: The height of the new image
+    :type height: int
+    :return: The pixels of the image moved and zoomed to the new viewport, white where the image is not known
+    :rtype: numpy.ndarray
+    :Example:
+
+    >>> buffer = raster.make_buffer(4, 4)
+    >>> buffer[1, 2] = 0
+    >>> L = preview(buffer, vp.make_viewport(0, 0, 4, 4), vp.make_viewport(1, 0, 5, 4), 4, 4)
+    >>> np.argwhere(L == 0).tolist()
+    [[1, 1]]
+    """
+    ratio = vp.get_scale(view) / vp.get_scale(new_view)
+    shift = (vp.get_origin(new_view) - vp.get_origin(view)) * vp.get_scale(view)
+    ## Le changement de vue agit séparément sur les colonnes et sur les lignes
+    columns = np.floor(np.arange(width) * ratio + shift.real).astype(np.int64)
+    rows = np.floor(np.arange(height) * ratio + shift.imag).astype(np.int64)
+    good_columns = (columns >= 0) & (columns < buffer.shape[1])
+    good_rows = (rows >= 0) & (rows < buffer.shape[0])
+    new = raster.make_buffer(width, height)
+    new[np.ix_(good_rows, good_columns)] = buffer[np.ix_(rows[good_rows], columns[good_columns])]
+    return new
+
+def __poll (viewer):
+    """
+    :Action: Shows the last image drawn by the thread, moved and zoomed to the viewport if it is not the image of
+             the viewport. The first image is shown while it is drawn
+    """
+    if viewer["closed"]:
+        return
+    finished, drawing = viewer["finished"], viewer["drawing"]
+    if finished is not None and (viewer["shown"] is None or viewer["shown"][0] is not finished[1]):
+        viewer["shown"] = finished[1:]
+        viewer["shown_view"] = None
+    view = viewer["view"]
+    if viewer["shown"] is None:
+        if drawing is not None and time.perf_counter() - drawing[3] > POLL / 1000:
+            __show(viewer, drawing[1], drawing[2])
+    elif viewer["shown_view"] is not view:
+        buffer, shown = viewer["shown"]
+        __show(viewer, buffer if shown is view else preview(buffer, shown, view, viewer["width"], viewer["height"]), view)
+    viewer["canvas"].after(POLL, __poll, viewer)
@@ -0,0 +1,141 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`viewport` module
+
+:author: `Irevoire - Hetoxys <http://portail.fil.univ-lille1.fr>`_
+
+:date:  2015 - 2016
+
+This module implements some functions to describe the part of the fractal which is drawn.
+
+A viewport is a rectangle of the plane and a scale : the number of pixels
+for one unit. The functions computing the fractal use it to forget the
+circles out of the rectangle and the circles too small to be seen.
+
+To create a viewport, one has to:
+
+* use :func:`make_viewport`
+
+To get his caracteristics ;
+
+* get the point drawn on the first pixel with :func:`get_origin`
+* get his scale with :func:`get_scale`
+* get the size of the image with :func:`get_size`
+
+To use it ;
+
+* check if a circle can be seen with :func:`intersects`
+* move a circle from the plane to the image with :func:`to_pixels`
+
+.. topic:: This module uses functions from : :mod:`points` and :mod:`circles` :
+
+    #. From :mod:`points` :
+        * :func:`points.make_point`
+        * :func:`points.get_abs`
+        * :func:`points.get_ord`
+    #. From :mod:`circles` :
+        * :func:`circles.make_circle`
+        * :func:`circles.get_center`
+        * :func:`circles.get_radius`
+"""
+
+import points   as pt
+import circles  as cir
+import math
+
+def make_viewport (left, top, right, bottom, scale = 1):
+    """
+    Creates the viewport of the rectangle (left, top, right, bottom).
+
+    :param left: The smallest abscissa of the rectangle
+    :type left: float
+    :param top: The smallest ordinate of the rectangle
+    :type top: float
+    :param right: The greatest abscissa of the rectangle
+    :type right: float
+    :param bottom: The greatest ordinate of the rectangle
+    :type bottom: float
+    :param scale: (Default value : 1) The number of pixels for one unit
+    :type scale: float
+    :UC: left < right, top < bottom and scale > 0
+    :Example:
+
+    >>> view = make_viewport(100, 100, 200, 150, 4)
+    >>> get_size(view)
+    (400, 200)
+    """
+    return {"left" : left, "top" : top, "right" : right, "bottom" : bottom, "scale" : scale}
+
+def get_origin (view):
+    """
+    :param view: A viewport
+    :type view: viewport
+    :return: The point drawn on the pixel (0, 0)
+    :rtype: point
+    :Example:
+
+    >>> get_origin(make_viewport(100, 50, 200, 150))
+    (100+50j)
+    """
+    return pt.make_point(view["left"], view["top"])
+
+def get_scale (view):
+    """
+    :param view: A viewport
+    :type view: viewport
+    :return: The number of pixels for one unit
+    :rtype: float
+    """
+    return view["scale"]
+
+def get_size (view):
+    """
+    :param view: A viewport
+    :type view: viewport
+    :return: The width and the height of the image, in pixels
+    :rtype: tuple
+    """
+    return (int(math.ceil((view["right"] - view["left"]) * view["scale"])),
+            int(math.ceil((view["bottom"] - view["top"]) * view["scale"])))
+
+def intersects (view, center, radius):
+    """
+    :param view: A viewport
+    :type view: viewport
+    :param center: The center of a disc
+    :type center: point
+    :param radius: The radius of the disc
+    :type radius: float
+    :return: True if the disc and the rectangle of the viewport have a common point
+    :rtype: bool
+    :Example:
+
+    >>> view = make_viewport(0, 0, 100, 100)
+    >>> intersects(view, pt.make_point(150, 50), 60)
+    True
+    >>> intersects(view, pt.make_point(150, 150), 60)
+    False
+    """
+    x, y = pt.get_abs(center), pt.get_ord(center)
+    dx = max(view["left"] - x, 0, x - view["right"])
+    dy = max(view["top"] - y, 0, y - view["bottom"])
+    return dx * dx + dy * dy <= radius * radius
+
+def to_pixels (view, circle):
+    """
+    :param view: A viewport
+    :type view: viewport
+    :param circle: A circle of the plane
+    :type circle: circle
+    :return: The circle in the pixels of the image
+    :rtype: circle
+    :Example:
+
+    >>> view = make_viewport(100, 100, 200, 200, 2)
+    >>> to_pixels(view, cir.make_circle(pt.make_point(150, 110), 5))
+    {'center': (100+20j), 'radius': 10}
+    """
+    return cir.make_circle((cir.get_center(circle) - get_origin(view)) * view["scale"],
+                           cir.get_radius(circle) * view["scale"])